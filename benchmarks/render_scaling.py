@@ -0,0 +1,85 @@
+"""organize_tasks_by_sections 的耗时随任务数量的变化：逐个扫描查找子任务 vs 父子索引
+
+用法：python benchmarks/render_scaling.py [任务数量 ...]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from todo_app.archive import TaskArchive
+from todo_app.task_model import KIND_SEPARATOR, Task
+from todo_app.todo_app import TodoApp
+
+# 超过该数量时旧算法按平方关系估算，不再实际运行
+LEGACY_LIMIT = 20_000
+
+
+def make_tasks(count):
+    """每 50 项一个分割线，每个主任务后面跟一个子任务，三分之一的主任务已完成"""
+    tasks = []
+    parent = None
+    for i in range(count):
+        if i % 50 == 49:
+            tasks.append(Task('─' * 40, KIND_SEPARATOR, task_id=f"sep-{i}"))
+        elif parent is not None and i % 2 == 1:
+            tasks.append(Task(f"Subtask {i}", task_id=f"id-{i}", is_subtask=True, parent_task_id=parent.task_id))
+            parent = None
+        else:
+            parent = Task(f"Task {i}", task_id=f"id-{i}", done=i % 3 == 0,
+                          completed_time='2024-05-01 10:00' if i % 3 == 0 else '')
+            tasks.append(parent)
+    return tasks
+
+
+def make_app(tasks, archive_dir):
+    app = TodoApp.__new__(TodoApp)
+    app.archive = TaskArchive(archive_dir)
+    app.collapsed_sections = set()
+    app.tasks = tasks
+    return app
+
+
+def legacy_groups(tasks):
+    """旧实现中的子任务查找：每个主任务扫描一遍整个任务列表"""
+    groups = []
+    for task in tasks:
+        if task.is_subtask or task.separator:
+            continue
+        group = [task]
+        for other_task in tasks:
+            if other_task.is_subtask and other_task.parent_task_id == task.task_id:
+                group.append(other_task)
+        groups.append(group)
+    return groups
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as archive_dir:
+        legacy_base = None
+        print(f"{'tasks':>8} {'indexed':>10} {'legacy':>14}")
+        for count in sizes:
+            app = make_app(make_tasks(count), Path(archive_dir))
+            indexed = timed(app.organize_tasks_by_sections)
+            if count <= LEGACY_LIMIT:
+                legacy = timed(lambda: legacy_groups(app.tasks)) + indexed
+                legacy_base = (count, legacy)
+                legacy_text = f"{legacy * 1000:10.1f} ms"
+            elif legacy_base is not None:
+                base_count, base_time = legacy_base
+                legacy = base_time * (count / base_count) ** 2
+                legacy_text = f"~{legacy * 1000:.0f} ms"
+            else:
+                legacy_text = '-'
+            print(f"{count:>8} {indexed * 1000:7.1f} ms {legacy_text:>14}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000])
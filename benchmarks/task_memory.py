@@ -0,0 +1,55 @@
+"""比较每个任务使用字典和使用 Task 时占用的内存（tracemalloc）
+
+用法：python benchmarks/task_memory.py [任务数量]
+"""
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from todo_app.storage import serialize_task
+from todo_app.task_model import Task
+
+
+def make_tasks_json(count):
+    """模拟 tasks.json 的内容"""
+    colors = ['', '#ffe0e0', '#e0ffe0', '#e0e0ff']
+    records = []
+    for i in range(count):
+        done = i % 3 == 0
+        records.append(serialize_task({
+            'name': f"Task {i}",
+            'task_id': f"{i:08x}-0000-4000-8000-000000000000",
+            'done': done,
+            'completed_time': f"2024-05-0{i % 9 + 1} 10:00" if done else '',
+            'deadline': f"2024-06-{i % 20 + 10}" if i % 4 == 0 else '',
+            'custom_bg_color': colors[i % len(colors)],
+            'is_subtask': i % 5 == 1,
+            'parent_task_id': f"{i - 1:08x}-0000-4000-8000-000000000000" if i % 5 == 1 else None,
+        }))
+    return json.dumps(records)
+
+
+def measure(load, text, count):
+    """返回 load(text) 加载完成后，每个任务平均仍然占用的字节数"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = load(text)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tasks
+    return (after - before) / count
+
+
+def main(count=100_000):
+    text = make_tasks_json(count)
+    as_dicts = measure(json.loads, text, count)
+    as_tasks = measure(lambda text: [Task.from_dict(data) for data in json.loads(text)], text, count)
+    print(f"{count} tasks")
+    print(f"dict: {as_dicts:8.1f} bytes/task")
+    print(f"Task: {as_tasks:8.1f} bytes/task ({as_tasks / as_dicts:.0%})")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -2,9 +2,11 @@ import unittest
 from unittest.mock import patch, MagicMock
 import tkinter as tk
 import json
+import tempfile
 from pathlib import Path
 import sys
 sys.path.append('../')
+from todo_app.archive import TOP_SECTION_KEY, TaskArchive
 from todo_app.todo_app import TodoApp
 
 class TestTodoApp(unittest.TestCase):
@@ -88,5 +90,122 @@ class TestTodoApp(unittest.TestCase):
         self.assertTrue(self.app.tasks[0]['done'])
         self.assertFalse(self.app.tasks[1]['done'])
 
+    def test_rerender_unchanged_list_uses_display_cache(self):
+        self.app.tasks = [
+            {"name": "Task 1", "deadline": "2024-01-01"},
+            {"name": "Task 2", "done": True, "completed_time": "2024-01-02 10:00"}
+        ]
+        self.app.populate_listbox()
+        with patch.object(self.app, 'get_row_text', wraps=self.app.get_row_text) as get_row_text:
+            self.app.populate_listbox()
+            self.assertEqual(get_row_text.call_count, 0)
+            self.app.tasks[0]['name'] = "Task 1 renamed"
+            self.app.populate_listbox()
+            self.assertEqual(get_row_text.call_count, 1)
+        self.assertTrue(self.app.listbox.get(0).endswith("Task 1 renamed" + self.app.get_deadline_indicator(self.app.tasks[0])))
+
+    def test_search_filters_and_restores_list(self):
+        self.app.tasks = [
+            {"name": "Parent", "task_id": "p"},
+            {"name": "Child match", "task_id": "c", "is_subtask": True, "parent_task_id": "p"},
+            {"name": "Other", "task_id": "o"}
+        ]
+        self.app.populate_listbox()
+        self.app.search_var.set("match")
+        self.app.render_scheduler.flush()
+        self.assertEqual([task['name'] for task in self.app.display_tasks], ["Parent", "Child match"])
+        with patch.object(self.app, 'organize_tasks_by_sections') as organize:
+            self.app.search_var.set("")
+            self.app.render_scheduler.flush()
+            organize.assert_not_called()
+        self.assertEqual(self.app.listbox.size(), 3)
+
+    def test_search_archive_restores_matching_section(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.app.archive = TaskArchive(Path(tmp_dir))
+            self.app.archive.append(TOP_SECTION_KEY, [
+                {"name": "Old match", "task_id": "old", "done": True, "completed_time": "2020-01-01 10:00"}
+            ])
+            self.app.tasks = [{"name": "Live", "task_id": "live"}]
+            self.app.collapsed_sections = {0}
+            self.app.populate_listbox()
+            self.app.search_var.set("match")
+            self.app.render_scheduler.flush()
+            self.assertFalse(any(task.get('name') == "Old match" for task in self.app.display_tasks))
+            with patch.object(self.app, 'schedule_save'), patch.object(self.app, 'save_config'):
+                self.app.search_archive()
+                self.app.render_scheduler.flush()
+            self.assertIn("Old match", [task.get('name') for task in self.app.display_tasks])
+            self.assertNotIn(0, self.app.collapsed_sections)
+
+    def test_worker_results_are_handled_on_main_thread(self):
+        import threading
+        worker = threading.Thread(target=self.app.on_persistence_error, args=('tasks', OSError("disk full")))
+        worker.start()
+        worker.join()
+        self.assertNotIn("保存失败", self.root.title())
+        self.app.drain_worker_results()
+        self.assertIn("保存失败", self.root.title())
+
+    def test_save_snapshot_is_plain_data(self):
+        self.app.tasks = [{"name": "Task 1", "task_id": "t1"}, {"name": "Task 2", "task_id": "t2"}]
+        self.app.take_tasks_snapshot(force=True)
+        self.app.tasks[1]['done'] = True
+        with patch.object(self.app.persistence, 'mark_dirty') as mark_dirty:
+            self.app.schedule_save([self.app.tasks[1]])
+            mark_dirty.assert_not_called()  # 快照等到当前事件处理完才生成
+            self.root.update()
+            mark_dirty.assert_called_once()
+        version, tasks, dirty_ids = self.app.take_tasks_snapshot()
+        self.assertTrue(all(type(task) is dict for task in tasks))
+        self.assertTrue(tasks[1]['done'])
+        self.assertEqual(dirty_ids, set())
+
+    def test_view_filters_list(self):
+        self.app.tasks = [
+            {"name": "Task 1", "urgent": True},
+            {"name": "Task 2"}
+        ]
+        self.app.populate_listbox()
+        self.app.views['urgent'] = 'urgent'
+        with patch.object(self.app, 'save_config'):
+            self.app.select_view('urgent')
+            self.app.render_scheduler.flush()
+            self.assertEqual([task['name'] for task in self.app.display_tasks], ["Task 1"])
+            self.app.select_view(None)
+            self.app.render_scheduler.flush()
+        self.assertEqual(len(self.app.display_tasks), 2)
+
+    def test_drag_moves_parent_with_subtasks(self):
+        self.app.tasks = [
+            {"name": "A", "task_id": "a"},
+            {"name": "A1", "task_id": "a1", "is_subtask": True, "parent_task_id": "a"},
+            {"name": "B", "task_id": "b"}
+        ]
+        self.app.populate_listbox()
+        with patch.object(self.app.listbox, 'nearest', side_effect=[0, 2]), \
+                patch.object(self.app, 'schedule_save'):
+            self.app.start_drag(MagicMock(y=0))
+            self.app.end_drag(MagicMock(y=40))
+        self.assertEqual([task['name'] for task in self.app.tasks], ["B", "A", "A1"])
+
+    def test_theme_keeps_cached_first_screen(self):
+        root = tk.Tk()
+        try:
+            with patch.object(TodoApp, 'read_render_cache', return_value=None):
+                app = TodoApp(root)
+            app.display_tasks = []  # 与启动时一样，任务数据还没有加载
+            render_cache = {'rows': [["Task 1", "#ffffff", "#000000"], ["Task 2", "#ffffff", "#000000"]],
+                            'title': "To-Do (2)"}
+            app.setup_ui(render_cache)
+            self.assertEqual(app.listbox.size(), 2)
+            app.apply_theme()
+            self.assertEqual(app.listbox.size(), 2)
+            # 真实内容绘制之后，主题切换照常按 display_tasks 重绘
+            app.populate_listbox()
+            self.assertFalse(app.showing_render_cache)
+        finally:
+            root.destroy()
+
 if __name__ == "__main__":
     unittest.main()
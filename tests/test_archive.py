@@ -0,0 +1,89 @@
+import unittest
+import tempfile
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.archive import TaskArchive
+
+
+def make_task(i, **fields):
+    return dict({'name': f"Task {i}", 'task_id': f"id-{i}", 'done': True,
+                 'completed_time': '2020-01-01 10:00'}, **fields)
+
+
+class TestTaskArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp_dir.name) / 'archive'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_append_and_load(self):
+        archive = TaskArchive(self.directory)
+        archive.append('sep-1', [make_task(1), make_task(2, is_subtask=True, parent_task_id='id-1')])
+        archive.append('sep-1', [make_task(3, done=False, cancelled=True)])
+
+        tasks = archive.load('sep-1')
+        self.assertEqual([t['task_id'] for t in tasks], ['id-1', 'id-2', 'id-3'])
+        self.assertEqual(tasks[1]['parent_task_id'], 'id-1')
+        self.assertEqual(archive.count('sep-1'), 2)
+        self.assertEqual(archive.done_count(), 1)
+
+    def test_counts_read_from_block_headers(self):
+        TaskArchive(self.directory).append('top', [make_task(i) for i in range(5)])
+        archive = TaskArchive(self.directory)
+        self.assertEqual(archive.keys(), ['top'])
+        self.assertEqual(archive.count('top'), 5)
+        self.assertEqual(archive.count('missing'), 0)
+
+    def test_torn_block_is_ignored(self):
+        archive = TaskArchive(self.directory)
+        archive.append('top', [make_task(1)])
+        archive.append('top', [make_task(2)])
+        path = archive.segment_path('top')
+        path.write_bytes(path.read_bytes()[:-5])
+
+        tasks = TaskArchive(self.directory).load('top')
+        self.assertEqual([t['task_id'] for t in tasks], ['id-1'])
+
+    def test_forget_and_purge(self):
+        archive = TaskArchive(self.directory)
+        archive.append('top', [make_task(1)])
+        archive.forget('top')
+        self.assertEqual(archive.count('top'), 0)
+        self.assertTrue(archive.segment_path('top').exists())
+
+        archive.purge()
+        self.assertFalse(archive.segment_path('top').exists())
+        self.assertEqual(archive.keys(), [])
+
+    def test_replayed_archive_is_not_counted_twice(self):
+        archive = TaskArchive(self.directory)
+        tasks = [make_task(1), make_task(2, is_subtask=True, parent_task_id='id-1')]
+        archive.append('top', tasks)
+        # 归档之后、保存任务数据之前崩溃：下次启动再次归档同样的任务
+        archive = TaskArchive(self.directory)
+        archive.append('top', tasks + [make_task(3)])
+        self.assertEqual(archive.count('top'), 2)
+        self.assertEqual([t['task_id'] for t in TaskArchive(self.directory).load('top')], ['id-1', 'id-2', 'id-3'])
+
+        # 旧版本没有去重时写入的完全相同的块
+        path = archive.segment_path('top')
+        data = path.read_bytes()
+        path.write_bytes(data + data)
+        archive = TaskArchive(self.directory)
+        self.assertEqual(archive.count('top'), 2)
+        self.assertEqual(archive.done_count(), 2)
+        self.assertEqual([t['task_id'] for t in archive.load('top')], ['id-1', 'id-2', 'id-3'])
+
+    def test_search(self):
+        archive = TaskArchive(self.directory)
+        archive.append('top', [make_task(1, name='Buy milk'), make_task(2, name='Call Bob')])
+        matches = archive.search('MILK')
+        self.assertEqual([(key, task['task_id']) for key, task in matches], [('top', 'id-1')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+from datetime import date
+sys.path.append('../')
+from todo_app.deadline_index import DeadlineIndex, deadline_indicator, parse_deadline
+from todo_app.task_model import Task
+
+TODAY = date(2024, 3, 10).toordinal()
+
+
+def make_task(name, deadline, **fields):
+    return Task(name, deadline=deadline, **fields)
+
+
+def names(tasks):
+    return [task.name for task in tasks]
+
+
+class TestDeadlineIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = DeadlineIndex()
+        self.tasks = {
+            'late': make_task('late', '2024-03-01'),
+            'today': make_task('today', '2024-03-10'),
+            'soon': make_task('soon', '2024-03-12'),
+            'later': make_task('later', '2024-04-01'),
+            'done': make_task('done', '2024-03-09', done=True),
+            'invalid': make_task('invalid', 'someday'),
+        }
+        for task in self.tasks.values():
+            self.index.add(task)
+
+    def test_parse_and_indicator(self):
+        self.assertEqual(parse_deadline('2024-03-10'), TODAY)
+        self.assertIsNone(parse_deadline('someday'))
+        self.assertEqual(deadline_indicator(TODAY - 2, TODAY, ''), ' ⚠️超期2天')
+        self.assertEqual(deadline_indicator(TODAY, TODAY, ''), ' ⚠️今天到期')
+        self.assertEqual(deadline_indicator(TODAY + 3, TODAY, ''), ' ⏰3天后到期')
+        self.assertEqual(deadline_indicator(TODAY + 4, TODAY, '2024-03-14'), ' 📅2024-03-14')
+
+    def test_queries(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(names(self.index.overdue(TODAY)), ['late'])
+        self.assertEqual(names(self.index.due_within(2, TODAY)), ['today', 'soon'])
+        self.assertEqual(names(self.index.due_within(0, TODAY)), ['today'])
+
+    def test_update_and_discard(self):
+        soon = self.tasks['soon']
+        soon['done'] = True
+        self.index.add(soon)
+        self.assertNotIn(soon, self.index)
+        later = self.tasks['later']
+        later['deadline'] = '2024-03-05'
+        self.index.add(later)
+        self.assertEqual(names(self.index.overdue(TODAY)), ['late', 'later'])
+        self.index.discard(self.tasks['late'])
+        self.assertEqual(names(self.index.overdue(TODAY)), ['later'])
+
+    def test_changed_at_midnight(self):
+        # 超期和三天以内到期的提示带天数，跨过午夜时会变化；更远的只显示日期
+        self.assertEqual(names(self.index.changed_between(TODAY, TODAY + 1)), ['late', 'today', 'soon'])
+        self.assertEqual(names(self.index.changed_between(TODAY, TODAY + 30)),
+                         ['late', 'today', 'soon', 'later'])
+
+
+if __name__ == '__main__':
+    unittest.main()
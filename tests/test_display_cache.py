@@ -0,0 +1,66 @@
+import unittest
+import sys
+sys.path.append('../')
+from todo_app.display_cache import MAX_RESERVED_SIZE, DisplayCache
+from todo_app.task_model import Task
+
+
+class TestDisplayCache(unittest.TestCase):
+
+    def test_hit_and_miss_counters(self):
+        cache = DisplayCache()
+        task = Task('a')
+        key = (id(task), task.version)
+        self.assertIsNone(cache.get(key, task))
+        cache.put(key, task, 'text')
+        self.assertEqual(cache.get(key, task), 'text')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_new_version_is_a_miss(self):
+        cache = DisplayCache()
+        task = Task('a')
+        cache.put((id(task), task.version), task, 'old')
+        task['name'] = 'b'
+        self.assertIsNone(cache.get((id(task), task.version), task))
+
+    def test_reused_id_is_not_a_hit(self):
+        cache = DisplayCache()
+        task, other = Task('a'), Task('b')
+        cache.put(('row', 1), task, 'a')
+        # 模拟任务被释放后 id 被另一个任务复用
+        self.assertIsNone(cache.get(('row', 1), other))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = DisplayCache(maxsize=2)
+        cache.put('a', None, 1)
+        cache.put('b', None, 2)
+        cache.get('a')
+        cache.put('c', None, 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_reserve_grows_capacity(self):
+        cache = DisplayCache(maxsize=2)
+        cache.reserve(10)
+        for i in range(10):
+            cache.put(i, None, i)
+        self.assertEqual(len(cache), 10)
+
+    def test_reserve_is_bounded_and_shrinks(self):
+        cache = DisplayCache(maxsize=2)
+        cache.reserve(MAX_RESERVED_SIZE * 10)
+        self.assertEqual(cache.maxsize, MAX_RESERVED_SIZE)
+        cache.reserve(10)
+        for i in range(12):
+            cache.put(i, None, i)
+        self.assertEqual(len(cache), 12)
+        cache.reserve(1)  # 列表变短：恢复构造时的容量
+        self.assertEqual(cache.maxsize, 2)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(11), 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import sys
+sys.path.append('../')
+from todo_app.drag_drop import drag_block, drop_position
+from todo_app.task_model import KIND_SEPARATOR, Task
+from todo_app.task_store import TaskStore
+
+
+def make_store():
+    return TaskStore([
+        Task('A', task_id='a'),
+        Task('A1', task_id='a1', is_subtask=True, parent_task_id='a'),
+        Task('B', task_id='b'),
+        Task('B1', task_id='b1', is_subtask=True, parent_task_id='b'),
+        Task('B2', task_id='b2', is_subtask=True, parent_task_id='b'),
+        Task('────', KIND_SEPARATOR, task_id='s'),
+        Task('C', task_id='c'),
+    ])
+
+
+def names(tasks):
+    return [task.name for task in tasks]
+
+
+class TestDragDrop(unittest.TestCase):
+
+    def setUp(self):
+        self.store = make_store()
+        self.get = self.store.get
+
+    def move(self, rows, target, after):
+        block = drag_block(self.store, rows)
+        position = drop_position(self.store, block, target, after)
+        if position is not None:
+            self.store.move(block, position)
+        return position
+
+    def test_parent_moves_with_subtasks(self):
+        self.assertEqual(names(drag_block(self.store, [self.get('a')])), ['A', 'A1'])
+        # 放在 B 之后，跳过 B 的子任务
+        self.move([self.get('a')], self.get('b'), True)
+        self.assertEqual(names(self.store), ['B', 'B1', 'B2', 'A', 'A1', '────', 'C'])
+
+    def test_drop_on_subtask_uses_parent_group(self):
+        self.move([self.get('c')], self.get('b1'), False)
+        self.assertEqual(names(self.store), ['A', 'A1', 'C', 'B', 'B1', 'B2', '────'])
+
+    def test_subtask_moves_among_siblings(self):
+        self.move([self.get('b2')], self.get('b1'), False)
+        self.assertEqual(names(self.store.children('b')), ['B2', 'B1'])
+
+    def test_multiple_rows(self):
+        header = {'completed_header': True}
+        rows = [self.get('a'), self.get('a1'), header, self.get('c')]
+        self.assertEqual(names(drag_block(self.store, rows)), ['A', 'A1', 'C'])
+        self.move(rows, self.get('s'), True)
+        self.assertEqual(names(self.store), ['B', 'B1', 'B2', '────', 'A', 'A1', 'C'])
+
+    def test_invalid_targets(self):
+        self.assertIsNone(self.move([self.get('a')], self.get('a1'), True))
+        self.assertIsNone(self.move([self.get('a')], {'completed_header': True}, False))
+        self.assertEqual(names(self.store), names(make_store()))
+
+
+if __name__ == '__main__':
+    unittest.main()
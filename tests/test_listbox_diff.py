@@ -0,0 +1,141 @@
+import unittest
+import random
+import sys
+sys.path.append('../')
+from todo_app.listbox_diff import apply_row_diff, diff_rows
+
+
+class FakeListbox:
+    """模拟 Tk Listbox 的行、颜色和选中状态，并记录调用次数"""
+
+    def __init__(self, rows=()):
+        self.items = [[row[1], row[2], row[3], False] for row in rows]
+        self.calls = 0  # Python 到 Tcl 的调用次数
+        self.tk = FakeTk(self)
+
+    def __str__(self):
+        return '.listbox'
+
+    def delete(self, first, last=None):
+        self.calls += 1
+        del self.items[first:(first if last is None else last) + 1]
+
+    def insert(self, index, *texts):
+        self.calls += 1
+        self.items[index:index] = [[text, '', '', False] for text in texts]
+
+    def itemconfig(self, index, options):
+        self.calls += 1
+        self.items[index][1] = options['bg']
+        self.items[index][2] = options['fg']
+
+    def selection_includes(self, index):
+        return self.items[index][3]
+
+    def selection_set(self, index):
+        self.items[index][3] = True
+
+    def rows(self):
+        return [tuple(item[:3]) for item in self.items]
+
+
+class FakeTk:
+    """模拟 tk.call：只支持 style_rows() 使用的 foreach itemconfigure 脚本"""
+
+    def __init__(self, listbox):
+        self.listbox = listbox
+
+    def call(self, command, names, values, script):
+        self.listbox.calls += 1
+        assert command == 'foreach' and script.startswith('.listbox itemconfigure')
+        for i in range(0, len(values), 3):
+            index, bg, fg = values[i:i + 3]
+            self.listbox.items[index][1] = bg
+            self.listbox.items[index][2] = fg
+
+
+def make_rows(keys, suffix=''):
+    return [(key, f"row {key}{suffix}", '#fff', '#000') for key in keys]
+
+
+class TestListboxDiff(unittest.TestCase):
+
+    def check(self, old_rows, new_rows, default_style=None):
+        listbox = FakeListbox(old_rows)
+        listbox.calls = 0
+        apply_row_diff(listbox, diff_rows(old_rows, new_rows), default_style)
+        if default_style is None:
+            self.assertEqual(listbox.rows(), [row[1:] for row in new_rows])
+        else:
+            # 没有单独设置颜色的行显示列表框自身的颜色
+            self.assertEqual([(text, bg or default_style[0], fg or default_style[1])
+                              for text, bg, fg in listbox.rows()],
+                             [row[1:] for row in new_rows])
+        return listbox
+
+    def test_unchanged_rows_do_nothing(self):
+        rows = make_rows(range(100))
+        self.assertEqual(diff_rows(rows, list(rows)), [])
+
+    def test_single_changes_touch_one_row(self):
+        rows = make_rows(range(100))
+        changed = list(rows)
+        changed[40] = (40, 'row 40', '#f00', '#fff')
+        self.assertEqual(diff_rows(rows, changed), [('update', 40, changed[40], False)])
+
+        inserted = rows[:10] + make_rows(['new']) + rows[10:]
+        self.assertEqual(diff_rows(rows, inserted), [('insert', 10, make_rows(['new']))])
+
+        removed = rows[:10] + rows[13:]
+        self.assertEqual(diff_rows(rows, removed), [('delete', 10, 12)])
+
+    def test_moved_row(self):
+        rows = make_rows(range(20))
+        moved = rows[:3] + rows[4:15] + [rows[3]] + rows[15:]
+        listbox = self.check(rows, moved)
+        self.assertEqual(listbox.calls, 3)  # 删除、插入、设置颜色
+
+    def test_styles_are_batched_into_one_call(self):
+        rows = [(i, f"row {i}", '#fff' if i % 2 else '#eee', '#000') for i in range(100)]
+        listbox = self.check([], rows)
+        self.assertEqual(listbox.calls, 2)  # 一次插入所有文本，一次设置所有颜色
+
+        # 与列表框默认样式相同的行不需要设置颜色
+        listbox = self.check([], rows, default_style=('#fff', '#000'))
+        self.assertEqual(listbox.calls, 2)
+        self.assertEqual(listbox.items[1][1:3], ['', ''])
+        listbox = self.check([], make_rows(range(100)), default_style=('#fff', '#000'))
+        self.assertEqual(listbox.calls, 1)
+
+    def test_selection_survives_text_update(self):
+        rows = make_rows(range(5))
+        listbox = FakeListbox(rows)
+        listbox.selection_set(1)
+        listbox.selection_set(3)
+        new_rows = rows[:1] + rows[2:] + make_rows([9])
+        new_rows[2] = (3, 'row 3 edited', '#fff', '#000')
+        apply_row_diff(listbox, diff_rows(rows, new_rows))
+        self.assertEqual([item[3] for item in listbox.items], [False, False, True, False, False])
+
+    def test_random_edits(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            old_keys = rng.sample(range(60), rng.randrange(0, 40))
+            new_keys = list(old_keys)
+            if rng.random() < 0.2:
+                rng.shuffle(new_keys)
+            for _ in range(rng.randrange(5)):
+                if new_keys and rng.random() < 0.5:
+                    new_keys.pop(rng.randrange(len(new_keys)))
+                else:
+                    key = rng.randrange(60, 100)
+                    if key not in new_keys:
+                        new_keys.insert(rng.randrange(len(new_keys) + 1), key)
+            new_rows = [(key, f"row {key}", '#fff', '#000' if rng.random() < 0.8 else '#888')
+                        for key in new_keys]
+            self.check(make_rows(old_keys), new_rows)
+            self.check(make_rows(old_keys), new_rows, default_style=('#fff', '#000'))
+
+
+if __name__ == '__main__':
+    unittest.main()
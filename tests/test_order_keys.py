@@ -0,0 +1,52 @@
+import unittest
+import random
+import sys
+sys.path.append('../')
+from todo_app.order_keys import FIRST_KEY, is_valid_key, key_between, keys_between
+
+
+class TestOrderKeys(unittest.TestCase):
+
+    def test_key_between_bounds(self):
+        self.assertEqual(key_between(None, None), FIRST_KEY)
+        after = key_between(FIRST_KEY, None)
+        before = key_between(None, FIRST_KEY)
+        self.assertLess(before, FIRST_KEY)
+        self.assertLess(FIRST_KEY, after)
+        middle = key_between(FIRST_KEY, after)
+        self.assertTrue(FIRST_KEY < middle < after)
+        with self.assertRaises(ValueError):
+            key_between(after, FIRST_KEY)
+
+    def test_random_inserts_stay_ordered_and_short(self):
+        rng = random.Random(3)
+        keys = [FIRST_KEY]
+        for _ in range(5000):
+            i = rng.randrange(len(keys) + 1)
+            low = keys[i - 1] if i > 0 else None
+            high = keys[i] if i < len(keys) else None
+            key = key_between(low, high)
+            self.assertTrue(is_valid_key(key), key)
+            keys.insert(i, key)
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertLessEqual(max(map(len, keys)), 8)
+
+    def test_keys_between(self):
+        for low, high in ((None, None), ('a0', None), (None, 'a0'), ('a0', 'a1'), ('a0', 'a0V')):
+            keys = keys_between(low, high, 100)
+            self.assertEqual(len(keys), 100)
+            bounded = ([low] if low else []) + keys + ([high] if high else [])
+            self.assertEqual(bounded, sorted(set(bounded)))
+            self.assertTrue(all(map(is_valid_key, keys)))
+        self.assertEqual(keys_between('a0', 'a1', 0), [])
+
+    def test_is_valid_key(self):
+        for key in ('a0', 'a0V', 'b00', 'Zz', 'zzzzzzzzzzzzzzzzzzzzzzzzzzz'):
+            self.assertTrue(is_valid_key(key), key)
+        for key in ('', None, 3, 'a', 'a00', 'b0', 'a0-', '0a', 'A' + '0' * 26):
+            self.assertFalse(is_valid_key(key), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
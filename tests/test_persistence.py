@@ -0,0 +1,47 @@
+import unittest
+import threading
+import sys
+sys.path.append('../')
+from todo_app.persistence import PersistenceWorker
+
+
+class TestPersistenceWorker(unittest.TestCase):
+
+    def test_burst_is_coalesced_into_one_write(self):
+        worker = PersistenceWorker(quiet_period=0.05)
+        writes = []
+        for i in range(10):
+            worker.mark_dirty('tasks', lambda i=i: writes.append(i))
+        worker.close()
+        self.assertEqual(writes, [9])
+
+    def test_flush_writes_every_key(self):
+        worker = PersistenceWorker(quiet_period=60)
+        writes = []
+        worker.mark_dirty('tasks', lambda: writes.append('tasks'))
+        worker.mark_dirty('config', lambda: writes.append('config'))
+        worker.flush()
+        self.assertEqual(sorted(writes), ['config', 'tasks'])
+        self.assertFalse(worker.has_pending())
+        worker.close()
+
+    def test_errors_are_reported(self):
+        errors = []
+        done = threading.Event()
+
+        def on_error(key, error):
+            errors.append((key, str(error)))
+            done.set()
+
+        def failing_writer():
+            raise OSError("disk full")
+
+        worker = PersistenceWorker(quiet_period=0, on_error=on_error)
+        worker.mark_dirty('tasks', failing_writer)
+        self.assertTrue(done.wait(5))
+        worker.close()
+        self.assertEqual(errors, [('tasks', 'disk full')])
+
+
+if __name__ == "__main__":
+    unittest.main()
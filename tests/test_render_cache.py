@@ -0,0 +1,48 @@
+import unittest
+import os
+import tempfile
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.render_cache import data_fingerprint, load_render_cache, save_render_cache
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tasks_file = Path(self.tmp_dir.name) / 'tasks.json'
+        self.tasks_file.write_text('[]', encoding='utf-8')
+        self.cache_file = Path(self.tmp_dir.name) / 'render_cache.json'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_roundtrip(self):
+        fingerprint = data_fingerprint([self.tasks_file], '{}')
+        rows = [('☐ 任务', '#ffffff', '#000000'), ('─' * 40, '', '#888888')]
+        save_render_cache(self.cache_file, fingerprint, 'To-Do (0/1)', '450x300+10+10', rows)
+
+        cache = load_render_cache(self.cache_file, fingerprint)
+        self.assertEqual([tuple(row) for row in cache['rows']], rows)
+        self.assertEqual(cache['title'], 'To-Do (0/1)')
+        self.assertEqual(cache['geometry'], '450x300+10+10')
+
+    def test_invalidated_by_data_or_config_change(self):
+        fingerprint = data_fingerprint([self.tasks_file], '{}')
+        save_render_cache(self.cache_file, fingerprint, 'To-Do', '', [])
+
+        self.assertIsNone(load_render_cache(self.cache_file, data_fingerprint([self.tasks_file], '{"dark_mode": true}')))
+        stat = self.tasks_file.stat()
+        os.utime(self.tasks_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        self.assertIsNone(load_render_cache(self.cache_file, data_fingerprint([self.tasks_file], '{}')))
+
+    def test_missing_or_corrupt_cache(self):
+        fingerprint = data_fingerprint([self.tasks_file], '')
+        self.assertIsNone(load_render_cache(self.cache_file, fingerprint))
+        self.cache_file.write_text('{not json', encoding='utf-8')
+        self.assertIsNone(load_render_cache(self.cache_file, fingerprint))
+
+
+if __name__ == '__main__':
+    unittest.main()
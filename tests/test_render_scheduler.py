@@ -0,0 +1,87 @@
+import unittest
+import sys
+sys.path.append('../')
+from todo_app.render_scheduler import (RENDER_BUTTONS, RENDER_LIST, RENDER_TITLE,
+                                       RenderScheduler)
+
+
+class FakeRoot:
+    """模拟 Tk 的 after_idle/after_cancel，run_idle() 相当于事件循环空闲一次"""
+
+    def __init__(self):
+        self.idle = {}
+        self.next_id = 0
+
+    def after_idle(self, callback):
+        self.next_id += 1
+        self.idle[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.idle.pop(after_id, None)
+
+    def run_idle(self):
+        callbacks, self.idle = list(self.idle.values()), {}
+        for callback in callbacks:
+            callback()
+
+
+class TestRenderScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.root = FakeRoot()
+        self.frames = []
+        self.scheduler = RenderScheduler(self.root, self.frames.append)
+
+    def test_burst_is_coalesced_into_one_frame(self):
+        for _ in range(100):
+            self.scheduler.request(RENDER_LIST | RENDER_TITLE)
+        self.scheduler.request(RENDER_BUTTONS)
+        self.assertEqual(self.frames, [])
+        self.root.run_idle()
+        self.assertEqual(self.frames, [RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS])
+
+        stats = self.scheduler.stats()
+        self.assertEqual(stats['frames'], 1)
+        self.assertEqual(stats['skipped_frames'], 100)
+
+        self.root.run_idle()
+        self.assertEqual(len(self.frames), 1)
+
+    def test_flush_renders_synchronously(self):
+        self.scheduler.request(RENDER_TITLE)
+        self.scheduler.request(RENDER_LIST)
+        self.scheduler.flush()
+        self.assertEqual(self.frames, [RENDER_LIST | RENDER_TITLE])
+        self.assertFalse(self.scheduler.pending)
+        self.root.run_idle()
+        self.assertEqual(len(self.frames), 1)
+
+    def test_request_during_render_goes_to_next_frame(self):
+        def render(flags):
+            self.frames.append(flags)
+            if len(self.frames) == 1:
+                self.scheduler.request(RENDER_BUTTONS)
+
+        self.scheduler.render = render
+        self.scheduler.request(RENDER_LIST)
+        self.root.run_idle()
+        self.root.run_idle()
+        self.assertEqual(self.frames, [RENDER_LIST, RENDER_BUTTONS])
+
+    def test_failed_frame_does_not_block_later_frames(self):
+        def render(flags):
+            raise RuntimeError('boom')
+
+        self.scheduler.render = render
+        self.scheduler.request(RENDER_LIST)
+        with self.assertRaises(RuntimeError):
+            self.root.run_idle()
+        self.scheduler.render = self.frames.append
+        self.scheduler.request(RENDER_TITLE)
+        self.root.run_idle()
+        self.assertEqual(self.frames, [RENDER_TITLE])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import random
+import sys
+sys.path.append('../')
+from todo_app.search_index import SearchOutline, TrigramIndex
+from todo_app.task_model import KIND_SEPARATOR, Task
+from todo_app.task_store import TaskStore
+
+
+def names(tasks):
+    return sorted(task.name for task in tasks)
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tasks = [Task('Buy milk'), Task('Write report'), Task('Report bug'),
+                      Task('写周报'), Task('─' * 10, KIND_SEPARATOR)]
+        self.index = TrigramIndex(self.tasks)
+
+    def test_search_before_and_after_build(self):
+        self.assertEqual(names(self.index.search('report')), ['Report bug', 'Write report'])
+        self.assertTrue(self.index.build())
+        self.assertEqual(self.index.pending, 0)
+        self.assertEqual(names(self.index.search('REPORT')), ['Report bug', 'Write report'])
+        self.assertEqual(names(self.index.search('周报')), ['写周报'])
+        self.assertEqual(names(self.index.search('k')), ['Buy milk'])
+        self.assertEqual(self.index.search('missing'), [])
+        # 分割线不参与搜索
+        self.assertEqual(self.index.search('───'), [])
+
+    def test_incremental_updates(self):
+        self.index.build()
+        task = self.tasks[0]
+        self.assertEqual(names(self.index.search('milk')), ['Buy milk'])
+        task.name = 'Buy bread'
+        self.index.add(task)
+        self.assertEqual(self.index.search('milk'), [])
+        self.assertEqual(names(self.index.search('bread')), ['Buy bread'])
+        self.index.discard(task)
+        self.assertEqual(self.index.search('bread'), [])
+        self.index.add(Task('More bread'))
+        self.assertEqual(names(self.index.search('bread')), ['More bread'])
+
+    def test_narrowing_uses_fresh_results_after_changes(self):
+        self.index.build()
+        self.assertEqual(len(self.index.search('re')), 2)
+        self.tasks[0].name = 'Reply'
+        self.index.add(self.tasks[0])
+        self.assertEqual(names(self.index.search('rep')), ['Reply', 'Report bug', 'Write report'])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        words = ['abc', 'bcd', 'aab', '任务', '会议', 'x']
+        tasks = [Task(' '.join(rng.choice(words) for _ in range(3))) for _ in range(300)]
+        index = TrigramIndex(tasks)
+        index.build(deadline=0)  # 只建立一部分
+        for step in range(200):
+            task = rng.choice(tasks)
+            if rng.random() < 0.5:
+                task.name = ' '.join(rng.choice(words) for _ in range(3))
+                index.add(task)
+            query = rng.choice(['ab', 'abc', 'bc a', '任务 ', 'x', 'abc bcd', 'b'])
+            expected = [t for t in tasks if query in t.name]
+            self.assertEqual(sorted(map(id, index.search(query))), sorted(map(id, expected)))
+
+
+class TestSearchOutline(unittest.TestCase):
+
+    def test_filter_keeps_parents_and_section_rows(self):
+        parent = Task('Parent', task_id='p')
+        child = Task('Child match', task_id='c', is_subtask=True, parent_task_id='p')
+        other = Task('Other', task_id='o')
+        separator = Task('─' * 10, KIND_SEPARATOR, task_id='s')
+        active = Task('Active match', task_id='a')
+        header = {'completed_header': True, 'section_id': 1}
+        done = Task('Done match', task_id='d', done=True)
+        display = [parent, child, other, separator, active, header, done]
+        store = TaskStore([parent, child, other, separator, active, done])
+
+        outline = SearchOutline(display)
+        self.assertEqual(outline.filter(store.search('match'), store.get),
+                         [parent, child, separator, active, header, done])
+        self.assertEqual(outline.filter(store.search('done'), store.get), [separator, header, done])
+        self.assertEqual(outline.filter(store.search('parent'), store.get), [parent])
+        self.assertEqual(outline.filter([], store.get), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import random
+import sys
+sys.path.append('../')
+from todo_app.selection import ROW_CANCELLED, ROW_STRUCTURE, IntervalSet, RowKinds
+
+
+class TestIntervalSet(unittest.TestCase):
+
+    def test_set_interface(self):
+        selection = IntervalSet([5, 1, 2, 3, 9])
+        self.assertEqual(selection.ranges(), [(1, 3), (5, 5), (9, 9)])
+        self.assertEqual(len(selection), 5)
+        self.assertIn(2, selection)
+        self.assertNotIn(4, selection)
+        self.assertEqual(selection.first(), 1)
+        selection.add(4)
+        self.assertEqual(selection.ranges(), [(1, 5), (9, 9)])
+        selection.remove(3)
+        self.assertEqual(list(selection), [1, 2, 4, 5, 9])
+        with self.assertRaises(KeyError):
+            selection.remove(3)
+        selection.clear()
+        self.assertFalse(selection)
+        self.assertIsNone(selection.first())
+
+    def test_from_sorted_matches_constructor(self):
+        indices = (0, 1, 2, 5, 7, 8, 9, 20)
+        self.assertEqual(IntervalSet.from_sorted(indices), IntervalSet(indices))
+        self.assertEqual(IntervalSet.from_sorted(indices).ranges(), [(0, 2), (5, 5), (7, 9), (20, 20)])
+        self.assertFalse(IntervalSet.from_sorted(()))
+
+    def test_select_all_is_one_range(self):
+        selection = IntervalSet()
+        selection.set_all(100000)
+        self.assertEqual(len(selection), 100000)
+        self.assertEqual(selection.ranges(), [(0, 99999)])
+        selection.discard_range(10, 19)
+        self.assertEqual(selection.ranges(), [(0, 9), (20, 99999)])
+
+    def test_row_edits_follow_listbox(self):
+        selection = IntervalSet([1, 2, 3, 7, 8])
+        selection.delete_rows(3, 6)  # 与 Listbox.delete(3, 6) 相同
+        self.assertEqual(selection.ranges(), [(1, 4)])
+        selection.insert_rows(2, 3)  # 插入的行不选中
+        self.assertEqual(selection.ranges(), [(1, 1), (5, 7)])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(5)
+        for _ in range(100):
+            selection, expected, n = IntervalSet(), set(), 60
+            for _ in range(60):
+                op = rng.randrange(6)
+                first = rng.randrange(n)
+                last = rng.randrange(first, min(n, first + 15))
+                if op == 0:
+                    selection.add_range(first, last)
+                    expected |= set(range(first, last + 1))
+                elif op == 1:
+                    selection.discard_range(first, last)
+                    expected -= set(range(first, last + 1))
+                elif op == 2:
+                    selection.delete_rows(first, last)
+                    shift = last - first + 1
+                    expected = {i if i < first else i - shift for i in expected if not first <= i <= last}
+                elif op == 3:
+                    count = rng.randrange(1, 5)
+                    selection.insert_rows(first, count)
+                    expected = {i if i < first else i + count for i in expected}
+                elif op == 4:
+                    selection.set_all(first)
+                    expected = set(range(first))
+                else:
+                    selection.discard(first)
+                    expected.discard(first)
+                self.assertEqual(list(selection), sorted(expected))
+                self.assertEqual(len(selection), len(expected))
+                self.assertEqual(IntervalSet(expected), selection)
+
+
+class TestRowKinds(unittest.TestCase):
+
+    def test_count_by_ranges(self):
+        rows = ['task', 'separator', 'cancelled', 'task', 'header', 'cancelled']
+        kinds = RowKinds(rows, lambda row: {'separator': ROW_STRUCTURE, 'header': ROW_STRUCTURE,
+                                            'cancelled': ROW_CANCELLED}.get(row, 0))
+        self.assertEqual(kinds.kind(1), ROW_STRUCTURE)
+        self.assertEqual(kinds.kind(2), ROW_CANCELLED)
+        self.assertEqual(kinds.kind(3), 0)
+        selection = IntervalSet()
+        selection.set_all(len(rows))
+        self.assertEqual(kinds.count(ROW_STRUCTURE, selection), 2)
+        self.assertEqual(kinds.count(ROW_CANCELLED, selection), 2)
+        selection = IntervalSet([0, 2, 3])
+        self.assertEqual(kinds.count(ROW_STRUCTURE, selection), 0)
+        self.assertEqual(kinds.count(ROW_CANCELLED, selection), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
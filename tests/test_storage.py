@@ -0,0 +1,387 @@
+import unittest
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+import sys
+sys.path.append('../')
+from todo_app.storage import (FileLock, JsonStorage, SerializationCache, SQLiteStorage, TaskJournal, apply_records,
+                              diff_tasks, iter_snapshot_tasks, iter_snapshot_text, open_storage, serialize_task)
+from todo_app.task_model import Task
+from todo_app.task_store import TaskStore
+
+
+def make_task(i, **fields):
+    return dict({'name': f"Task {i}", 'task_id': f"id-{i}"}, **fields)
+
+
+class TestTaskJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tasks_file = Path(self.tmp_dir.name) / 'tasks.json'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_diff_and_replay_roundtrip(self):
+        old = [make_task(i) for i in range(5)]
+        _, state, order = diff_tasks({}, [], old)
+        new = [make_task(3), make_task(4), make_task(9), make_task(0, done=True), make_task(1)]
+        records, _, _ = diff_tasks(state, order, new)
+        replayed = apply_records([serialize_task(t) for t in old], records)
+        self.assertEqual([serialize_task(t) for t in replayed], [serialize_task(t) for t in new])
+
+    def test_append_and_replay(self):
+        tasks = [make_task(1), make_task(2)]
+        self.tasks_file.write_text(json.dumps([serialize_task(t) for t in tasks]), encoding='utf-8')
+        journal = TaskJournal(self.tasks_file)
+        journal.reset(tasks)
+
+        tasks[0]['done'] = True
+        tasks.append(make_task(3))
+        self.assertEqual(journal.append(tasks), 2)
+        self.assertEqual(journal.append(tasks), 0)
+
+        loaded = json.loads(self.tasks_file.read_text(encoding='utf-8'))
+        replayed = TaskJournal.replay(self.tasks_file, loaded)
+        self.assertEqual([t['task_id'] for t in replayed], ['id-1', 'id-2', 'id-3'])
+        self.assertTrue(replayed[0]['done'])
+
+    def test_torn_record_is_dropped(self):
+        tasks = [make_task(1)]
+        journal = TaskJournal(self.tasks_file)
+        journal.reset([])
+        journal.append(tasks)
+        with open(journal.path, 'ab') as f:
+            f.write(TaskJournal.encode_record({'op': 'remove', 'id': 'id-1'}).encode('utf-8')[:-5])
+
+        replayed = TaskJournal.replay(self.tasks_file, [])
+        self.assertEqual([t['task_id'] for t in replayed], ['id-1'])
+        records, size, corrupted = TaskJournal.read_records(journal.path)
+        self.assertEqual(len(records), 1)
+        self.assertFalse(corrupted)
+        self.assertEqual(size, journal.path.stat().st_size)
+
+    def test_compaction_writes_snapshot(self):
+        tasks = [make_task(i) for i in range(3)]
+        journal = TaskJournal(self.tasks_file)
+        journal.reset([])
+        journal.append(tasks)
+        journal.compact_in_background()
+        journal.close()
+
+        self.assertFalse(journal.path.exists())
+        self.assertFalse(journal.compacting_path.exists())
+        snapshot = json.loads(self.tasks_file.read_text(encoding='utf-8'))
+        self.assertEqual([t['task_id'] for t in snapshot], ['id-0', 'id-1', 'id-2'])
+
+
+class TestCompactFormat(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tasks_file = Path(self.tmp_dir.name) / 'tasks.json'
+        self.tasks = [make_task(i, done=(i % 3 == 0), deadline='2026-05-01' if i % 7 == 0 else '')
+                      for i in range(200)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_compact_and_compressed_roundtrip(self):
+        expected = [serialize_task(t) for t in self.tasks]
+        for compress in (False, True):
+            JsonStorage(self.tasks_file, compact=True, compress=compress).save(self.tasks)
+            loaded = JsonStorage(self.tasks_file).load()
+            self.assertEqual([serialize_task(t) for t in loaded], expected)
+
+    def test_compact_format_is_smaller(self):
+        JsonStorage(self.tasks_file).save(self.tasks)
+        legacy_size = self.tasks_file.stat().st_size
+        JsonStorage(self.tasks_file, compact=True).save(self.tasks)
+        compact_size = self.tasks_file.stat().st_size
+        JsonStorage(self.tasks_file, compact=True, compress=True).save(self.tasks)
+        compressed_size = self.tasks_file.stat().st_size
+        self.assertLess(compact_size * 4, legacy_size)
+        self.assertLess(compressed_size, compact_size)
+
+    def test_reads_legacy_format(self):
+        self.tasks_file.write_text(json.dumps([{'name': 'Old', 'done': True}]), encoding='utf-8')
+        loaded = JsonStorage(self.tasks_file, compact=True).load()
+        self.assertEqual(loaded[0]['name'], 'Old')
+        self.assertTrue(loaded[0]['done'])
+
+
+class TestStreamingLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tasks_file = Path(self.tmp_dir.name) / 'tasks.json'
+        self.tasks = [make_task(i, name=f"任务 {i}", done=(i % 2 == 0)) for i in range(250)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_streams_every_format_in_chunks(self):
+        expected = [serialize_task(t) for t in self.tasks]
+        for compact, compress in ((False, False), (True, False), (True, True)):
+            JsonStorage(self.tasks_file, compact=compact, compress=compress).save(self.tasks)
+            # 很小的块大小，确保多字节字符和任务对象都会被块边界切开
+            chunks = list(iter_snapshot_tasks(iter_snapshot_text(self.tasks_file, block_size=7), chunk_size=100))
+            self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 50])
+            streamed = [serialize_task(t) for chunk in chunks for t in chunk]
+            self.assertEqual(streamed, expected)
+
+    def test_finish_load_replays_journal(self):
+        storage = JsonStorage(self.tasks_file, journal=True)
+        storage.save(self.tasks)
+        self.tasks[0]['urgent'] = True
+        storage.save(self.tasks)
+
+        streaming = JsonStorage(self.tasks_file, journal=True)
+        tasks = [t for chunk in streaming.iter_load(64) for t in chunk]
+        tasks = streaming.finish_load(tasks)
+        self.assertTrue(tasks[0]['urgent'])
+
+
+class TestSQLiteStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp_dir.name) / 'tasks.db'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_roundtrip_preserves_order_and_fields(self):
+        tasks = [make_task(1, urgent=True), {'name': '───', 'separator': True, 'task_id': 'sep'},
+                 make_task(2, is_subtask=True, parent_task_id='id-1', deadline='2026-01-01')]
+        storage = SQLiteStorage(self.db_path)
+        storage.save(tasks)
+        storage.close()
+
+        loaded = SQLiteStorage(self.db_path).load()
+        self.assertEqual([serialize_task(t) for t in loaded], [serialize_task(t) for t in tasks])
+
+    def test_single_task_change_updates_one_row(self):
+        tasks = [make_task(i) for i in range(100)]
+        storage = SQLiteStorage(self.db_path)
+        storage.save(tasks)
+
+        before = storage.conn.total_changes
+        tasks[50]['done'] = True
+        storage.save(tasks)
+        self.assertEqual(storage.conn.total_changes - before, 1)
+
+        before = storage.conn.total_changes
+        tasks.insert(10, tasks.pop(80))
+        storage.save(tasks)
+        self.assertEqual(storage.conn.total_changes - before, 1)
+        self.assertEqual([t['task_id'] for t in storage.load()], [t['task_id'] for t in tasks])
+        storage.close()
+
+    def test_move_by_order_key_writes_one_task(self):
+        store = TaskStore(Task(f"Task {i}", task_id=f"id-{i}") for i in range(100))
+        store.take_rekeyed()
+        storage = SQLiteStorage(self.db_path)
+        storage.save(list(store))
+
+        before = storage.conn.total_changes
+        store.move([store.get('id-80')], 10)
+        dirty_ids = {task.task_id for task in store.take_rekeyed()}
+        self.assertEqual(dirty_ids, {'id-80'})
+        storage.save(list(store), dirty_ids)
+        # 排序键和位置都只写入被移动的那一行
+        self.assertLessEqual(storage.conn.total_changes - before, 2)
+        storage.close()
+
+        loaded = TaskStore(Task.from_dict(data) for data in SQLiteStorage(self.db_path).load())
+        self.assertEqual([task.task_id for task in loaded], [task.task_id for task in store])
+        self.assertEqual([task.order_key for task in loaded], [task.order_key for task in store])
+        self.assertEqual(loaded.take_rekeyed(), [])
+
+    def test_migrates_existing_tasks_json(self):
+        tasks_file = Path(self.tmp_dir.name) / 'tasks.json'
+        JsonStorage(tasks_file).save([make_task(1), make_task(2)])
+
+        storage = open_storage(tasks_file, backend='sqlite')
+        self.assertIsInstance(storage, SQLiteStorage)
+        self.assertEqual([t['task_id'] for t in storage.load()], ['id-1', 'id-2'])
+        self.assertFalse(tasks_file.exists())
+        storage.close()
+
+
+class TestSaveSkipping(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tasks_file = Path(self.tmp_dir.name) / 'tasks.json'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_unchanged_content_is_not_rewritten(self):
+        storage = JsonStorage(self.tasks_file)
+        tasks = [make_task(i) for i in range(10)]
+        storage.save(tasks)
+        mtime = self.tasks_file.stat().st_mtime_ns
+        storage.save(tasks)
+        storage.save([dict(task) for task in tasks])
+        self.assertEqual(self.tasks_file.stat().st_mtime_ns, mtime)
+        self.assertEqual((storage.stats.attempted, storage.stats.performed, storage.stats.skipped), (3, 1, 2))
+        self.assertEqual(storage.stats.bytes_written, self.tasks_file.stat().st_size)
+
+        tasks[3]['done'] = True
+        storage.save(tasks, dirty_ids={'id-3'})
+        self.assertEqual(storage.stats.performed, 2)
+        self.assertTrue(json.loads(self.tasks_file.read_text(encoding='utf-8'))[3]['done'])
+
+    def test_cache_only_reserializes_dirty_tasks(self):
+        cache = SerializationCache()
+        tasks = [make_task(i) for i in range(3)]
+        first = cache.serialize(tasks)
+        tasks[1]['urgent'] = True
+        second = cache.serialize(tasks, dirty_ids={'id-1'})
+        self.assertIs(second[0], first[0])
+        self.assertIsNot(second[1], first[1])
+        self.assertTrue(second[1]['urgent'])
+        # 被替换的任务对象即使不在 dirty_ids 中也会重新序列化
+        tasks[2] = make_task(2, done=True)
+        self.assertTrue(cache.serialize(tasks, dirty_ids=set())[2]['done'])
+        self.assertEqual(cache.serialized_ids, {'id-2'})
+
+    def test_cache_reserializes_edited_task_objects(self):
+        cache = SerializationCache()
+        tasks = [Task(f"Task {i}", task_id=f"id-{i}") for i in range(3)]
+        first = cache.serialize(tasks)
+        tasks[1]['done'] = True  # 字典接口的修改使 version 加一
+        second = cache.serialize(tasks, dirty_ids=set())
+        self.assertIs(second[0], first[0])
+        self.assertTrue(second[1]['done'])
+        self.assertEqual(cache.serialized_ids, {'id-1'})
+
+    def test_corrupt_snapshot_loads_empty(self):
+        storage = JsonStorage(self.tasks_file, compress=True)
+        storage.save([make_task(i) for i in range(10)])
+        data = self.tasks_file.read_bytes()
+        self.tasks_file.write_bytes(data[:len(data) // 2])
+        self.assertEqual(JsonStorage(self.tasks_file).load(), [])
+
+        self.tasks_file.write_text(json.dumps({'format': 99, 'tasks': []}), encoding='utf-8')
+        self.assertEqual(JsonStorage(self.tasks_file).load(), [])
+
+    def test_journal_and_sqlite_skip_empty_diffs(self):
+        tasks = [make_task(i) for i in range(5)]
+        journal_storage = JsonStorage(self.tasks_file, journal=True)
+        journal_storage.save(tasks)
+        journal_storage.save(tasks, dirty_ids=set())
+        self.assertEqual(journal_storage.stats.skipped, 1)
+        journal_storage.close()
+
+        sqlite_storage = SQLiteStorage(Path(self.tmp_dir.name) / 'tasks.db')
+        sqlite_storage.save(tasks)
+        sqlite_storage.save(tasks)
+        self.assertEqual((sqlite_storage.stats.performed, sqlite_storage.stats.skipped), (1, 1))
+        sqlite_storage.close()
+
+
+class TestMultiProcessMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tasks_file = Path(self.tmp_dir.name) / 'tasks.json'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check_concurrent_edits_are_merged(self, open_one):
+        first = open_one()
+        first.save([make_task(i) for i in range(4)])
+        ours = first.load()
+        other = open_one()
+        theirs = other.load()
+        # 模拟文件修改时间的精度不足以区分两次写入
+        time.sleep(0.01)
+
+        theirs[1]['done'] = True
+        theirs.append(make_task(9))
+        del theirs[3]
+        self.assertIsNone(other.save(theirs))
+
+        ours[2]['urgent'] = True
+        records = first.save(ours)
+        self.assertEqual({(r['op'], r['id']) for r in records},
+                         {('update', 'id-1'), ('add', 'id-9'), ('remove', 'id-3')})
+        ours = apply_records(ours, records)
+        self.assertEqual([t['task_id'] for t in ours], ['id-0', 'id-1', 'id-2', 'id-9'])
+
+        merged = open_one().load()
+        self.assertEqual([t['task_id'] for t in merged], ['id-0', 'id-1', 'id-2', 'id-9'])
+        self.assertTrue(merged[1]['done'])
+        self.assertTrue(merged[2]['urgent'])
+        for storage in (first, other):
+            storage.close()
+
+    def test_json_concurrent_edits_are_merged(self):
+        self.check_concurrent_edits_are_merged(lambda: JsonStorage(self.tasks_file))
+
+    def test_journal_concurrent_edits_are_merged(self):
+        self.check_concurrent_edits_are_merged(lambda: JsonStorage(self.tasks_file, journal=True))
+
+    def test_sqlite_concurrent_edits_are_merged(self):
+        self.check_concurrent_edits_are_merged(lambda: SQLiteStorage(Path(self.tmp_dir.name) / 'tasks.db'))
+
+    def test_conflicting_field_keeps_local_value(self):
+        first = JsonStorage(self.tasks_file)
+        first.save([make_task(1)])
+        ours = first.load()
+        other = JsonStorage(self.tasks_file)
+        theirs = other.load()
+        time.sleep(0.01)
+        theirs[0]['name'] = 'theirs'
+        theirs[0]['urgent'] = True
+        other.save(theirs)
+
+        ours[0]['name'] = 'ours'
+        first.save(ours)
+        merged = JsonStorage(self.tasks_file).load()
+        self.assertEqual(merged[0]['name'], 'ours')
+        self.assertTrue(merged[0]['urgent'])
+
+    def test_read_external_changes(self):
+        first = JsonStorage(self.tasks_file)
+        first.save([make_task(1), make_task(2)])
+        first.load()
+        self.assertFalse(first.has_external_changes())
+
+        other = JsonStorage(self.tasks_file)
+        theirs = other.load()
+        time.sleep(0.01)
+        theirs[0]['deadline'] = '2030-01-01'
+        other.save(theirs)
+
+        self.assertTrue(first.has_external_changes())
+        records = first.read_external_changes()
+        self.assertEqual(records, [{'op': 'update', 'id': 'id-1', 'set': {'deadline': '2030-01-01'}}])
+        self.assertFalse(first.has_external_changes())
+
+    def test_file_lock_is_reentrant_and_exclusive(self):
+        lock = FileLock(Path(self.tmp_dir.name) / 'tasks.json.lock')
+        acquired = threading.Event()
+
+        def other_thread():
+            with lock:
+                acquired.set()
+
+        with lock:
+            with lock:
+                thread = threading.Thread(target=other_thread)
+                thread.start()
+                self.assertFalse(acquired.wait(0.05))
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import json
+import sys
+import tracemalloc
+sys.path.append('../')
+from todo_app.storage import serialize_task
+from todo_app.task_model import KIND_SEPARATOR, KIND_TASK, KIND_TITLE, Task, to_task
+
+
+class TestTask(unittest.TestCase):
+
+    def test_roundtrip(self):
+        data = serialize_task({'name': 'Task 1', 'task_id': 'id-1', 'done': True, 'urgent': True,
+                               'completed_time': '2024-01-01 10:00', 'deadline': '2024-02-01',
+                               'is_subtask': True, 'parent_task_id': 'id-0', 'custom_bg_color': '#ffffff'})
+        task = Task.from_dict(data)
+        self.assertEqual(task.to_dict(), data)
+        self.assertEqual(serialize_task(task), data)
+        self.assertEqual(list(task.to_dict()), list(data))
+
+    def test_kind(self):
+        self.assertEqual(Task.from_dict({'name': 'a'}).kind, KIND_TASK)
+        self.assertEqual(Task.from_dict({'name': '-', 'separator': True}).kind, KIND_SEPARATOR)
+        separator = Task.from_dict({'name': '- A -', 'separator': True, 'title': True})
+        self.assertEqual(separator.kind, KIND_TITLE)
+        self.assertTrue(separator['separator'])
+
+        separator['title'] = False
+        self.assertEqual(separator.kind, KIND_SEPARATOR)
+        separator['separator'] = False
+        self.assertEqual(separator.kind, KIND_TASK)
+        self.assertFalse(separator.to_dict()['title'])
+
+    def test_dict_compatibility(self):
+        task = Task('Task', task_id='id-1')
+        self.assertEqual(task['name'], 'Task')
+        self.assertFalse(task.get('done', False))
+        self.assertNotIn('deadline', task)
+        self.assertFalse(task.get('completed_header', False))
+
+        task['deadline'] = '2024-02-01'
+        self.assertIn('deadline', task)
+        self.assertEqual(task.pop('deadline', None), '2024-02-01')
+        self.assertEqual(task.deadline, '')
+
+        task.update({'done': True, 's': 1})
+        self.assertTrue(task.done)
+        self.assertEqual(task['s'], 1)
+        self.assertEqual(dict(task), {'name': 'Task', 'done': True, 'task_id': 'id-1', 's': 1})
+        with self.assertRaises(KeyError):
+            task['missing']
+
+    def test_identity_equality(self):
+        a = Task('Same', task_id='x')
+        b = Task('Same', task_id='x')
+        tasks = [a, b]
+        tasks.remove(b)
+        self.assertIs(tasks[0], a)
+
+    def test_repeated_strings_are_interned(self):
+        records = json.loads(json.dumps([{'name': str(i), 'deadline': '2024-02-01',
+                                          'custom_bg_color': '#ffe0e0'} for i in range(2)]))
+        first, second = (Task.from_dict(record) for record in records)
+        self.assertIs(first.deadline, second.deadline)
+        self.assertIs(first.custom_bg_color, second.custom_bg_color)
+
+    def test_version_changes_on_edit(self):
+        task = Task.from_dict({'name': 'a'})
+        version = task.version
+        task['done'] = True
+        self.assertGreater(task.version, version)
+        version = task.version
+        task.pop('done')
+        self.assertGreater(task.version, version)
+        version = task.version
+        task.touch()
+        self.assertGreater(task.version, version)
+        self.assertNotIn('version', task.to_dict())
+
+    def test_to_task(self):
+        task = Task('a')
+        self.assertIs(to_task(task), task)
+        self.assertIsInstance(to_task({'name': 'b'}), Task)
+
+    def test_smaller_than_dict(self):
+        text = json.dumps([serialize_task({'name': f"Task {i}", 'task_id': f"id-{i}"}) for i in range(1000)])
+
+        def allocated(load):
+            tracemalloc.start()
+            tasks = load(text)
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del tasks
+            return size
+
+        as_dicts = allocated(json.loads)
+        as_tasks = allocated(lambda text: [Task.from_dict(data) for data in json.loads(text)])
+        self.assertLess(as_tasks, as_dicts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+from datetime import date
+sys.path.append('../')
+from todo_app.task_model import KIND_SEPARATOR, KIND_TITLE, Task
+from todo_app.task_query import QueryError, compile_query
+from todo_app.task_store import TaskStore
+
+TODAY = date(2024, 3, 10).toordinal()
+
+
+def make_store():
+    return TaskStore([
+        Task('A', task_id='a', urgent=True, deadline='2024-03-11'),
+        Task('A1', task_id='a1', is_subtask=True, parent_task_id='a', done=True, cancelled=True),
+        Task('── WORK ──', KIND_TITLE, task_id='s1'),
+        Task('B', task_id='b', custom_bg_color='#FF0000', deadline='2024-03-01'),
+        Task('B1', task_id='b1', is_subtask=True, parent_task_id='b', done=True,
+             completed_time='2024-05-02 10:00'),
+        Task('C', task_id='c', cancelled=True),
+        Task('────', KIND_SEPARATOR, task_id='s2'),
+        Task('D', task_id='d', urgent=True, deadline='2024-03-20'),
+    ])
+
+
+class TestTaskQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.store = make_store()
+
+    def run_query(self, text):
+        return sorted(task.name for task in compile_query(text).run(self.store, TODAY))
+
+    def test_field_conditions(self):
+        self.assertEqual(self.run_query('urgent and due<=3'), ['A'])
+        self.assertEqual(self.run_query('overdue'), ['B'])
+        self.assertEqual(self.run_query('deadline>=2024-03-11'), ['A', 'D'])
+        self.assertEqual(self.run_query('completed_time>=2024-05'), ['B1'])
+        self.assertEqual(self.run_query('color:#ff0000'), ['B'])
+        self.assertEqual(self.run_query('done:false and not urgent'), ['B', 'C'])
+
+    def test_section_and_parent(self):
+        self.assertEqual(self.run_query('cancelled section:work'), ['C'])
+        self.assertEqual(self.run_query('section!=work'), ['A', 'A1', 'D'])
+        self.assertEqual(self.run_query('is_subtask parent.custom_bg_color'), ['B1'])
+        self.assertEqual(self.run_query('parent.urgent'), ['A1'])
+
+    def test_boolean_operators(self):
+        self.assertEqual(self.run_query('urgent or subtask'), ['A', 'A1', 'B1', 'D'])
+        self.assertEqual(self.run_query('not (done or urgent)'), ['B', 'C'])
+
+    def test_results_follow_store_changes(self):
+        query = compile_query('urgent')
+        self.store.get('b')['urgent'] = True
+        self.store.remove(self.store.get('a'))
+        self.assertEqual(sorted(task.name for task in query.run(self.store, TODAY)), ['B', 'D'])
+
+    def test_compiled_once(self):
+        self.assertIs(compile_query('urgent and due<=3'), compile_query('urgent and due<=3'))
+
+    def test_invalid_queries(self):
+        for text in ['', 'unknown', 'due', '(done', 'done)', 'deadline<2024', 'and done', 'done:maybe']:
+            with self.assertRaises(QueryError, msg=text):
+                compile_query(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,300 @@
+import unittest
+import random
+from datetime import date
+import sys
+sys.path.append('../')
+from todo_app.task_model import KIND_SEPARATOR, Task
+from todo_app.task_store import TaskStore
+
+
+def make_store():
+    return TaskStore([
+        Task('A', task_id='a'),
+        Task('A1', task_id='a1', is_subtask=True, parent_task_id='a'),
+        Task('B', task_id='b'),
+        Task('A2', task_id='a2', is_subtask=True, parent_task_id='a'),
+    ])
+
+
+def names(tasks):
+    return [task.name for task in tasks]
+
+
+class TestTaskStore(unittest.TestCase):
+
+    def test_indexes_built_from_list(self):
+        store = make_store()
+        self.assertEqual(store.get('b').name, 'B')
+        self.assertIsNone(store.get('missing'))
+        self.assertEqual(names(store.children('a')), ['A1', 'A2'])
+        self.assertEqual(store.children('b'), ())
+
+    def test_add_and_remove(self):
+        store = make_store()
+        store.append(Task('A3', task_id='a3', is_subtask=True, parent_task_id='a'))
+        store.insert(1, Task('A0', task_id='a0', is_subtask=True, parent_task_id='a'))
+        self.assertEqual(names(store.children('a')), ['A0', 'A1', 'A2', 'A3'])
+
+        store.remove(store.get('a1'))
+        del store[store.index(store.get('a2'))]
+        store.pop()
+        self.assertEqual(names(store.children('a')), ['A0'])
+        self.assertIsNone(store.get('a1'))
+        self.assertIsNone(store.get('a3'))
+
+    def test_move_keeps_children_in_list_order(self):
+        store = make_store()
+        task = store.pop(3)  # A2 移到 A1 之前
+        store.insert(1, task)
+        self.assertEqual(names(store.children('a')), ['A2', 'A1'])
+
+    def test_move_block(self):
+        store = make_store()
+        store.append(Task('C', task_id='c'))
+        a = store.get('a')
+        store.move([a, *store.children('a')], 4)  # A 连同子任务移到 C 之前
+        self.assertEqual(names(store), ['B', 'A', 'A1', 'A2', 'C'])
+        self.assertEqual([store.index(task) for task in store], list(range(5)))
+        store.move([store.get('a2')], 2)  # A2 移到 A1 之前
+        self.assertEqual(names(store.children('a')), ['A2', 'A1'])
+        self.assertEqual(store.verify_counters(), [])
+
+    def test_slice_assignment_and_extend(self):
+        store = make_store()
+        store[2:2] = [Task('A9', task_id='a9', is_subtask=True, parent_task_id='a')]
+        store.extend([Task('C', task_id='c')])
+        self.assertEqual(names(store.children('a')), ['A1', 'A9', 'A2'])
+        self.assertEqual(store.get('c').name, 'C')
+
+        store[:] = [Task('D', task_id='d')]
+        self.assertEqual(store.children('a'), ())
+        self.assertIsNone(store.get('a'))
+
+    def test_reindex_after_edit(self):
+        store = make_store()
+        task = store.get('a2')
+        task.parent_task_id = 'b'
+        store.reindex(task)
+        self.assertEqual(names(store.children('a')), ['A1'])
+        self.assertEqual(names(store.children('b')), ['A2'])
+
+        task = store.get('b')
+        task.task_id = 'b-new'
+        store.reindex(task)
+        self.assertIsNone(store.get('b'))
+        self.assertIs(store.get('b-new'), task)
+
+    def test_identical_tasks_are_distinct(self):
+        first, second = Task('Same'), Task('Same')
+        store = TaskStore([first, second])
+        store.remove(second)
+        self.assertEqual(len(store), 1)
+        self.assertIs(store[0], first)
+
+    def test_index_and_contains_by_identity(self):
+        first, second = Task('Same'), Task('Same')
+        store = TaskStore([Task('A'), first, second])
+        self.assertEqual(store.index(second), 2)
+        self.assertNotIn(Task('Same'), store)
+        self.assertNotIn({'completed_header': True}, store)
+        with self.assertRaises(ValueError):
+            store.index(Task('Same'))
+
+        store.insert(0, store.pop(2))
+        self.assertEqual(store.index(second), 0)
+        self.assertEqual(store.index(first), 2)
+
+    def test_remove_many(self):
+        tasks = [Task('Same') for _ in range(6)]
+        store = TaskStore(tasks)
+        store.remove_many([tasks[4], tasks[1], Task('Same')])
+        self.assertEqual([id(task) for task in store], [id(tasks[i]) for i in (0, 2, 3, 5)])
+        self.assertNotIn(tasks[1], store)
+        self.assertEqual(store.index(tasks[5]), 3)
+
+    def test_deadline_index_follows_store(self):
+        store = make_store()
+        store.append(Task('C', task_id='c', deadline='2024-01-02'))
+        store.insert(0, Task('D', task_id='d', deadline='2024-01-01'))
+        overdue = store.deadlines.overdue(date(2024, 2, 1).toordinal())
+        self.assertEqual(names(overdue), ['D', 'C'])
+
+        store.get('c')['done'] = True
+        store.remove(store.get('d'))
+        self.assertEqual(len(store.deadlines), 0)
+
+    def test_search_index_follows_store(self):
+        store = make_store()
+        store.build_search_index()
+        store.append(Task('Search me', task_id='c'))
+        self.assertEqual(names(store.search('search')), ['Search me'])
+
+        store.get('c')['name'] = 'Renamed'
+        self.assertEqual(store.search('search'), [])
+        self.assertEqual(names(store.search('renamed')), ['Renamed'])
+        store.remove(store.get('c'))
+        self.assertEqual(store.search('renamed'), [])
+
+    def test_flag_index_and_version(self):
+        store = make_store()
+        version = store.version
+        store.get('b')['urgent'] = True
+        self.assertGreater(store.version, version)
+        self.assertEqual(names(store.flagged('urgent')), ['B'])
+        store.get('b')['done'] = True
+        store.remove(store.get('b'))
+        self.assertEqual(store.flagged('urgent'), [])
+        self.assertEqual(store.flagged('done'), [])
+        self.assertEqual(store.verify_counters(), [])
+
+    def test_counters_follow_field_edits(self):
+        store = make_store()
+        store.append(Task('sep', KIND_SEPARATOR, task_id='s'))
+        store.append(Task('C', task_id='c', urgent=True))
+        self.assertEqual(store.counts.main, 3)
+        self.assertEqual(store.urgent_count, 1)
+
+        store.get('b')['done'] = True
+        store.get('c')['cancelled'] = True
+        store.get('a1')['done'] = True
+        self.assertEqual((store.counts.done, store.counts.cancelled, store.counts.finished), (1, 1, 2))
+        self.assertEqual(store.section_counts(0).finished, 1)
+        self.assertEqual(store.section_counts(1).finished, 1)
+        self.assertEqual(store.subtask_counts('a'), (2, 1))
+        self.assertEqual(store.parents_with_all_subtasks_done(), [])
+        store.get('a2')['done'] = True
+        self.assertEqual(store.parents_with_all_subtasks_done(), ['a'])
+
+        # 在中间插入分割线后，分组计数在下一次读取时重新统计
+        store.insert(2, Task('sep2', KIND_SEPARATOR, task_id='s2'))
+        self.assertEqual(store.section_counts(0).finished, 0)
+        self.assertEqual(store.section_counts(1).finished, 1)
+        self.assertEqual(store.verify_counters(), [])
+
+    def test_counters_follow_random_edits(self):
+        rng = random.Random(5)
+        store = TaskStore(Task(str(i), task_id=str(i)) for i in range(30))
+        for step in range(300):
+            op = rng.randrange(6)
+            task = rng.choice(store)
+            if op == 0:
+                task['done'] = not task['done']
+            elif op == 1:
+                task['urgent'] = not task['urgent']
+            elif op == 2:
+                task['cancelled'] = not task['cancelled']
+            elif op == 3:
+                store.insert(rng.randrange(len(store)), store.pop(rng.randrange(len(store))))
+            elif op == 4:
+                kind = KIND_SEPARATOR if rng.random() < 0.3 else 0
+                store.insert(rng.randrange(len(store) + 1), Task('new', kind, task_id=f"n{step}"))
+            else:
+                task['is_subtask'] = True
+                task['parent_task_id'] = rng.choice(store).task_id
+            if step % 10 == 0:
+                store.section_counts(0)
+            self.assertEqual(store.verify_counters(), [])
+
+    def test_section_counts_maintained_without_recount(self):
+        rng = random.Random(3)
+        store = TaskStore(Task(str(i), KIND_SEPARATOR if i % 7 == 3 else 0, task_id=str(i))
+                          for i in range(40))
+        recount = store._count_sections
+        store._count_sections = lambda: self.fail("sections recounted")
+        for step in range(400):
+            op = rng.randrange(8)
+            if op == 0:
+                kind = KIND_SEPARATOR if rng.random() < 0.3 else 0
+                store.insert(rng.randrange(len(store) + 1), Task('new', kind, task_id=f"n{step}"))
+            elif op == 1 and len(store) > 10:
+                store.pop(rng.randrange(len(store)))
+            elif op == 2:
+                store.move(rng.sample(list(store), rng.randint(1, 4)), rng.randrange(len(store) + 1))
+            elif op == 3 and len(store) > 10:
+                store.remove_many(rng.sample(list(store), 3))
+            elif op == 4:
+                start = rng.randrange(len(store))
+                store[start:start + 2] = [Task('new', KIND_SEPARATOR if rng.random() < 0.3 else 0,
+                                               task_id=f"s{step}-{i}") for i in range(rng.randint(0, 3))]
+            elif op == 5 and len(store) > 10:
+                start = rng.randrange(len(store))
+                del store[start:start + rng.randint(1, 3)]
+            elif op == 6:
+                task = rng.choice(store)
+                task['kind'] = 0 if task.kind == KIND_SEPARATOR else KIND_SEPARATOR
+            else:
+                rng.choice(store)['done'] = rng.random() < 0.5
+            store._count_sections = recount
+            self.assertEqual(store.verify_counters(), [])
+            store._count_sections = lambda: self.fail("sections recounted")
+
+    def test_positions_follow_random_edits(self):
+        rng = random.Random(1)
+        store = TaskStore(Task(str(i), task_id=str(i)) for i in range(50))
+        for step in range(300):
+            op = rng.randrange(4)
+            if op == 0:
+                store.insert(rng.randrange(-5, len(store) + 5), Task('new', task_id=f"n{step}"))
+            elif op == 1 and store:
+                store.pop(rng.randrange(-len(store), len(store)))
+            elif op == 2 and store:
+                task = store.pop(rng.randrange(len(store)))
+                store.insert(rng.randrange(len(store) + 1), task)
+            elif store:
+                store.remove_many(rng.sample(list(store), min(3, len(store))))
+            task = rng.choice(store) if store else None
+            if task is not None:
+                self.assertIs(store[store.index(task)], task)
+        self.assertEqual([store.index(task) for task in store], list(range(len(store))))
+
+    def test_order_keys_follow_list_order(self):
+        store = make_store()
+        keys = [task.order_key for task in store]
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertEqual(len(store.take_rekeyed()), 4)  # 没有排序键的任务在加载时分配
+
+        b, a2 = store.get('b'), store.get('a2')
+        store.move([a2], 0)
+        store.insert(1, Task('C', task_id='c'))
+        self.assertEqual([task.order_key for task in store], sorted(task.order_key for task in store))
+        # 只有移动和插入的任务的键改变
+        self.assertEqual(sorted(task.task_id for task in store.take_rekeyed()), ['a2', 'c'])
+        self.assertEqual(store.get('b'), b)
+        self.assertEqual(store.take_rekeyed(), [])
+        self.assertEqual(store.verify_counters(), [])
+
+    def test_repeated_inserts_rebalance_nearby_keys(self):
+        store = TaskStore(Task(str(i), task_id=str(i)) for i in range(100))
+        store.take_rekeyed()
+        for step in range(200):
+            store.insert(50, Task('new', task_id=f"n{step}"))
+        keys = [task.order_key for task in store]
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertLessEqual(max(map(len, keys)), TaskStore.MAX_ORDER_KEY_LENGTH)
+        self.assertLess(len(store.take_rekeyed()), len(store))
+        self.assertEqual(store.verify_counters(), [])
+
+    def test_rebuild_keeps_list_order(self):
+        tasks = [Task(name, task_id=name) for name in 'ABCD']
+        for task, key in zip(tasks, ('a3', 'a0', 'a1', 'a2')):
+            task.order_key = key
+        # 外部编辑只把 A 移到了最前面，没有修改键：保持列表顺序，只重新分配 A 的键
+        store = TaskStore(tasks)
+        self.assertEqual(names(store), ['A', 'B', 'C', 'D'])
+        self.assertEqual(names(store.take_rekeyed()), ['A'])
+        self.assertEqual([task.order_key for task in store][1:], ['a0', 'a1', 'a2'])
+        self.assertLess(store[0].order_key, 'a0')
+
+        # 缺少和重复的键同样按列表顺序重新分配
+        tasks[1].order_key = ''
+        tasks[3].order_key = tasks[2].order_key
+        store = TaskStore(tasks)
+        self.assertEqual(names(store), ['A', 'B', 'C', 'D'])
+        rekeyed = names(store.take_rekeyed())
+        self.assertEqual(len(rekeyed), 2)  # B 和重复键的两个任务之一
+        self.assertIn('B', rekeyed)
+        self.assertEqual([task.order_key for task in store], sorted(set(task.order_key for task in store)))
+
+
+if __name__ == '__main__':
+    unittest.main()
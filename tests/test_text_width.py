@@ -0,0 +1,75 @@
+import unittest
+import random
+import sys
+sys.path.append('../')
+from todo_app.text_width import RowWidths, TextWidthCache
+
+
+class FakeFont:
+    """每个字符的宽度等于字号，并记录 measure() 的调用次数"""
+    calls = 0
+
+    def __init__(self, family, size):
+        self.size = size
+
+    def measure(self, text):
+        FakeFont.calls += 1
+        return len(text) * self.size
+
+
+class TestTextWidthCache(unittest.TestCase):
+
+    def setUp(self):
+        FakeFont.calls = 0
+
+    def test_same_text_is_measured_once(self):
+        cache = TextWidthCache(FakeFont)
+        self.assertEqual(cache.measure(('Sans', 10), 'abc'), 30)
+        self.assertEqual(cache.measure(('Sans', 10), 'abc'), 30)
+        self.assertEqual(FakeFont.calls, 1)
+        # 字号不同是不同的 key
+        self.assertEqual(cache.measure(('Sans', 12), 'abc'), 36)
+        self.assertEqual(FakeFont.calls, 2)
+
+    def test_clear(self):
+        cache = TextWidthCache(FakeFont)
+        cache.measure(('Sans', 10), 'abc')
+        cache.clear()
+        cache.measure(('Sans', 10), 'abc')
+        self.assertEqual(FakeFont.calls, 2)
+
+
+class TestRowWidths(unittest.TestCase):
+
+    def test_max_follows_edits(self):
+        widths = RowWidths(len)
+        widths.reset([('a', 'xx'), ('b', 'xxxxx'), ('c', 'xxxxx')])
+        self.assertEqual(widths.max_width, 5)
+        widths.remove('b')
+        self.assertEqual(widths.max_width, 5)
+        widths.add('c', 'xxx')
+        self.assertEqual(widths.max_width, 3)
+        widths.remove('missing')
+        widths.remove('c')
+        widths.remove('a')
+        self.assertEqual(widths.max_width, 0)
+        self.assertEqual(len(widths), 0)
+
+    def test_random_edits_match_full_scan(self):
+        rng = random.Random(3)
+        widths = RowWidths(len)
+        texts = {}
+        for _ in range(2000):
+            key = rng.randrange(50)
+            if rng.random() < 0.3:
+                widths.remove(key)
+                texts.pop(key, None)
+            else:
+                text = 'x' * rng.randrange(40)
+                widths.add(key, text)
+                texts[key] = text
+            self.assertEqual(widths.max_width, max(map(len, texts.values()), default=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import tkinter as tk
+import sys
+sys.path.append('../')
+from todo_app.virtual_listbox import VirtualListbox
+
+try:
+    tk.Tk().destroy()
+    HAS_DISPLAY = True
+except tk.TclError:
+    HAS_DISPLAY = False
+
+
+@unittest.skipUnless(HAS_DISPLAY, "requires a display")
+class TestVirtualListbox(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tk.Tk()
+        self.listbox = VirtualListbox(self.root, width=300, height=200, font=('TkDefaultFont', 10))
+        self.listbox.pack()
+        self.root.update()
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_listbox_interface(self):
+        self.listbox.insert(tk.END, 'a', 'b', 'c')
+        self.listbox.itemconfig(1, {'bg': '#ff0000', 'fg': 'white'})
+        self.listbox.selection_set(2)
+        self.listbox.insert(0, 'first')
+        self.assertEqual(self.listbox.size(), 4)
+        self.assertEqual(self.listbox.get(2), 'b')
+        self.assertEqual(self.listbox.itemcget(2, 'bg'), '#ff0000')
+        self.assertEqual(self.listbox.curselection(), (3,))
+
+        self.listbox.delete(0, 1)
+        self.assertEqual(self.listbox.get(0, tk.END), ('b', 'c'))
+        self.assertEqual(self.listbox.curselection(), (1,))
+
+        intervals = self.listbox.selection_intervals()
+        self.assertEqual(intervals.ranges(), [(1, 1)])
+        intervals.add(0)  # 返回的是副本
+        self.assertEqual(self.listbox.curselection(), (1,))
+
+    def test_only_visible_rows_are_drawn(self):
+        fetched = []
+
+        def get_row(index):
+            fetched.append(index)
+            return (f"row {index}", '', '')
+
+        self.listbox.set_rows(100000, get_row)
+        self.root.update()
+        drawn = len(self.listbox.find_all())
+        self.assertLess(drawn, 200)
+        self.assertLess(len(fetched), 100)
+
+        # 滚动时复用已有的元素
+        self.listbox.yview(50000)
+        self.root.update()
+        self.assertEqual(self.listbox.nearest(0), 50000)
+        self.assertLessEqual(len(self.listbox.find_all()), drawn * 2)
+        self.assertEqual(self.listbox.bbox(50000)[1], 0)
+        self.assertIsNone(self.listbox.bbox(0))
+
+    def test_set_rows_keeps_selection_and_top_row_by_key(self):
+        keys = [f"task {i}" for i in range(1000)]
+        self.listbox.set_rows(len(keys), lambda i: (keys[i], '', ''), keys.__getitem__)
+        self.listbox.selection_set(10)
+        self.listbox.yview(5)
+
+        new_keys = ['new'] + keys
+        self.listbox.set_rows(len(new_keys), lambda i: (new_keys[i], '', ''), new_keys.__getitem__)
+        self.assertEqual(self.listbox.curselection(), (11,))
+        self.assertEqual(self.listbox.nearest(0), 6)
+
+    def test_click_selects_and_generates_event(self):
+        self.listbox.insert(tk.END, *[f"row {i}" for i in range(10)])
+        events = []
+        self.listbox.bind('<<ListboxSelect>>', lambda event: events.append(event))
+        self.listbox.event_generate('<Button-1>', x=5, y=1)
+        self.root.update()
+        self.assertEqual(self.listbox.curselection(), (0,))
+        self.assertTrue(events)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+"""已完成任务的归档层：长期不再查看的已完成任务按分组移出工作集，按需加载"""
+import json
+import os
+import re
+import struct
+import threading
+import zlib
+from pathlib import Path
+
+try:
+    from .storage import compact_task, expand_task, serialize_task
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from storage import compact_task, expand_task, serialize_task
+
+# 第一个分割线之前的分组没有对应的分割线，使用固定的归档键
+TOP_SECTION_KEY = 'top'
+
+# 每个归档块的头部：数据长度、主任务数量、未取消的已完成主任务数量
+_BLOCK_HEADER = struct.Struct('>III')
+_SAFE_KEY = re.compile(r'[^0-9A-Za-z_-]')
+
+
+class TaskArchive:
+    """按分组保存的只追加归档段
+
+    每个分组（以开始该分组的分割线的 task_id 为键）对应一个 .seg 文件，每次归档
+    追加一个 zlib 压缩的块。块头部记录了主任务数量，因此统计已完成数量时不需要解压
+    任务数据。
+
+    先写归档再保存任务数据，两步之间崩溃时下次启动会再次归档同样的任务：追加时跳过
+    段中已有的 task_id，统计时跳过与之前完全相同的块（旧版本写入的重复块），
+    load() 按 task_id 去重。
+    """
+
+    SUFFIX = '.seg'
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._counts = None  # key -> [主任务数量, 未取消的已完成主任务数量]
+        self._forgotten = set()  # 已恢复到工作集、等待任务数据写盘后删除的分组
+        self._ids = {}  # key -> 段中已有的 task_id，第一次向该分组追加时读取
+
+    def segment_path(self, key):
+        return self.directory / (_SAFE_KEY.sub('_', key) + self.SUFFIX)
+
+    def _load_counts(self):
+        if self._counts is not None:
+            return self._counts
+        counts = {}
+        if self.directory.is_dir():
+            for path in self.directory.glob('*' + self.SUFFIX):
+                total, done = 0, 0
+                seen = set()
+                for header, data in self._iter_blocks(path):
+                    # 重复归档写入的相同块只计一次（只比较压缩数据，不需要解压）
+                    digest = (header, zlib.crc32(data))
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                    total += header[1]
+                    done += header[2]
+                if total:
+                    counts[path.name[:-len(self.SUFFIX)]] = [total, done]
+        self._counts = counts
+        return counts
+
+    @staticmethod
+    def _iter_blocks(path):
+        """依次读取归档块；末尾不完整的块（写入时崩溃）被忽略"""
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            while True:
+                raw = f.read(_BLOCK_HEADER.size)
+                if len(raw) < _BLOCK_HEADER.size:
+                    return
+                header = _BLOCK_HEADER.unpack(raw)
+                data = f.read(header[0])
+                if len(data) < header[0]:
+                    return
+                yield header, data
+
+    def paths(self):
+        """所有归档段文件"""
+        if not self.directory.is_dir():
+            return []
+        return list(self.directory.glob('*' + self.SUFFIX))
+
+    def keys(self):
+        with self._lock:
+            return [key for key in self._load_counts() if key not in self._forgotten]
+
+    def count(self, key):
+        """分组中已归档的主任务数量（用于已完成标题的计数）"""
+        safe_key = _SAFE_KEY.sub('_', key)
+        with self._lock:
+            if safe_key in self._forgotten:
+                return 0
+            return self._load_counts().get(safe_key, (0, 0))[0]
+
+    def done_count(self):
+        """所有分组中已归档、未取消的已完成主任务数量（用于窗口标题）"""
+        with self._lock:
+            return sum(done for key, (_, done) in self._load_counts().items() if key not in self._forgotten)
+
+    def append(self, key, tasks):
+        """把任务（主任务及其子任务）追加到分组的归档段，写入后 fsync；段中已有的任务被跳过"""
+        safe_key = _SAFE_KEY.sub('_', key)
+        with self._lock:
+            counts = self._load_counts()
+            # 分组之前的归档已经恢复到工作集，旧的块不能再计入，重新开始一个段文件
+            mode = 'wb' if safe_key in self._forgotten else 'ab'
+            if mode == 'wb':
+                self._forgotten.discard(safe_key)
+                counts.pop(safe_key, None)
+                ids = self._ids[safe_key] = set()
+            else:
+                ids = self._ids.get(safe_key)
+                if ids is None:
+                    ids = self._ids[safe_key] = {task.get('task_id') for task in self.load(key)}
+            tasks = [task for task in tasks if not task.get('task_id') or task.get('task_id') not in ids]
+            if not tasks:
+                return
+            main_tasks = [task for task in tasks if not task.get('is_subtask', False)]
+            done = sum(1 for task in main_tasks if not task.get('cancelled', False))
+            data = zlib.compress(json.dumps([compact_task(serialize_task(task)) for task in tasks],
+                                            ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.segment_path(key), mode) as f:
+                f.write(_BLOCK_HEADER.pack(len(data), len(main_tasks), done) + data)
+                f.flush()
+                os.fsync(f.fileno())
+            ids.update(task.get('task_id') for task in tasks)
+            entry = counts.setdefault(safe_key, [0, 0])
+            entry[0] += len(main_tasks)
+            entry[1] += done
+
+    def load(self, key):
+        """解压并返回分组中所有已归档的任务；重复归档的任务只返回第一次出现的"""
+        tasks = []
+        seen = set()
+        for _, data in self._iter_blocks(self.segment_path(key)):
+            for task in json.loads(zlib.decompress(data).decode('utf-8')):
+                task = expand_task(task)
+                task_id = task.get('task_id')
+                if task_id:
+                    if task_id in seen:
+                        continue
+                    seen.add(task_id)
+                tasks.append(task)
+        return tasks
+
+    def forget(self, key):
+        """分组的任务已恢复到工作集：立即从计数中移除，段文件在 purge() 时删除"""
+        with self._lock:
+            safe_key = _SAFE_KEY.sub('_', key)
+            self._forgotten.add(safe_key)
+            self._ids.pop(safe_key, None)
+
+    def purge(self):
+        """删除已恢复分组的段文件；必须在任务数据成功写盘之后调用"""
+        with self._lock:
+            forgotten, self._forgotten = self._forgotten, set()
+            for key in forgotten:
+                try:
+                    self.segment_path(key).unlink()
+                except FileNotFoundError:
+                    pass
+                if self._counts is not None:
+                    self._counts.pop(key, None)
+
+    def search(self, text):
+        """在所有归档段中按名称查找任务（不区分大小写），返回 (key, task) 列表"""
+        needle = text.lower()
+        matches = []
+        for key in self.keys():
+            for task in self.load(key):
+                if needle in task.get('name', '').lower():
+                    matches.append((key, task))
+        return matches
@@ -0,0 +1,126 @@
+"""截止日期：解析为日期序数（date.toordinal()），按日期排序的索引和提示文本"""
+from bisect import bisect_left
+from datetime import date, datetime
+from itertools import count
+
+DUE_SOON_DAYS = 3  # 这么多天以内到期时显示倒计时，否则显示日期
+
+_parsed = {}  # 截止日期字符串 -> 日期序数（无效时为 None）
+
+
+def parse_deadline(text):
+    """'YYYY-MM-DD' -> 日期序数；同一个字符串只解析一次，格式无效时返回 None"""
+    try:
+        return _parsed[text]
+    except KeyError:
+        pass
+    try:
+        ordinal = datetime.strptime(text, '%Y-%m-%d').toordinal()
+    except (TypeError, ValueError):
+        ordinal = None
+    _parsed[text] = ordinal
+    return ordinal
+
+
+def today_ordinal():
+    return date.today().toordinal()
+
+
+def deadline_indicator(ordinal, today, text):
+    """任务名后面的截止日期提示；只取决于截止日期和今天的日期"""
+    days = ordinal - today
+    if days < 0:
+        return f' ⚠️超期{-days}天'
+    if days == 0:
+        return ' ⚠️今天到期'
+    if days <= DUE_SOON_DAYS:
+        return f' ⏰{days}天后到期'
+    return f' 📅{text}'
+
+
+def has_open_deadline(task):
+    """未完成且截止日期有效的任务才显示提示、进入索引"""
+    return bool(task.deadline) and not task.done and parse_deadline(task.deadline) is not None
+
+
+class DeadlineIndex:
+    """未完成任务按截止日期排序的索引
+
+    条目是 (日期序数, 插入序号)，序号保证条目唯一且不需要比较任务本身。
+    新条目先追加到未排序的列表中，下一次查询时一次性排序合并，
+    加载大量任务时不需要逐个插入。删除是二分查找加一次列表内的移动；
+    区间查询用二分查找，只遍历结果。
+    """
+
+    def __init__(self):
+        self._keys = []  # 有序的 (日期序数, 序号)
+        self._unsorted = []  # 尚未合并到 _keys 的新条目
+        self._tasks = {}  # (日期序数, 序号) -> 任务
+        self._key_of = {}  # id(task) -> (日期序数, 序号)
+        self._serial = count()
+
+    def __len__(self):
+        return len(self._key_of)
+
+    def __contains__(self, task):
+        return id(task) in self._key_of
+
+    def add(self, task):
+        """加入或更新一个任务；已完成或没有有效截止日期的任务从索引中移除"""
+        self.discard(task)
+        if not has_open_deadline(task):
+            return
+        key = (parse_deadline(task.deadline), next(self._serial))
+        self._unsorted.append(key)
+        self._tasks[key] = task
+        self._key_of[id(task)] = key
+
+    def discard(self, task):
+        key = self._key_of.pop(id(task), None)
+        if key is None:
+            return
+        keys = self._keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+        else:
+            self._unsorted.remove(key)
+        del self._tasks[key]
+
+    def _sorted_keys(self):
+        if self._unsorted:
+            self._keys.extend(self._unsorted)
+            self._unsorted.clear()
+            self._keys.sort()
+        return self._keys
+
+    def clear(self):
+        self._keys.clear()
+        self._unsorted.clear()
+        self._tasks.clear()
+        self._key_of.clear()
+
+    def between(self, first, last):
+        """截止日期序数在 [first, last] 之间的任务，按截止日期排序"""
+        keys = self._sorted_keys()
+        start = bisect_left(keys, (first,))
+        end = bisect_left(keys, (last + 1,))
+        return [self._tasks[key] for key in keys[start:end]]
+
+    def overdue(self, today):
+        """已经超过截止日期的任务"""
+        keys = self._sorted_keys()
+        return [self._tasks[key] for key in keys[:bisect_left(keys, (today,))]]
+
+    def due_within(self, days, today):
+        """今天起 days 天以内（含今天）到期的任务"""
+        return self.between(today, today + days)
+
+    def changed_between(self, old_today, new_today):
+        """日期从 old_today 变为 new_today 时提示文本会变化的任务
+
+        超期和即将到期的提示带有天数，每天都会变化；更远的截止日期只显示日期，不会变化。
+        """
+        latest = max(old_today, new_today) + DUE_SOON_DAYS
+        keys = self._sorted_keys()
+        return [self._tasks[key] for key in keys[:bisect_left(keys, (latest + 1,))]]
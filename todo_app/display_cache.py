@@ -0,0 +1,69 @@
+"""显示字符串缓存：按任务身份和版本号记住每一行格式化好的文本和颜色"""
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 20000
+MAX_RESERVED_SIZE = 200000  # reserve() 最多扩大到这个容量，超大的列表重绘时照常淘汰
+
+
+class DisplayCache:
+    """有容量上限的 LRU 缓存
+
+    key 由调用方组合（任务的 id、版本号、字体大小、主题、日期等），任何一项变化都会
+    自然地落到新的 key 上，旧的条目按最近最少使用的顺序淘汰，不需要显式失效。
+    id() 在任务被释放后可能被新任务复用，因此条目同时保存任务本身，命中时校验身份。
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = self._configured_maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (任务, 值)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, owner=None):
+        """返回缓存的值；不存在或属于另一个对象时返回 None"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not owner:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, owner, value):
+        entries = self._entries
+        entries[key] = (owner, value)
+        entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        entries = self._entries
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def reserve(self, count):
+        """按当前列表的行数调整容量（整个列表重绘时不会一边写入一边淘汰）
+
+        容量不小于构造时的 maxsize，不超过 MAX_RESERVED_SIZE；列表变短后随之缩小，
+        多出来的条目按最近最少使用的顺序淘汰。
+        """
+        maxsize = max(self._configured_maxsize, min(count + count // 4, MAX_RESERVED_SIZE))
+        if maxsize != self.maxsize:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,50 @@
+"""拖放重排：把拖动的行展开为一起移动的任务块，并计算放下时在任务列表中的位置"""
+try:
+    from .task_model import Task
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from task_model import Task
+
+
+def drag_block(store, rows):
+    """拖动的显示行对应的任务块，按显示顺序排列：主任务后面跟着它的所有子任务
+
+    折叠标题不是任务，被忽略；父任务也在拖动的子任务已经包含在父任务的块中。
+    """
+    dragged = {id(row) for row in rows}
+    block = []
+    for row in rows:
+        if type(row) is not Task or row not in store:
+            continue
+        if row.is_subtask:
+            parent = store.get(row.parent_task_id)
+            if parent is None or id(parent) not in dragged:
+                block.append(row)
+            continue
+        block.append(row)
+        if row.task_id is not None:
+            block.extend(store.children(row.task_id))
+    return block
+
+
+def drop_position(store, block, target, after):
+    """把 block 放在显示行 target 之前（after 为 False）或之后时，在 store 中的插入位置
+
+    放在主任务之后时跳过它的子任务；移动主任务或分割线时，指向子任务的位置改为其父任务的整组，
+    不会插进别的任务的子任务中间。不能放下（target 不是任务或属于 block）时返回 None。
+    返回的位置是移动之前的列表中的位置，可以直接交给 TaskStore.move()。
+    """
+    if type(target) is not Task or target not in store:
+        return None
+    moved = {id(task) for task in block}
+    if target.is_subtask and any(not task.is_subtask for task in block):
+        parent = store.get(target.parent_task_id)
+        if parent is not None:
+            target = parent
+    if id(target) in moved:
+        return None
+    if not after:
+        return store.index(target)
+    group = [target]
+    if not target.is_subtask and target.task_id is not None:
+        group.extend(store.children(target.task_id))
+    return max(store.index(task) for task in group if id(task) not in moved) + 1
@@ -0,0 +1,124 @@
+"""列表框的增量更新：比较前后两次渲染的行，只把变化的部分应用到 Listbox"""
+
+try:
+    from .storage import longest_increasing_run
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from storage import longest_increasing_run
+
+
+def diff_rows(old_rows, new_rows):
+    """计算把 old_rows 变成 new_rows 的编辑脚本
+
+    每一行是 (key, 文本, 背景色, 前景色)，key 在同一次渲染中唯一。返回的操作按顺序应用：
+    - ('delete', first, last)：删除 first..last（含），从下往上排列，下标始终有效
+    - ('insert', index, rows)：在 index 处插入连续的多行，从上往下排列
+    - ('update', index, row, text_changed)：修改已有的行，下标是最终位置
+
+    相对顺序保持不变的最长子序列中的行原地保留，其余的行删除后重新插入。
+    """
+    old_count, new_count = len(old_rows), len(new_rows)
+    # 首尾相同 key 的行（绝大多数情况下几乎是全部）不参与子序列计算
+    prefix = 0
+    limit = min(old_count, new_count)
+    while prefix < limit and old_rows[prefix][0] == new_rows[prefix][0]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old_rows[old_count - 1 - suffix][0] == new_rows[new_count - 1 - suffix][0]:
+        suffix += 1
+
+    old_middle = old_rows[prefix:old_count - suffix]
+    new_middle = new_rows[prefix:new_count - suffix]
+    old_position = {row[0]: i for i, row in enumerate(old_middle)}
+    stable = longest_increasing_run([row[0] for row in new_middle if row[0] in old_position], old_position)
+
+    ops = []
+    i = len(old_middle) - 1
+    while i >= 0:
+        if old_middle[i][0] in stable:
+            i -= 1
+            continue
+        last = i
+        while i >= 0 and old_middle[i][0] not in stable:
+            i -= 1
+        ops.append(('delete', prefix + i + 1, prefix + last))
+
+    j = 0
+    while j < len(new_middle):
+        if new_middle[j][0] in stable:
+            j += 1
+            continue
+        first = j
+        while j < len(new_middle) and new_middle[j][0] not in stable:
+            j += 1
+        ops.append(('insert', prefix + first, new_middle[first:j]))
+
+    shift = old_count - new_count
+    for j, row in enumerate(new_rows):
+        if j < prefix:
+            old_row = old_rows[j]
+        elif j >= new_count - suffix:
+            old_row = old_rows[j + shift]
+        elif row[0] in stable:
+            old_row = old_middle[old_position[row[0]]]
+        else:
+            continue
+        if old_row != row:
+            ops.append(('update', j, row, old_row[1] != row[1]))
+    return ops
+
+
+def apply_row_diff(listbox, ops, default_style=None):
+    """把 diff_rows() 的编辑脚本应用到 Listbox；被修改文本的行保持选中状态
+
+    default_style 是列表框自身的 (背景色, 前景色)。新插入的行没有单独的颜色，
+    样式与之相同时不需要设置。其余行的颜色在最后一次性设置（见 style_rows）。
+    """
+    styles = []  # (最终下标, 背景色, 前景色)
+    for op in ops:
+        kind = op[0]
+        if kind == 'delete':
+            listbox.delete(op[1], op[2])
+        elif kind == 'insert':
+            index, rows = op[1], op[2]
+            listbox.insert(index, *[row[1] for row in rows])
+            for offset, row in enumerate(rows):
+                if not _is_default_style(row, default_style):
+                    styles.append((index + offset, row[2], row[3]))
+        else:
+            _, index, row, text_changed = op
+            if text_changed:
+                # Listbox 不能直接修改文本，只能删除后重新插入
+                selected = listbox.selection_includes(index)
+                listbox.delete(index)
+                listbox.insert(index, row[1])
+                if selected:
+                    listbox.selection_set(index)
+                if _is_default_style(row, default_style):
+                    continue
+            styles.append((index, row[2], row[3]))
+    style_rows(listbox, styles)
+
+
+def _is_default_style(row, default_style):
+    if default_style is None:
+        return False
+    default_bg, default_fg = default_style
+    return (row[2] or default_bg) == default_bg and (row[3] or default_fg) == default_fg
+
+
+def style_rows(listbox, styles):
+    """设置多行的颜色，styles: [(下标, 背景色, 前景色), ...]
+
+    Tk 的 itemconfigure 每次只能设置一行，逐行调用时每一行都要经过一次 Python 到 Tcl 的
+    往返和选项转换。这里把所有行交给一条 Tcl foreach 命令，在 Tcl 内部循环。
+    """
+    if not styles:
+        return
+    if len(styles) == 1 or not hasattr(listbox, 'tk'):
+        for index, bg, fg in styles:
+            listbox.itemconfig(index, {'bg': bg, 'fg': fg})
+        return
+    values = tuple(value for style in styles for value in style)
+    listbox.tk.call('foreach', ('index', 'bg', 'fg'), values,
+                    f'{listbox} itemconfigure $index -background $bg -foreground $fg')
@@ -0,0 +1,155 @@
+"""任务的排序键：可以在任意两个键之间生成新键的字符串（分数索引）
+
+键按字符串比较的顺序就是任务的顺序。移动或插入一个任务时只需要在前后两个任务的键之间
+生成一个新键，其他任务的键不变，保存时也只需要写入这个任务。
+
+键由整数部分和小数部分组成，字符取自 62 个数字 0-9A-Za-z（按 ASCII 递增）：
+- 整数部分的第一个字符决定整数部分的长度：'a'..'z' 表示非负整数，其后有 1..26 个数字；
+  'A'..'Z' 表示负整数，其后有 26..1 个数字。追加到末尾时整数加一，键长只按对数增长。
+- 小数部分在两个整数部分相同的键之间取中点，不以 '0' 结尾（否则无法在它之前插入）。
+"""
+import re
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+_VALUES = {digit: value for value, digit in enumerate(DIGITS)}
+_BASE = len(DIGITS)
+_KEY_PATTERN = re.compile('[0-9A-Za-z]+')
+_SMALLEST_INTEGER = 'A' + '0' * 26
+FIRST_KEY = 'a0'
+
+
+def _integer_length(head):
+    if 'a' <= head <= 'z':
+        return ord(head) - ord('a') + 2
+    if 'A' <= head <= 'Z':
+        return ord('Z') - ord(head) + 2
+    raise ValueError(f"invalid order key head: {head!r}")
+
+
+def is_valid_key(key):
+    """key 是否是可以参与排序的键（外部数据中缺少或损坏的键需要重新生成）"""
+    if type(key) is not str or not _KEY_PATTERN.fullmatch(key):
+        return False
+    head = key[0]
+    # 与 _integer_length 相同，但加载时对每个任务都要检查一次，这里不抛出异常
+    length = ord(head) - ord('a') + 2 if head >= 'a' else ord('Z') - ord(head) + 2 if head >= 'A' else 0
+    if not length or len(key) < length or key == _SMALLEST_INTEGER:
+        return False
+    return len(key) == length or key[-1] != '0'
+
+
+def _midpoint(low, high):
+    """两个小数部分之间的小数部分；high 为 None 表示 1"""
+    if high is not None:
+        # 跳过共同的前缀（low 较短时按后面补 0 比较）
+        n = 0
+        while n < len(high) and (low[n] if n < len(low) else '0') == high[n]:
+            n += 1
+        if n:
+            return high[:n] + _midpoint(low[n:], high[n:])
+    digit_low = _VALUES[low[0]] if low else 0
+    digit_high = _VALUES[high[0]] if high is not None else _BASE
+    if digit_high - digit_low > 1:
+        return DIGITS[(digit_low + digit_high + 1) // 2]
+    # 两个数字相邻：取较短的 high 的第一位，或在 low 的第一位后面继续取中点
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[digit_low] + _midpoint(low[1:], None)
+
+
+def _increment_integer(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        value = _VALUES[digits[i]] + 1
+        if value < _BASE:
+            digits[i] = DIGITS[value]
+            return head + ''.join(digits)
+        digits[i] = '0'
+    # 进位到长度：整数部分多一位（负数部分少一位）
+    if head == 'Z':
+        return 'a0'
+    if head == 'z':
+        return None
+    head = chr(ord(head) + 1)
+    if head > 'a':
+        digits.append('0')
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+
+def _decrement_integer(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        value = _VALUES[digits[i]] - 1
+        if value >= 0:
+            digits[i] = DIGITS[value]
+            return head + ''.join(digits)
+        digits[i] = DIGITS[-1]
+    if head == 'a':
+        return 'Z' + DIGITS[-1]
+    if head == 'A':
+        return None
+    head = chr(ord(head) - 1)
+    if head < 'Z':
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+
+def key_between(low, high):
+    """严格位于 low 和 high 之间的键；low 为 None 表示最前，high 为 None 表示最后"""
+    if low is not None and high is not None and low >= high:
+        raise ValueError(f"order keys out of order: {low!r} >= {high!r}")
+    if low is None:
+        if high is None:
+            return FIRST_KEY
+        integer = high[:_integer_length(high[0])]
+        if integer == _SMALLEST_INTEGER:
+            return integer + _midpoint('', high[len(integer):])
+        if integer < high:
+            return integer
+        smaller = _decrement_integer(integer)
+        if smaller is None:
+            raise ValueError("cannot generate an order key before the smallest key")
+        return smaller
+    integer = low[:_integer_length(low[0])]
+    fraction = low[len(integer):]
+    if high is None:
+        larger = _increment_integer(integer)
+        return larger if larger is not None else integer + _midpoint(fraction, None)
+    high_integer = high[:_integer_length(high[0])]
+    if integer == high_integer:
+        return integer + _midpoint(fraction, high[len(high_integer):])
+    larger = _increment_integer(integer)
+    if larger is not None and larger < high:
+        return larger
+    return integer + _midpoint(fraction, None)
+
+
+def keys_between(low, high, count):
+    """严格位于 low 和 high 之间的 count 个递增的键
+
+    有上界时按二分生成，键长只随 count 按对数增长；没有上界时逐个递增整数部分。
+    """
+    if count <= 0:
+        return []
+    if high is None:
+        keys = []
+        key = low
+        for _ in range(count):
+            key = key_between(key, None)
+            keys.append(key)
+        return keys
+    if low is None:
+        keys = []
+        key = high
+        for _ in range(count):
+            key = key_between(None, key)
+            keys.append(key)
+        keys.reverse()
+        return keys
+    middle = key_between(low, high)
+    half = count // 2
+    return keys_between(low, middle, half) + [middle] + keys_between(middle, high, count - half - 1)
@@ -0,0 +1,97 @@
+"""后台持久化线程：合并短时间内的多次保存请求，统一在后台写盘"""
+import threading
+import time
+
+
+class PersistenceWorker:
+    """负责所有磁盘写入的后台线程
+
+    界面线程只调用 mark_dirty() 标记某类数据（如 'tasks'、'config'）需要保存；
+    工作线程等到最后一次标记之后安静 quiet_period 秒，再把这段时间内的所有请求
+    合并为每类数据一次写入。写入失败时调用 on_error(key, error)，由调用方负责
+    转回界面线程处理。
+    """
+
+    def __init__(self, quiet_period=0.3, on_error=None):
+        self.quiet_period = quiet_period
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._pending = {}  # key -> 写入函数，同一 key 只保留最新的一个
+        self._last_request = 0.0
+        self._busy = False
+        self._flushing = False
+        self._closed = False
+        self._thread = None
+
+    def mark_dirty(self, key, writer):
+        """标记 key 对应的数据需要保存，writer 会在工作线程中被调用"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("persistence worker is closed")
+            self._pending[key] = writer
+            self._last_request = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='todo-persistence', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def has_pending(self):
+        with self._cond:
+            return bool(self._pending) or self._busy
+
+    def flush(self):
+        """立即写出所有待保存的数据，并等待写入完成"""
+        with self._cond:
+            if self._thread is None:
+                return
+            self._flushing = True
+            self._cond.notify_all()
+            while self._pending or self._busy:
+                self._cond.wait()
+            self._flushing = False
+
+    def close(self):
+        """写出剩余数据并停止工作线程，退出程序前调用"""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # 等待安静期结束，期间的新请求会继续推迟写入
+                while not self._flushing and not self._closed:
+                    remaining = self._last_request + self.quiet_period - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, {}
+                self._busy = True
+
+            for key, writer in batch.items():
+                try:
+                    writer()
+                except Exception as e:
+                    self._report_error(key, e)
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _report_error(self, key, error):
+        if self.on_error is None:
+            print(f"Error saving {key}: {error}")
+            return
+        try:
+            self.on_error(key, error)
+        except Exception as e:
+            # 界面可能已经关闭，只能输出到控制台
+            print(f"Error saving {key}: {error} ({e})")
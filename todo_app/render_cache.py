@@ -0,0 +1,53 @@
+"""首屏渲染缓存：退出时保存第一屏的显示内容，下次启动时在加载任务数据之前直接绘制"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+try:
+    from .storage import write_text_atomic
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from storage import write_text_atomic
+
+RENDER_CACHE_VERSION = 1
+
+
+def data_fingerprint(data_paths, config_text):
+    """根据数据文件的大小、修改时间和配置内容计算指纹
+
+    只读取文件元数据而不读取内容，大文件也能在启动时立即完成校验。
+    任何一个文件被修改（包括其他进程或同步脚本的修改）都会改变指纹。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(str(path) for path in data_paths):
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        except OSError:
+            digest.update(f"{path}\0missing\n".encode('utf-8'))
+    digest.update(config_text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def save_render_cache(path, fingerprint, title, geometry, rows):
+    """rows: [(显示文本, 背景色, 前景色), ...]，只包含第一屏的行"""
+    data = {
+        'version': RENDER_CACHE_VERSION,
+        'fingerprint': fingerprint,
+        'title': title,
+        'geometry': geometry,
+        'rows': [list(row) for row in rows],
+    }
+    write_text_atomic(Path(path), json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+
+
+def load_render_cache(path, fingerprint):
+    """读取渲染缓存；版本或指纹不匹配、文件损坏时返回 None"""
+    try:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if (not isinstance(data, dict) or data.get('version') != RENDER_CACHE_VERSION
+            or data.get('fingerprint') != fingerprint or not isinstance(data.get('rows'), list)):
+        return None
+    return data
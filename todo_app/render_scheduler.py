@@ -0,0 +1,82 @@
+"""界面刷新调度：一次事件处理中的多次修改只在事件循环空闲时重绘一次"""
+import time
+
+# 需要刷新的部分，可以按位组合
+RENDER_LIST = 1  # 重新组织并渲染列表，不改变窗口尺寸
+RENDER_SIZE = 2  # 渲染列表并按内容调整窗口尺寸
+RENDER_TITLE = 4  # 窗口标题中的任务计数
+RENDER_BUTTONS = 8  # 按钮的可用状态
+RENDER_FILTER = 16  # 按搜索框重新过滤已经组织好的列表（不重新组织）
+
+FRAME_BUDGET = 1 / 60  # 超过一帧（60Hz）的重绘计为慢帧
+
+
+class RenderScheduler:
+    """合并刷新请求的帧调度器
+
+    request(flags) 只记录需要刷新的部分，并在还没有排队时用 after_idle 排队一帧；
+    同一轮事件循环中的其他请求合并到这一帧中，不再单独重绘（计为跳过的帧）。
+    render(flags) 由调用方提供，负责实际的重绘。
+    """
+
+    def __init__(self, root, render):
+        self.root = root
+        self.render = render
+        self.dirty = 0
+        self._pending = None  # after_idle 返回的 ID
+        self.requests = 0
+        self.frames = 0
+        self.slow_frames = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+
+    @property
+    def pending(self):
+        return self._pending is not None
+
+    def request(self, flags):
+        self.dirty |= flags
+        self.requests += 1
+        if self._pending is None:
+            self._pending = self.root.after_idle(self._run)
+
+    def flush(self):
+        """立即完成已排队的一帧（需要同步读取重绘结果时使用）"""
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+            self._run()
+
+    def cancel(self):
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+            self._pending = None
+        self.dirty = 0
+
+    def _run(self):
+        # 先清除状态：重绘出错时不影响下一帧，重绘过程中的新请求排到下一帧
+        flags, self.dirty, self._pending = self.dirty, 0, None
+        if not flags:
+            return
+        start = time.perf_counter()
+        try:
+            self.render(flags)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.frames += 1
+            self.total_time += elapsed
+            self.last_time = elapsed
+            self.max_time = max(self.max_time, elapsed)
+            if elapsed > FRAME_BUDGET:
+                self.slow_frames += 1
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'frames': self.frames,
+            'skipped_frames': self.requests - self.frames - (1 if self._pending is not None else 0),
+            'slow_frames': self.slow_frames,
+            'last_frame_ms': round(self.last_time * 1000, 2),
+            'avg_frame_ms': round(self.total_time * 1000 / self.frames, 2) if self.frames else 0.0,
+            'max_frame_ms': round(self.max_time * 1000, 2),
+        }
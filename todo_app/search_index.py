@@ -0,0 +1,194 @@
+"""任务名搜索：三字母组倒排索引，以及按分组结构过滤显示列表"""
+import time
+
+try:
+    from .task_model import KIND_TASK
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from task_model import KIND_TASK
+
+GRAM = 3  # 索引按长度为 3 的子串（三字母组）建立
+
+
+def normalize(text):
+    """搜索不区分大小写"""
+    return text.casefold()
+
+
+def trigrams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class TrigramIndex:
+    """任务名（只包括任务，不包括分割线）的三字母组倒排索引
+
+    三字母组 -> 包含它的任务集合（按 id(task)）。查询先对查询串的所有三字母组的集合
+    求交集（从最小的集合开始），再用子串匹配确认候选任务，代价取决于候选数量，与任务总数无关。
+    少于三个字符的查询没有三字母组，直接扫描所有任务名。
+    在上一次的查询后面继续输入（上一次的查询是这一次的子串）且索引没有变化时，
+    结果一定在上一次的结果之中，只检查上一次的结果。
+    任务名修改时只更新新旧名字不同的三字母组。
+
+    大量任务的索引需要较长时间建立，创建时任务只登记为待索引，由 build() 分批建立；
+    还没有建立索引的任务在搜索时逐个检查名字，结果始终完整。
+    """
+
+    def __init__(self, tasks=()):
+        self._names = {}  # id(task) -> 规范化的任务名
+        self._tasks = {}  # id(task) -> 任务
+        self._postings = {}  # 三字母组 -> {id(task), ...}
+        self._version = 0  # 索引内容每次变化加一
+        self._last = None  # 上一次搜索的 (规范化的查询, 版本号, 结果)
+        # id(task) -> 尚未建立索引的任务
+        self._pending = {id(task): task for task in tasks if task.kind == KIND_TASK}
+
+    def __len__(self):
+        return len(self._names) + len(self._pending)
+
+    def __contains__(self, task):
+        return id(task) in self._names or id(task) in self._pending
+
+    @property
+    def pending(self):
+        """尚未建立索引的任务数"""
+        return len(self._pending)
+
+    def build(self, deadline=None):
+        """为待索引的任务建立索引，超过 deadline（time.perf_counter() 的值）时暂停；全部完成时返回 True"""
+        pending = self._pending
+        while pending:
+            for _ in range(min(len(pending), 256)):
+                key, task = pending.popitem()
+                self._insert(key, task, normalize(task.name))
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return not pending
+
+    def add(self, task):
+        """加入或更新一个任务；名字没有变化时什么也不做"""
+        key = id(task)
+        if task.kind != KIND_TASK:
+            self.discard(task)
+            return
+        name = normalize(task.name)
+        old = self._names.get(key)
+        if old == name:
+            return
+        self._pending.pop(key, None)
+        self._insert(key, task, name)
+        self._version += 1
+
+    def _insert(self, key, task, name):
+        old = self._names.get(key)
+        postings = self._postings
+        old_grams = trigrams(old) if old is not None else set()
+        new_grams = trigrams(name)
+        for gram in old_grams - new_grams:
+            self._remove_posting(gram, key)
+        for gram in new_grams - old_grams:
+            ids = postings.get(gram)
+            if ids is None:
+                ids = postings[gram] = set()
+            ids.add(key)
+        self._names[key] = name
+        self._tasks[key] = task
+
+    def discard(self, task):
+        key = id(task)
+        if self._pending.pop(key, None) is not None:
+            self._version += 1
+            return
+        name = self._names.pop(key, None)
+        if name is None:
+            return
+        del self._tasks[key]
+        self._version += 1
+        for gram in trigrams(name):
+            self._remove_posting(gram, key)
+
+    def _remove_posting(self, gram, key):
+        ids = self._postings[gram]
+        ids.discard(key)
+        if not ids:
+            del self._postings[gram]
+
+    def search(self, query):
+        """名字包含 query 的任务（不保证顺序）"""
+        query = normalize(query)
+        last = self._last
+        if last is not None and last[1] == self._version and last[0] in query:
+            names = self._names
+            results = [task for task in last[2]
+                       if query in (names.get(id(task)) or normalize(task.name))]
+        else:
+            results = self._search(query)
+            if self._pending:
+                results.extend(task for task in self._pending.values() if query in normalize(task.name))
+        self._last = (query, self._version, results)
+        return results
+
+    def _search(self, query):
+        names = self._names
+        if len(query) < GRAM:
+            tasks = self._tasks
+            return [tasks[key] for key, name in names.items() if query in name]
+        postings = self._postings
+        sets = []
+        for gram in trigrams(query):
+            ids = postings.get(gram)
+            if ids is None:
+                return []
+            sets.append(ids)
+        sets.sort(key=len)
+        candidates = sets[0]
+        for ids in sets[1:]:
+            candidates = candidates & ids  # 结果不会大于最小的集合
+            if not candidates:
+                return []
+        tasks = self._tasks
+        return [tasks[key] for key in candidates if query in names[key]]
+
+
+class SearchOutline:
+    """完整显示列表（organize_tasks_by_sections 的结果）的位置索引，用于生成过滤后的列表
+
+    每一行记录它在列表中的位置以及所属的结构行：分组中的任务属于开始该分组的分割线，
+    已完成区域中的任务属于折叠标题，折叠标题又属于分割线。过滤时只保留匹配的任务、
+    匹配子任务的父任务，以及这些任务所属的分割线和折叠标题，然后按原来的位置排序，
+    代价只取决于匹配的数量。
+    """
+
+    def __init__(self, display_tasks):
+        self.display_tasks = display_tasks
+        self._positions = {}  # id(行) -> 位置
+        self._owners = []  # 位置 -> 所属结构行的位置（没有时为 None）
+        section = None  # 当前分组的分割线
+        owner = None  # 当前行所属的结构行
+        for position, row in enumerate(display_tasks):
+            self._positions[id(row)] = position
+            if type(row) is dict:  # 折叠标题
+                self._owners.append(section)
+                owner = position
+            elif row.kind != KIND_TASK:
+                self._owners.append(None)
+                section = owner = position
+            else:
+                self._owners.append(owner)
+
+    def filter(self, matches, get_task):
+        """只包含 matches 中的任务及其上下文的显示列表；get_task(task_id) 查找父任务"""
+        positions = self._positions
+        owners = self._owners
+        keep = set()
+        for task in matches:
+            position = positions.get(id(task))
+            if position is None:  # 折叠或已归档，不在当前显示中
+                continue
+            if task.is_subtask:
+                parent = get_task(task.parent_task_id)
+                if parent is not None and id(parent) in positions:
+                    keep.add(positions[id(parent)])
+            while position is not None and position not in keep:
+                keep.add(position)
+                position = owners[position]
+        display_tasks = self.display_tasks
+        return [display_tasks[position] for position in sorted(keep)]
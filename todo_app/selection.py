@@ -0,0 +1,207 @@
+"""列表的选择：用有序的区间保存选中的行，以及按类别保存特殊行位置的行类型表"""
+from bisect import bisect_left, bisect_right
+
+# 行的类别（RowKinds）
+ROW_STRUCTURE = 1  # 分割线或折叠标题，不能被标记完成或删除
+ROW_CANCELLED = 2  # 已取消的任务
+
+
+class IntervalSet:
+    """选中的行下标，保存为互不相交、互不相邻的有序区间 [start, end)
+
+    全选、范围选择和清空都只修改少量区间，成员判断是一次二分查找；
+    行数在修改时同步维护，len() 是 O(1)。迭代时逐个生成下标，不会一次性展开。
+    接口与 set 的常用部分（add/discard/in/len/迭代）一致，范围操作使用闭区间 [first, last]，
+    与 Listbox.selection_set(first, last) 相同。
+    """
+
+    def __init__(self, indices=()):
+        self._starts = []
+        self._ends = []
+        self._count = 0
+        self._extend_sorted(sorted(indices))
+
+    @classmethod
+    def from_sorted(cls, indices):
+        """由已经按升序排列的下标（如 Listbox.curselection() 的结果）一次遍历建立，不再排序"""
+        intervals = cls()
+        intervals._extend_sorted(indices)
+        return intervals
+
+    def _extend_sorted(self, indices):
+        start = end = None
+        for index in indices:
+            if end is not None and index <= end:
+                end = max(end, index + 1)
+                continue
+            if end is not None:
+                self._append(start, end)
+            start, end = index, index + 1
+        if end is not None:
+            self._append(start, end)
+
+    def _append(self, start, end):
+        self._starts.append(start)
+        self._ends.append(end)
+        self._count += end - start
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def __contains__(self, index):
+        i = bisect_right(self._starts, index) - 1
+        return i >= 0 and index < self._ends[i]
+
+    def __iter__(self):
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end)
+
+    def __eq__(self, other):
+        if isinstance(other, IntervalSet):
+            return self._starts == other._starts and self._ends == other._ends
+        return NotImplemented
+
+    def __repr__(self):
+        return f"IntervalSet({list(self.ranges())})"
+
+    def copy(self):
+        other = IntervalSet()
+        other._starts = list(self._starts)
+        other._ends = list(self._ends)
+        other._count = self._count
+        return other
+
+    def ranges(self):
+        """选中的闭区间 (first, last)，按顺序排列"""
+        return [(start, end - 1) for start, end in zip(self._starts, self._ends)]
+
+    def first(self):
+        """最小的选中下标；没有选中时返回 None"""
+        return self._starts[0] if self._starts else None
+
+    def add(self, index):
+        self.add_range(index, index)
+
+    def discard(self, index):
+        self.discard_range(index, index)
+
+    def remove(self, index):
+        if index not in self:
+            raise KeyError(index)
+        self.discard(index)
+
+    def clear(self):
+        self._starts = []
+        self._ends = []
+        self._count = 0
+
+    def set_all(self, count):
+        """选中 0..count-1 的所有行"""
+        self.clear()
+        if count > 0:
+            self._append(0, count)
+
+    def add_range(self, first, last):
+        if first > last:
+            return
+        start, end = first, last + 1
+        starts, ends = self._starts, self._ends
+        # 与新区间重叠或相邻的区间合并为一个
+        i = bisect_left(ends, start)
+        j = bisect_right(starts, end)
+        if i < j:
+            start = min(start, starts[i])
+            end = max(end, ends[j - 1])
+            self._count -= sum(ends[k] - starts[k] for k in range(i, j))
+        starts[i:j] = [start]
+        ends[i:j] = [end]
+        self._count += end - start
+
+    def discard_range(self, first, last):
+        if first > last:
+            return
+        start, end = first, last + 1
+        starts, ends = self._starts, self._ends
+        i = bisect_right(ends, start)
+        j = bisect_left(starts, end)
+        if i >= j:
+            return
+        new_starts = []
+        new_ends = []
+        if starts[i] < start:
+            new_starts.append(starts[i])
+            new_ends.append(start)
+        if ends[j - 1] > end:
+            new_starts.append(end)
+            new_ends.append(ends[j - 1])
+        removed = sum(ends[k] - starts[k] for k in range(i, j))
+        kept = sum(e - s for s, e in zip(new_starts, new_ends))
+        starts[i:j] = new_starts
+        ends[i:j] = new_ends
+        self._count -= removed - kept
+
+    def delete_rows(self, first, last):
+        """行 first..last 被删除：这些行的选择去掉，后面的行前移（与 Listbox.delete 相同）"""
+        if first > last:
+            return
+        self.discard_range(first, last)
+        shift = last - first + 1
+        starts, ends = self._starts, self._ends
+        i = bisect_left(starts, last + 1)
+        for k in range(i, len(starts)):
+            starts[k] -= shift
+            ends[k] -= shift
+        # 删除的行两侧的区间变得相邻时合并
+        if 0 < i < len(starts) and ends[i - 1] == starts[i]:
+            ends[i - 1] = ends[i]
+            del starts[i]
+            del ends[i]
+
+    def insert_rows(self, index, count):
+        """在 index 处插入 count 行：插入的行不选中，后面的行后移（与 Listbox.insert 相同）"""
+        if count <= 0:
+            return
+        starts, ends = self._starts, self._ends
+        i = bisect_right(starts, index) - 1
+        if i >= 0 and starts[i] < index < ends[i]:
+            # 插入点在区间中间，把区间分成两段
+            starts.insert(i + 1, index)
+            ends.insert(i + 1, ends[i])
+            ends[i] = index
+        for k in range(bisect_left(starts, index), len(starts)):
+            starts[k] += count
+            ends[k] += count
+
+
+class RowKinds:
+    """显示列表中每一行的类别，只保存特殊行（分割线、折叠标题、已取消的任务）的有序位置
+
+    count(kind, selection) 对选择的每个区间做两次二分查找，代价取决于区间数而不是选中的行数。
+    classify(row) 返回 ROW_STRUCTURE、ROW_CANCELLED 或 0。
+    """
+
+    def __init__(self, rows, classify):
+        self.rows = rows
+        self._positions = {ROW_STRUCTURE: [], ROW_CANCELLED: []}
+        for index, row in enumerate(rows):
+            kind = classify(row)
+            if kind:
+                self._positions[kind].append(index)
+
+    def kind(self, index):
+        for kind, positions in self._positions.items():
+            i = bisect_left(positions, index)
+            if i < len(positions) and positions[i] == index:
+                return kind
+        return 0
+
+    def count(self, kind, selection):
+        """selection（IntervalSet）中类别为 kind 的行数"""
+        positions = self._positions[kind]
+        if not positions:
+            return 0
+        return sum(bisect_right(positions, last) - bisect_left(positions, first)
+                   for first, last in selection.ranges())
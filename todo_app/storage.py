@@ -0,0 +1,1219 @@
+"""任务数据的持久化：快照序列化与追加式变更日志（journal）"""
+import bisect
+import codecs
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+
+try:
+    from .task_model import TASK_FIELDS, Task
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from task_model import TASK_FIELDS, Task
+
+if os.name == 'nt':
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK 重试约 10 秒后仍拿不到锁会报错，继续等待
+                continue
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class FileLock:
+    """跨进程的建议性文件锁
+
+    同时打开多个实例（或同步脚本）时，读写任务数据前都要先拿到锁。
+    同一进程内的线程之间同样互斥，并且同一线程可以重复进入。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a+b')
+                _lock_file(self._file)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock_file(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+
+_NO_LOCK = contextlib.nullcontext()
+
+
+def file_signature(paths):
+    """文件的大小、修改时间和 inode，用于廉价地判断文件是否被修改过"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_size, stat.st_mtime_ns, stat.st_ino))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+# 紧凑格式（format 2）中使用的短字段名
+SHORT_KEYS = {
+    'name': 'n',
+    'done': 'd',
+    'cancelled': 'c',
+    'urgent': 'u',
+    'separator': 's',
+    'title': 't',
+    'completed_time': 'ct',
+    'deadline': 'dl',
+    'was_urgent': 'wu',
+    'subtasks': 'st',
+    'is_subtask': 'sub',
+    'parent_task_id': 'p',
+    'task_id': 'id',
+    'custom_bg_color': 'bg',
+    'order_key': 'o',
+}
+LONG_KEYS = {short: key for key, short in SHORT_KEYS.items()}
+
+FORMAT_VERSION = 2
+
+
+def serialize_task(task):
+    """把内存中的任务转换为 tasks.json 中保存的完整字段字典"""
+    if type(task) is Task:
+        return task.to_dict()
+    data = {'name': task['name']}
+    for key, default in TASK_FIELDS:
+        value = task.get(key, default)
+        # 默认值为可变对象时复制一份，避免快照与内存数据共享
+        data[key] = list(value) if isinstance(value, list) else value
+    return data
+
+
+def compact_task(data):
+    """把完整字段的任务字典压缩为短字段名，并省略取默认值的字段"""
+    compact = {'n': data['name']}
+    for key, default in TASK_FIELDS:
+        value = data.get(key, default)
+        if value != default:
+            compact[SHORT_KEYS[key]] = value
+    return compact
+
+
+_EMPTY_TASK = dict(TASK_FIELDS)
+
+
+def expand_task(data):
+    """把紧凑格式的任务还原为完整字段；旧格式（完整字段名）原样返回"""
+    if 'name' in data:
+        return data
+    task = _EMPTY_TASK.copy()
+    task['name'] = ''
+    task.update({LONG_KEYS.get(key, key): value for key, value in data.items()})
+    if 'st' not in data:
+        # 默认值是可变的列表，不能在任务之间共享
+        task['subtasks'] = []
+    return task
+
+
+def encode_snapshot(serialized_tasks, compact=False, compress=False):
+    """把序列化后的任务列表编码为快照内容
+
+    旧格式是带缩进的完整字段列表；紧凑格式为 {"format": 2, "tasks": [...]}，
+    使用短字段名、省略默认值且不缩进。compress 为 True 时返回 zlib 压缩后的字节。
+    """
+    if compact:
+        text = json.dumps({'format': FORMAT_VERSION, 'tasks': [compact_task(t) for t in serialized_tasks]},
+                          ensure_ascii=False, separators=(',', ':'))
+    else:
+        text = json.dumps(serialized_tasks, indent=4)
+    if compress:
+        return zlib.compress(text.encode('utf-8'), 6)
+    return text
+
+
+def decode_snapshot(data):
+    """解析快照的 JSON 内容，兼容旧格式（列表）和紧凑格式"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and data.get('format') == FORMAT_VERSION:
+        return [expand_task(task) for task in data.get('tasks', [])]
+    raise ValueError(f"unsupported tasks file format: {data.get('format') if isinstance(data, dict) else data!r}")
+
+
+def is_compressed(path):
+    """zlib 数据以 0x78 开头，而 JSON 文本不可能以 'x' 开头"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(1) == b'\x78'
+    except OSError:
+        return False
+
+
+def read_snapshot_text(path):
+    """读取快照文本，自动识别是否经过 zlib 压缩"""
+    path = Path(path)
+    if is_compressed(path):
+        return zlib.decompress(path.read_bytes()).decode('utf-8')
+    return path.read_text(encoding='utf-8')
+
+
+_SKIP_SEPARATORS = re.compile(r'[\s,]*')
+_TASKS_KEY = re.compile(r'"tasks"\s*:\s*\[')
+_FORMAT_KEY = re.compile(r'"format"\s*:\s*(\d+)')
+
+
+def iter_snapshot_text(path, block_size=1024 * 1024):
+    """按块读取快照文本：未压缩的文件通过 mmap 映射，压缩文件逐块解压"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as f:
+        if f.read(1) == b'\x78':
+            f.seek(0)
+            decompressor = zlib.decompressobj()
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                yield decoder.decode(decompressor.decompress(block))
+            yield decoder.decode(decompressor.flush(), final=True)
+            return
+
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, size, block_size):
+                yield decoder.decode(mapped[offset:offset + block_size])
+        yield decoder.decode(b'', final=True)
+
+
+def iter_snapshot_tasks(text_chunks, chunk_size=1000):
+    """从快照文本块中增量解析任务，每解析出 chunk_size 个任务产出一次
+
+    兼容旧格式（顶层列表）和紧凑格式（{"format": 2, "tasks": [...]}）；
+    不需要把整个文件解析成一棵完整的 JSON 树。
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(text_chunks)
+    buf = ''
+    pos = 0
+
+    def fill():
+        nonlocal buf, pos
+        more = next(chunks, None)
+        if more is None:
+            return False
+        buf = buf[pos:] + more
+        pos = 0
+        return True
+
+    # 定位任务数组的起始位置
+    compact = False
+    while True:
+        stripped = buf.lstrip()
+        if stripped[:1] == '[':
+            pos = len(buf) - len(stripped) + 1
+            break
+        if stripped[:1] == '{':
+            match = _TASKS_KEY.search(buf)
+            if match:
+                version = _FORMAT_KEY.search(buf, 0, match.start())
+                if not version or int(version.group(1)) != FORMAT_VERSION:
+                    raise ValueError("unsupported tasks file format")
+                compact = True
+                pos = match.end()
+                break
+        elif stripped:
+            raise json.JSONDecodeError("expected task list", buf, len(buf) - len(stripped))
+        if not fill():
+            if not buf.strip():
+                return
+            raise json.JSONDecodeError("unterminated task list", buf, len(buf))
+
+    batch = []
+    while True:
+        pos = _SKIP_SEPARATORS.match(buf, pos).end()
+        if pos >= len(buf):
+            if not fill():
+                raise json.JSONDecodeError("unterminated task list", buf, pos)
+            continue
+        if buf[pos] == ']':
+            break
+        try:
+            task, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # 当前块末尾的任务不完整，读入下一块后重试
+            if not fill():
+                raise
+            continue
+        batch.append(expand_task(task) if compact else task)
+        pos = end
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_snapshot_atomic(path, data):
+    """按内容类型原子地写入文本或字节快照"""
+    if isinstance(data, bytes):
+        write_bytes_atomic(path, data)
+    else:
+        write_text_atomic(path, data)
+
+
+def write_text_atomic(path, text):
+    """先写临时文件并 fsync，再替换目标文件，避免写到一半或断电时损坏原文件"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(text, encoding='utf-8')
+    _replace_synced(tmp_path, path)
+
+
+def write_bytes_atomic(path, data):
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_bytes(data)
+    _replace_synced(tmp_path, path)
+
+
+def _replace_synced(tmp_path, path):
+    fd = os.open(tmp_path, os.O_RDWR)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+    if os.name == 'posix':
+        # 确保重命名本身也落盘
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class SaveStats:
+    """保存操作的计数器，用于确认跳过了多少次无效写入"""
+
+    def __init__(self):
+        self.requested = 0      # 界面请求保存的次数（合并之前）
+        self.attempted = 0      # 后台线程实际调用 save() 的次数
+        self.performed = 0      # 真正写盘的次数
+        self.skipped = 0        # 内容没有变化而跳过的次数
+        self.bytes_written = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class SerializationCache:
+    """按 task_id 缓存任务的序列化结果
+
+    调用方给出本次修改过的 task_id 集合时，其余任务直接复用上次的结果；
+    集合为 None 表示任务列表的结构可能发生了变化，所有任务重新序列化。
+    缓存同时记录任务对象本身及其 version（Task 通过字典接口修改字段时加一），
+    对象被替换或字段被修改时同样会重新序列化。serialized_ids 为上一次调用中
+    重新序列化（结果不是复用的）的 task_id。
+    """
+
+    def __init__(self):
+        self._entries = {}  # task_id -> (task, version, 序列化结果)
+        self.serialized_ids = set()
+
+    def serialize(self, tasks, dirty_ids=None):
+        entries = self._entries
+        new_entries = {}
+        result = []
+        serialized_ids = set()
+        for task in tasks:
+            task_id = task.get('task_id')
+            version = getattr(task, 'version', None)
+            entry = entries.get(task_id)
+            if (dirty_ids is not None and entry is not None and entry[0] is task and entry[1] == version
+                    and task_id not in dirty_ids):
+                data = entry[2]
+            else:
+                data = serialize_task(task)
+                serialized_ids.add(task_id)
+            if task_id:
+                new_entries[task_id] = (task, version, data)
+            result.append(data)
+        self._entries = new_entries
+        self.serialized_ids = serialized_ids
+        return result
+
+    def clear(self):
+        self._entries = {}
+
+
+def diff_tasks(old_state, old_order, tasks, serialized=None):
+    """比较上次持久化的状态与当前任务列表，生成按 task_id 描述的变更记录
+
+    old_state: task_id -> 序列化后的任务字典
+    old_order: 上次持久化时的 task_id 顺序
+    serialized: 与 tasks 一一对应的序列化结果（可选，通常来自 SerializationCache）
+    返回 (records, new_state, new_order)；记录按顺序重放即可得到新的任务列表
+    """
+    if serialized is None:
+        serialized = [serialize_task(task) for task in tasks]
+    new_state = {}
+    new_order = []
+    for data in serialized:
+        task_id = data['task_id']
+        if not task_id or task_id in new_state:
+            raise ValueError("journal requires unique task_id on every task")
+        new_state[task_id] = data
+        new_order.append(task_id)
+
+    records = [{'op': 'remove', 'id': task_id}
+               for task_id in old_order if task_id not in new_state]
+
+    # 相对顺序保持不变的最长子序列中的任务不需要移动，其余任务逐个移动到新前驱之后
+    old_position = {task_id: i for i, task_id in enumerate(old_order) if task_id in new_state}
+    stable = longest_increasing_run(
+        [task_id for task_id in new_order if task_id in old_position], old_position)
+
+    prev = None
+    for task_id in new_order:
+        data = new_state[task_id]
+        old_data = old_state.get(task_id)
+        if old_data is None:
+            records.append({'op': 'add', 'id': task_id, 'after': prev, 'task': data})
+        else:
+            # 复用缓存的序列化结果说明任务没有被修改，不需要逐字段比较
+            changed = None if data is old_data else {
+                key: value for key, value in data.items() if old_data.get(key) != value}
+            if changed:
+                records.append({'op': 'update', 'id': task_id, 'set': changed})
+            if task_id not in stable:
+                records.append({'op': 'move', 'id': task_id, 'after': prev})
+        prev = task_id
+
+    return records, new_state, new_order
+
+
+def longest_increasing_run(task_ids, position):
+    """返回 task_ids 中按 position 递增的最长子序列（集合形式），O(n log n)"""
+    tails = []       # tails[k]: 长度为 k+1 的递增子序列末尾的位置值
+    tail_index = []  # 对应的 task_ids 下标
+    parent = [-1] * len(task_ids)
+    for i, task_id in enumerate(task_ids):
+        value = position[task_id]
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_index.append(i)
+        else:
+            tails[k] = value
+            tail_index[k] = i
+        parent[i] = tail_index[k - 1] if k > 0 else -1
+
+    result = set()
+    i = tail_index[-1] if tail_index else -1
+    while i != -1:
+        result.add(task_ids[i])
+        i = parent[i]
+    return result
+
+
+def apply_records(tasks, records, factory=dict):
+    """把变更记录按顺序应用到任务列表上，返回新的任务列表
+
+    factory 用于创建新增的任务（默认复制为字典，应用内使用 Task.from_dict）。
+
+    记录只描述最终状态（字段的新值、移动到哪个任务之后），重复应用是安全的，
+    因此压缩过程中崩溃留下的日志可以再次重放。
+    """
+    if not records:
+        return tasks
+
+    # 用双向链表表示顺序，使每条 add/move 记录都是 O(1)
+    head = object()
+    by_id = {}
+    next_of = {head: None}
+    prev_of = {}
+    last = head
+    for task in tasks:
+        task_id = task.get('task_id')
+        key = task_id if task_id else object()
+        by_id[key] = task
+        next_of[last] = key
+        prev_of[key] = last
+        next_of[key] = None
+        last = key
+
+    def unlink(key):
+        before, after = prev_of.pop(key), next_of.pop(key)
+        next_of[before] = after
+        if after is not None:
+            prev_of[after] = before
+
+    def link_after(key, anchor):
+        if anchor is None or anchor not in next_of:
+            anchor = head
+        after = next_of[anchor]
+        next_of[anchor] = key
+        prev_of[key] = anchor
+        next_of[key] = after
+        if after is not None:
+            prev_of[after] = key
+
+    for record in records:
+        op = record.get('op')
+        task_id = record.get('id')
+        if op == 'add':
+            data = expand_task(record['task'])
+            if task_id in by_id:
+                by_id[task_id].update(data)
+                unlink(task_id)
+            else:
+                by_id[task_id] = factory(data)
+            link_after(task_id, record.get('after'))
+        elif op == 'update':
+            if task_id in by_id:
+                by_id[task_id].update({LONG_KEYS.get(key, key): value
+                                       for key, value in record.get('set', {}).items()})
+        elif op == 'move':
+            if task_id in by_id and record.get('after') != task_id:
+                unlink(task_id)
+                link_after(task_id, record.get('after'))
+        elif op == 'remove':
+            if task_id in by_id:
+                unlink(task_id)
+                del by_id[task_id]
+
+    result = []
+    key = next_of[head]
+    while key is not None:
+        result.append(by_id[key])
+        key = next_of[key]
+    return result
+
+
+def merge_tasks(base_state, base_order, ours, theirs):
+    """三方合并本进程与其他进程对任务的修改，返回需要应用到本进程数据上的外部修改
+
+    base_state/base_order: 双方共同的基准（本进程上次读取或写入的磁盘状态）
+    ours: 本进程当前的序列化任务列表；theirs: 磁盘上当前的序列化任务列表
+    以任务为单位合并：只有一方修改的任务取该方的版本；双方修改了同一任务时逐字段合并，
+    同一字段冲突时以本进程为准；一方删除而另一方没有修改的任务被删除，另一方修改过
+    的任务则保留。任务顺序以本进程为准，外部新增的任务插入到它在外部列表中的前驱之后。
+    返回的记录可以用 apply_records 应用到 ours 或内存中的任务列表上。
+    """
+    ours_state = {data['task_id']: data for data in ours}
+    theirs_state = {data['task_id']: data for data in theirs}
+    records = []
+
+    for task_id, data in ours_state.items():
+        base = base_state.get(task_id)
+        their = theirs_state.get(task_id)
+        if base is None or their is None:
+            if base is not None and data == base:
+                # 外部删除了本进程没有修改的任务
+                records.append({'op': 'remove', 'id': task_id})
+            continue
+        if their == base:
+            continue
+        changed = {key: value for key, value in their.items()
+                   if value != base.get(key) and data.get(key) == base.get(key) and data.get(key) != value}
+        if changed:
+            records.append({'op': 'update', 'id': task_id, 'set': changed})
+
+    prev = None
+    for data in theirs:
+        task_id = data['task_id']
+        if task_id not in ours_state:
+            base = base_state.get(task_id)
+            # 外部新增的任务，或本进程删除但外部修改过的任务
+            if base is None or data != base:
+                records.append({'op': 'add', 'id': task_id, 'after': prev, 'task': data})
+            else:
+                continue
+        prev = task_id
+    return records
+
+
+class TaskJournal:
+    """追加式任务变更日志
+
+    每次修改只在 tasks.json 旁边的日志文件末尾追加少量记录，而不是重写整个文件。
+    每行格式为 "<crc32> <json>"，加载时校验每条记录，末尾写了一半的记录会被丢弃。
+    日志超过大小或记录数阈值后，在后台线程中把当前状态压缩为新的快照。
+    """
+
+    MAX_BYTES = 1024 * 1024
+    MAX_RECORDS = 5000
+
+    def __init__(self, snapshot_path, encode=encode_snapshot, file_lock=None):
+        self.snapshot_path = Path(snapshot_path)
+        self.encode = encode  # 压缩日志时用于编码新快照
+        self.file_lock = file_lock  # 跨进程的文件锁，压缩时写快照需要持有
+        self.on_compacted = None  # 压缩完成后的回调（在压缩线程中调用）
+        self.path = self.journal_path(self.snapshot_path)
+        self.compacting_path = self.path.with_name(self.path.name + '.compacting')
+        self.record_count = 0
+        self.size = 0
+        self._state = {}
+        self._order = []
+        self._compactor = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def journal_path(snapshot_path):
+        snapshot_path = Path(snapshot_path)
+        return snapshot_path.with_name(snapshot_path.name + '.journal')
+
+    @classmethod
+    def pending_paths(cls, snapshot_path):
+        """按重放顺序返回需要应用到快照上的日志文件"""
+        path = cls.journal_path(snapshot_path)
+        return [path.with_name(path.name + '.compacting'), path]
+
+    @classmethod
+    def replay(cls, snapshot_path, tasks):
+        """把快照之后的日志记录应用到任务列表上"""
+        for path in cls.pending_paths(snapshot_path):
+            records, _, _ = cls.read_records(path, repair=True)
+            tasks = apply_records(tasks, records)
+        return tasks
+
+    @classmethod
+    def discard(cls, snapshot_path):
+        """完整快照写入后，旧的日志已经包含在快照中，可以删除"""
+        for path in cls.pending_paths(snapshot_path):
+            if path.exists():
+                path.unlink()
+
+    @staticmethod
+    def encode_record(record):
+        # 日志中的任务同样使用短字段名并省略默认值
+        if record.get('op') == 'add':
+            record = dict(record, task=compact_task(record['task']))
+        elif record.get('op') == 'update':
+            record = dict(record, set={SHORT_KEYS.get(key, key): value for key, value in record['set'].items()})
+        payload = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        return f"{zlib.crc32(payload.encode('utf-8')):08x} {payload}\n"
+
+    @staticmethod
+    def read_records(path, repair=False):
+        """读取日志中校验通过的记录，返回 (records, 有效字节数, 是否发现损坏)
+
+        遇到校验失败的记录即停止读取（之后的记录可能依赖它）；repair 为 True 时
+        把文件截断到最后一条有效记录，避免之后追加的记录跟在损坏数据后面。
+        """
+        records = []
+        valid_bytes = 0
+        corrupted = False
+        try:
+            data = Path(path).read_bytes()
+        except FileNotFoundError:
+            return records, 0, False
+
+        for line in data.splitlines(keepends=True):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("torn record")
+                checksum, payload = line.rstrip(b'\n').split(b' ', 1)
+                if int(checksum, 16) != zlib.crc32(payload):
+                    raise ValueError("checksum mismatch")
+                records.append(json.loads(payload.decode('utf-8')))
+            except (ValueError, UnicodeDecodeError):
+                corrupted = True
+                break
+            valid_bytes += len(line)
+
+        if corrupted and repair:
+            print(f"Dropping corrupted journal records in {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        return records, valid_bytes, corrupted
+
+    def reset(self, tasks):
+        """以当前任务列表作为已持久化的基准状态"""
+        _, self._state, self._order = diff_tasks({}, [], tasks)
+        records, self.size, _ = self.read_records(self.path)
+        self.record_count = len(records)
+
+    def append(self, tasks, serialized=None):
+        """把与上次持久化状态之间的差异追加到日志，返回追加的记录数"""
+        records, self._state, self._order = diff_tasks(self._state, self._order, tasks, serialized)
+        if records:
+            text = ''.join(self.encode_record(record) for record in records)
+            data = text.encode('utf-8')
+            with self._lock:
+                with open(self.path, 'ab') as f:
+                    f.write(data)
+            self.size += len(data)
+            self.record_count += len(records)
+        return len(records)
+
+    def needs_compaction(self):
+        return self.size >= self.MAX_BYTES or self.record_count >= self.MAX_RECORDS
+
+    def is_compacting(self):
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def compact_in_background(self):
+        """轮换日志文件，并在后台线程中写入新的快照"""
+        if self.is_compacting():
+            return
+        with self._lock:
+            if self.path.exists():
+                if self.compacting_path.exists():
+                    # 上一次压缩没有完成，把新日志接在它后面，保证重放顺序
+                    with open(self.compacting_path, 'ab') as target:
+                        target.write(self.path.read_bytes())
+                    self.path.unlink()
+                else:
+                    os.replace(self.path, self.compacting_path)
+        self.size = 0
+        self.record_count = 0
+
+        # 状态字典在变更时整体替换而不是原地修改，这里只需复制引用
+        snapshot = [self._state[task_id] for task_id in self._order]
+        self._compactor = threading.Thread(target=self._write_snapshot, args=(snapshot,), daemon=True)
+        self._compactor.start()
+
+    def _write_snapshot(self, snapshot):
+        try:
+            with self.file_lock or _NO_LOCK:
+                if not self.compacting_path.exists():
+                    # 其他进程已经写入了包含这些记录的完整快照
+                    return
+                write_snapshot_atomic(self.snapshot_path, self.encode(snapshot))
+                with self._lock:
+                    if self.compacting_path.exists():
+                        self.compacting_path.unlink()
+                if self.on_compacted is not None:
+                    self.on_compacted()
+        except Exception as e:
+            print(f"Error compacting journal: {e}")
+
+    def close(self):
+        """等待正在进行的压缩完成"""
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+
+class JsonStorage:
+    """把任务保存为 tasks.json 快照，可选配合追加式变更日志"""
+
+    name = 'json'
+
+    def __init__(self, path, journal=False, compact=False, compress=False):
+        self.path = Path(path)
+        self.compact = compact
+        self.compress = compress
+        # 多个进程（或同步脚本）读写同一份数据时，用 tasks.json.lock 互斥
+        self.lock = FileLock(self.path.with_name(self.path.name + '.lock'))
+        self.journal = TaskJournal(self.path, encode=self.encode, file_lock=self.lock) if journal else None
+        if self.journal is not None:
+            self.journal.on_compacted = self._remember_signature
+        self._journal_ready = False
+        self.stats = SaveStats()
+        self._cache = SerializationCache()
+        self._saved_digest = None  # 上次写入的快照内容的哈希，内容相同时跳过写入
+        # 本进程上次读取或写入的磁盘状态，作为与其他进程三方合并的基准。
+        # 加载后先保存任务的浅拷贝，真正需要合并时才序列化
+        self._base = ([], None)  # (浅拷贝的任务列表, None) 或 (序列化状态, 顺序)
+        self._signature = None  # 上次读写后数据文件的签名
+
+    def encode(self, serialized_tasks):
+        return encode_snapshot(serialized_tasks, compact=self.compact, compress=self.compress)
+
+    def load(self):
+        """读取快照并重放日志；文件不存在或损坏时返回空列表
+
+        新旧格式（完整字段列表 / 紧凑格式 / zlib 压缩）都可以直接读取。
+        """
+        with self.lock:
+            return self.finish_load(self._read_snapshot())
+
+    def _read_snapshot(self):
+        try:
+            return decode_snapshot(json.loads(read_snapshot_text(self.path)))
+        except FileNotFoundError:
+            return []
+        except (ValueError, zlib.error) as e:
+            # 内容损坏（包括截断的压缩数据和不认识的格式版本）时与 JSON 损坏一样按空列表处理
+            print(f"Error loading tasks: {e}")
+            return []
+
+    def size_hint(self):
+        """快照及日志文件的总字节数，用于判断是否需要流式加载"""
+        size = 0
+        for path in [self.path] + TaskJournal.pending_paths(self.path):
+            try:
+                size += path.stat().st_size
+            except OSError:
+                pass
+        return size
+
+    def data_paths(self):
+        """保存任务数据的所有文件，用于判断数据是否被修改过"""
+        return [self.path] + TaskJournal.pending_paths(self.path)
+
+    def iter_load(self, chunk_size=1000):
+        """流式读取快照，逐块产出任务；全部读完后需调用 finish_load()"""
+        try:
+            yield from iter_snapshot_tasks(iter_snapshot_text(self.path), chunk_size)
+        except FileNotFoundError:
+            return
+
+    def finish_load(self, tasks):
+        """重放快照之后的日志，并以结果作为后续追加日志的基准"""
+        with self.lock:
+            tasks = TaskJournal.replay(self.path, tasks)
+            if self.journal is not None and all(task.get('task_id') for task in tasks):
+                # 磁盘上的每个任务都有 task_id 时，才能以它为基准继续追加日志
+                self.journal.reset(tasks)
+                self._journal_ready = True
+            self._base = ([dict(task) for task in tasks], None)
+            self._remember_signature()
+        return tasks
+
+    def _remember_signature(self):
+        self._signature = file_signature(self.data_paths())
+
+    def _base_state(self):
+        tasks, order = self._base
+        if order is None:
+            _, state, order = diff_tasks({}, [], [task for task in tasks if task.get('task_id')])
+            self._base = (state, order)
+        return self._base
+
+    def has_external_changes(self):
+        """数据文件自本进程上次读写之后是否被其他进程修改过"""
+        return file_signature(self.data_paths()) != self._signature
+
+    def read_external_changes(self):
+        """重新读取磁盘数据，返回相对上次读写状态的变更记录（按 task_id 描述）
+
+        调用前本进程不能有尚未保存的修改；返回的记录用 apply_records 应用到内存中的任务上。
+        """
+        with self.lock:
+            base_state, base_order = self._base_state()
+            tasks = self.finish_load(self._read_snapshot())
+            # 内存中的任务对象会被就地更新，缓存的序列化结果不再可信
+            self._cache.clear()
+            self._saved_digest = None
+            records, state, order = diff_tasks(base_state, base_order, [task for task in tasks if task.get('task_id')])
+            self._base = (state, order)
+            return records
+
+    def save(self, tasks, dirty_ids=None):
+        """保存任务列表；dirty_ids 为本次修改过的 task_id 集合，None 表示结构可能变化
+
+        磁盘上的数据被其他进程修改过时，先与其按任务三方合并再写入，并返回需要应用到
+        内存中的外部修改记录；否则返回 None。
+        """
+        with self.lock:
+            self.stats.attempted += 1
+            tasks_to_save = self._cache.serialize(tasks, dirty_ids)
+            external = None
+            if self.has_external_changes():
+                base_state, base_order = self._base_state()
+                with_ids = [data for data in tasks_to_save if data['task_id']]
+                theirs = [serialize_task(task) for task in TaskJournal.replay(self.path, self._read_snapshot())
+                          if task.get('task_id')]
+                external = merge_tasks(base_state, base_order, with_ids, theirs)
+                tasks_to_save = apply_records([dict(data) for data in tasks_to_save], external)
+                tasks = tasks_to_save
+                self._cache.clear()
+                self._saved_digest = None
+                # 日志的基准已经过时，写入完整快照
+                self._journal_ready = False
+            self._save(tasks, tasks_to_save)
+            if all(data['task_id'] for data in tasks_to_save):
+                self._base = ({data['task_id']: data for data in tasks_to_save},
+                              [data['task_id'] for data in tasks_to_save])
+            else:
+                self._base = ([dict(data) for data in tasks_to_save], None)
+            self._remember_signature()
+            return external
+
+    def _save(self, tasks, tasks_to_save):
+        if self.journal is not None and self._journal_ready:
+            try:
+                # 日志模式：只追加本次修改涉及的记录
+                size = self.journal.size
+                if self.journal.append(tasks, tasks_to_save):
+                    self.stats.performed += 1
+                    self.stats.bytes_written += self.journal.size - size
+                else:
+                    self.stats.skipped += 1
+                if self.journal.needs_compaction():
+                    self.journal.compact_in_background()
+                return
+            except ValueError as e:
+                # 存在缺少或重复 task_id 的任务，退回完整保存
+                print(f"Journal unavailable, saving full snapshot: {e}")
+                self._journal_ready = False
+
+        data = self.encode(tasks_to_save)
+        raw = data if isinstance(data, bytes) else data.encode('utf-8')
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        if digest == self._saved_digest:
+            self.stats.skipped += 1
+            return
+        write_snapshot_atomic(self.path, data)
+        self._saved_digest = digest
+        self.stats.performed += 1
+        self.stats.bytes_written += len(raw)
+        # 完整快照已经包含了日志中的所有修改
+        TaskJournal.discard(self.path)
+        if self.journal is not None:
+            try:
+                self.journal.reset(tasks)
+                self._journal_ready = True
+            except ValueError:
+                self._journal_ready = False
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+
+class SQLiteStorage:
+    """基于标准库 sqlite3 的任务存储
+
+    使用 WAL 模式，任务顺序保存在显式的 position 列中。每次保存只把与上次状态
+    不同的任务写成单行 INSERT/UPDATE/DELETE，而不是重写全部数据。
+    """
+
+    name = 'sqlite'
+
+    # 任务字段 -> 数据库列；布尔值保存为整数，subtasks 保存为 JSON 文本
+    COLUMNS = ('name',) + tuple(key for key, _ in TASK_FIELDS if key != 'task_id')
+    BOOL_COLUMNS = frozenset(key for key, default in TASK_FIELDS if default is False)
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_id TEXT PRIMARY KEY,
+            position REAL NOT NULL,
+            section TEXT NOT NULL DEFAULT '',
+            name TEXT NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0,
+            cancelled INTEGER NOT NULL DEFAULT 0,
+            urgent INTEGER NOT NULL DEFAULT 0,
+            separator INTEGER NOT NULL DEFAULT 0,
+            title INTEGER NOT NULL DEFAULT 0,
+            completed_time TEXT NOT NULL DEFAULT '',
+            deadline TEXT NOT NULL DEFAULT '',
+            was_urgent INTEGER NOT NULL DEFAULT 0,
+            subtasks TEXT NOT NULL DEFAULT '[]',
+            is_subtask INTEGER NOT NULL DEFAULT 0,
+            parent_task_id TEXT,
+            custom_bg_color TEXT NOT NULL DEFAULT '',
+            order_key TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks(parent_task_id);
+        CREATE INDEX IF NOT EXISTS idx_tasks_section ON tasks(section);
+        CREATE INDEX IF NOT EXISTS idx_tasks_flags ON tasks(done, cancelled);
+        CREATE INDEX IF NOT EXISTS idx_tasks_deadline ON tasks(deadline);
+        CREATE INDEX IF NOT EXISTS idx_tasks_position ON tasks(position);
+    """
+
+    # 旧版本创建的数据库中没有的列，打开时补上
+    ADDED_COLUMNS = {'order_key': "TEXT NOT NULL DEFAULT ''"}
+
+    # 相邻位置之间的间隔小于该值时重新编号
+    MIN_GAP = 1e-9
+
+    def __init__(self, path):
+        import sqlite3
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 加载在界面线程，保存在后台持久化线程，两者不会同时进行
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+        existing = {row[1] for row in self.conn.execute('PRAGMA table_info(tasks)')}
+        with self.conn:
+            for column, definition in self.ADDED_COLUMNS.items():
+                if column not in existing:
+                    self.conn.execute(f'ALTER TABLE tasks ADD COLUMN {column} {definition}')
+        self._lock = threading.Lock()
+        self._state = {}
+        self._order = []
+        self._positions = {}
+        self._sections = {}
+        self.stats = SaveStats()
+        self._cache = SerializationCache()
+        self._rows_written = 0
+        self._data_version = None
+
+    def data_paths(self):
+        return [self.path, self.path.with_name(self.path.name + '-wal')]
+
+    def is_empty(self):
+        return self.conn.execute('SELECT 1 FROM tasks LIMIT 1').fetchone() is None
+
+    def load(self):
+        tasks = []
+        for chunk in self.iter_load():
+            tasks.extend(chunk)
+        return self.finish_load(tasks)
+
+    def size_hint(self):
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def iter_load(self, chunk_size=1000):
+        """按 position 顺序分批读取任务；全部读完后需调用 finish_load()"""
+        columns = ', '.join(('task_id', 'position', 'section') + self.COLUMNS)
+        self._positions = {}
+        self._sections = {}
+        self._cache.clear()
+        cursor = self.conn.execute(f'SELECT {columns} FROM tasks ORDER BY position')
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [self._row_to_task(row) for row in rows]
+
+    def _row_to_task(self, row):
+        task_id, position, section = row[:3]
+        task = {'task_id': task_id}
+        for column, value in zip(self.COLUMNS, row[3:]):
+            if column in self.BOOL_COLUMNS:
+                value = bool(value)
+            elif column == 'subtasks':
+                value = json.loads(value)
+            task[column] = value
+        self._positions[task_id] = position
+        self._sections[task_id] = section
+        return task
+
+    def _read_all(self):
+        """读取全部任务（调用方需持有 self._lock）"""
+        columns = ', '.join(('task_id', 'position', 'section') + self.COLUMNS)
+        self._positions = {}
+        self._sections = {}
+        rows = self.conn.execute(f'SELECT {columns} FROM tasks ORDER BY position').fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def finish_load(self, tasks):
+        with self._lock:
+            _, self._state, self._order = diff_tasks({}, [], tasks)
+            self._data_version = self._read_data_version()
+        return tasks
+
+    def _read_data_version(self):
+        # 其他连接（其他进程）提交修改后该值会变化，本连接自己的提交不会改变它
+        return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def has_external_changes(self):
+        """数据库自本进程上次读写之后是否被其他进程修改过"""
+        with self._lock:
+            return self._read_data_version() != self._data_version
+
+    def read_external_changes(self):
+        """重新读取数据库，返回相对上次读写状态的变更记录（调用前不能有未保存的修改）"""
+        with self._lock:
+            old_state, old_order = self._state, self._order
+            tasks = self._read_all()
+            records, self._state, self._order = diff_tasks(old_state, old_order, tasks)
+            self._data_version = self._read_data_version()
+            self._cache.clear()
+            return records
+
+    def save(self, tasks, dirty_ids=None):
+        """保存任务列表；dirty_ids 为本次修改过的 task_id 集合，None 表示结构可能变化
+
+        数据库被其他进程修改过时先按任务合并，并返回需要应用到内存中的外部修改记录。
+        """
+        with self._lock:
+            self.stats.attempted += 1
+            serialized = self._cache.serialize(tasks, dirty_ids)
+            external = None
+            if self._read_data_version() != self._data_version:
+                # 其他进程修改过数据库：以数据库当前内容为新的基准，合并双方的修改
+                theirs = [serialize_task(task) for task in self._read_all()]
+                external = merge_tasks(self._state, self._order, serialized, theirs)
+                serialized = apply_records([dict(data) for data in serialized], external)
+                tasks = serialized
+                _, self._state, self._order = diff_tasks({}, [], theirs)
+                self._cache.clear()
+            records, new_state, new_order = diff_tasks(self._state, self._order, tasks, serialized)
+            sections = self._compute_sections(new_state, new_order)
+            placed = {record['id'] for record in records if record['op'] in ('add', 'move')}
+            positions = self._place(new_order, placed)
+
+            rows_written = self._rows_written
+            with self.conn:
+                for record in records:
+                    task_id = record['id']
+                    if record['op'] == 'remove':
+                        self.conn.execute('DELETE FROM tasks WHERE task_id = ?', (task_id,))
+                        self._rows_written += 1
+                        self._positions.pop(task_id, None)
+                        self._sections.pop(task_id, None)
+                    elif record['op'] == 'add':
+                        self._insert(task_id, record['task'], positions[task_id], sections[task_id])
+                    elif record['op'] == 'update':
+                        changes = {key: value for key, value in record['set'].items() if key != 'task_id'}
+                        self._update(task_id, changes)
+
+                for task_id, position in positions.items():
+                    if task_id not in self._positions or self._positions[task_id] != position:
+                        self._update(task_id, {'position': position})
+                for task_id, section in sections.items():
+                    if self._sections.get(task_id) != section:
+                        self._update(task_id, {'section': section})
+
+            self._positions.update(positions)
+            self._sections = sections
+            self._state, self._order = new_state, new_order
+            if self._rows_written != rows_written:
+                self.stats.performed += 1
+            else:
+                self.stats.skipped += 1
+            self._data_version = self._read_data_version()
+            return external
+
+    def _insert(self, task_id, data, position, section):
+        columns = ('task_id', 'position', 'section') + self.COLUMNS
+        values = [task_id, position, section] + [self._to_db(column, data.get(column)) for column in self.COLUMNS]
+        placeholders = ', '.join('?' * len(columns))
+        self.conn.execute(f"INSERT OR REPLACE INTO tasks ({', '.join(columns)}) VALUES ({placeholders})", values)
+        self._count_row(values)
+        self._positions[task_id] = position
+        self._sections[task_id] = section
+
+    def _update(self, task_id, changes):
+        if not changes:
+            return
+        assignments = ', '.join(f'{column} = ?' for column in changes)
+        values = [self._to_db(column, value) for column, value in changes.items()]
+        self.conn.execute(f'UPDATE tasks SET {assignments} WHERE task_id = ?', values + [task_id])
+        self._count_row(values)
+
+    def _count_row(self, values):
+        # 按写入的列值的长度估算写入字节数（不含 SQLite 自身的页和 WAL 开销）
+        self._rows_written += 1
+        self.stats.bytes_written += sum(len(str(value)) for value in values if value is not None)
+
+    def _to_db(self, column, value):
+        if column in self.BOOL_COLUMNS:
+            return int(bool(value))
+        if column == 'subtasks':
+            return json.dumps(value or [])
+        return value
+
+    @staticmethod
+    def _compute_sections(state, order):
+        """每个任务所在分组 = 它之前最近一条分割线的 task_id（第一个分组为空字符串）"""
+        sections = {}
+        section = ''
+        for task_id in order:
+            if state[task_id]['separator']:
+                section = task_id
+            sections[task_id] = section
+        return sections
+
+    def _place(self, order, placed):
+        """为新增或移动的任务分配位置，只修改这些任务自己的 position
+
+        未移动的任务保持原位置且相对顺序不变；每一段连续的待放置任务均匀分布在
+        前后两个未移动任务之间。间隔耗尽时整体重新编号。
+        """
+        positions = {}
+        run = []
+        lower = 0.0
+        for task_id in order + [None]:
+            if task_id is not None and (task_id in placed or task_id not in self._positions):
+                run.append(task_id)
+                continue
+            upper = self._positions[task_id] if task_id is not None else None
+            if run:
+                if upper is None:
+                    step = 1.0
+                else:
+                    step = (upper - lower) / (len(run) + 1)
+                if step < self.MIN_GAP:
+                    return {task_id: float(i + 1) for i, task_id in enumerate(order)}
+                for i, run_id in enumerate(run, start=1):
+                    positions[run_id] = lower + step * i
+                run = []
+            if task_id is not None:
+                lower = upper
+        return positions
+
+    def migrate_from(self, source):
+        """一次性把其他存储（如 tasks.json）中的任务导入数据库"""
+        import uuid
+        tasks = source.load()
+        for task in tasks:
+            if not task.get('task_id'):
+                task['task_id'] = str(uuid.uuid4())
+        self.save(tasks)
+        return len(tasks)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_storage(tasks_file, backend='json', journal=False, compact=False, compress=False):
+    """根据配置创建存储后端；首次切换到 sqlite 时自动从 tasks.json 迁移"""
+    tasks_file = Path(tasks_file)
+    if backend == 'sqlite':
+        db_path = tasks_file.with_suffix('.db')
+        storage = SQLiteStorage(db_path)
+        if storage.is_empty() and tasks_file.exists():
+            count = storage.migrate_from(JsonStorage(tasks_file))
+            # 保留原文件作为备份，同时避免下次启动重复迁移
+            os.replace(tasks_file, tasks_file.with_name(tasks_file.name + '.migrated'))
+            print(f"Migrated {count} tasks from {tasks_file.name} to {db_path.name}")
+        return storage
+    return JsonStorage(tasks_file, journal=journal, compact=compact, compress=compress)
@@ -0,0 +1,249 @@
+"""内存中的任务模型：使用 __slots__ 的 Task 类代替每个任务一个字典"""
+import sys
+
+# 保存到磁盘的任务字段及其默认值（顺序即 tasks.json 中的字段顺序）
+TASK_FIELDS = (
+    ('done', False),
+    ('cancelled', False),
+    ('urgent', False),
+    ('separator', False),
+    ('title', False),
+    ('completed_time', ''),
+    ('deadline', ''),
+    ('was_urgent', False),
+    ('subtasks', []),
+    ('is_subtask', False),
+    ('parent_task_id', None),
+    ('task_id', None),
+    ('custom_bg_color', ''),
+    ('order_key', ''),  # 排序键（见 order_keys），由 TaskStore 维护
+)
+
+# 任务种类：separator/title 两个布尔字段合并为一个 kind
+KIND_TASK = 0
+KIND_SEPARATOR = 1
+KIND_TITLE = 2  # 带标题的分割线
+
+# 大量任务之间重复出现的字符串（颜色、截止日期、时间戳、父任务 ID），驻留后只保存一份
+INTERNED_FIELDS = frozenset({'completed_time', 'deadline', 'custom_bg_color', 'parent_task_id'})
+
+_DEFAULTS = dict(TASK_FIELDS)
+_DEFAULTS['name'] = ''
+_KIND_FIELDS = ('separator', 'title')
+_SLOT_FIELDS = tuple(key for key in _DEFAULTS if key not in _KIND_FIELDS)
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Task:
+    """一个任务（或分割线）
+
+    热路径直接读取属性（task.done、task.kind），不再做字典查找。为了让现有的
+    TodoApp 代码和测试在过渡期间继续工作，同时提供 get/[]/pop/in/update 等字典接口。
+    不在模型中的键（旧数据或以后新增的字段）保存在 _extra 中。
+    相等比较按对象身份，两个内容相同的任务不会被当成同一个任务。
+
+    version 在通过字典接口修改字段时加一，显示缓存据此判断任务是否变化；
+    同时通知任务所在的 TaskStore 更新索引和计数（_store）。
+    直接给属性赋值之后需要调用 touch()。
+    """
+
+    __slots__ = _SLOT_FIELDS + ('kind', '_extra', 'version', '_store')
+
+    def __init__(self, name='', kind=KIND_TASK, **fields):
+        self.name = name
+        self.kind = kind
+        self.done = False
+        self.cancelled = False
+        self.urgent = False
+        self.completed_time = ''
+        self.deadline = ''
+        self.was_urgent = False
+        self.subtasks = []
+        self.is_subtask = False
+        self.parent_task_id = None
+        self.task_id = None
+        self.custom_bg_color = ''
+        self.order_key = ''
+        self._extra = None
+        self.version = 0
+        self._store = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        """从磁盘格式（完整字段字典）创建任务"""
+        task = cls.__new__(cls)
+        get = data.get
+        task.name = get('name', '')
+        if get('separator', False):
+            task.kind = KIND_TITLE if get('title', False) else KIND_SEPARATOR
+        else:
+            task.kind = KIND_TASK
+        task.done = bool(get('done', False))
+        task.cancelled = bool(get('cancelled', False))
+        task.urgent = bool(get('urgent', False))
+        task.completed_time = _intern(get('completed_time', '') or '')
+        task.deadline = _intern(get('deadline', '') or '')
+        task.was_urgent = bool(get('was_urgent', False))
+        subtasks = get('subtasks')
+        task.subtasks = list(subtasks) if subtasks else []
+        task.is_subtask = bool(get('is_subtask', False))
+        task.parent_task_id = _intern(get('parent_task_id'))
+        task.task_id = get('task_id')
+        task.custom_bg_color = _intern(get('custom_bg_color', '') or '')
+        task.order_key = get('order_key', '') or ''
+        task._extra = {key: value for key, value in data.items() if key not in _DEFAULTS} or None
+        task.version = 0
+        task._store = None
+        return task
+
+    def to_dict(self):
+        """转换为 tasks.json 中保存的完整字段字典（字段顺序与 TASK_FIELDS 一致）"""
+        return {
+            'name': self.name,
+            'done': self.done,
+            'cancelled': self.cancelled,
+            'urgent': self.urgent,
+            'separator': self.kind != KIND_TASK,
+            'title': self.kind == KIND_TITLE,
+            'completed_time': self.completed_time,
+            'deadline': self.deadline,
+            'was_urgent': self.was_urgent,
+            'subtasks': list(self.subtasks),
+            'is_subtask': self.is_subtask,
+            'parent_task_id': self.parent_task_id,
+            'task_id': self.task_id,
+            'custom_bg_color': self.custom_bg_color,
+            'order_key': self.order_key,
+        }
+
+    # separator/title 由 kind 推导
+    @property
+    def separator(self):
+        return self.kind != KIND_TASK
+
+    @separator.setter
+    def separator(self, value):
+        if not value:
+            self.kind = KIND_TASK
+        elif self.kind == KIND_TASK:
+            self.kind = KIND_SEPARATOR
+
+    @property
+    def title(self):
+        return self.kind == KIND_TITLE
+
+    @title.setter
+    def title(self, value):
+        if value:
+            if self.kind != KIND_TASK:
+                self.kind = KIND_TITLE
+        elif self.kind == KIND_TITLE:
+            self.kind = KIND_SEPARATOR
+
+    def touch(self):
+        """标记任务已修改（直接给属性赋值之后使用）"""
+        self.version += 1
+        if self._store is not None:
+            self._store.task_changed(self)
+
+    def __repr__(self):
+        return f"Task({self.name!r}, task_id={self.task_id!r})"
+
+    # 兼容旧的字典接口（过渡期间使用，新代码应直接读写属性）
+
+    def __getitem__(self, key):
+        if key in _DEFAULTS:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _DEFAULTS:
+            return getattr(self, key)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        self.version += 1
+        if key in _DEFAULTS:
+            setattr(self, key, _intern(value) if key in INTERNED_FIELDS else value)
+            if self._store is not None:
+                self._store.task_changed(self)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _DEFAULTS:
+            self.pop(key)
+        elif self._extra is not None and key in self._extra:
+            self.version += 1
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+        else:
+            raise KeyError(key)
+
+    def pop(self, key, *default):
+        """字段恢复为默认值并返回原来的值；字典中"删除键"等价于恢复默认值"""
+        self.version += 1
+        if key in _DEFAULTS:
+            value = getattr(self, key)
+            field_default = _DEFAULTS[key]
+            setattr(self, key, [] if key == 'subtasks' else field_default)
+            if self._store is not None:
+                self._store.task_changed(self)
+            return value
+        if self._extra is not None and key in self._extra:
+            value = self._extra.pop(key)
+            if not self._extra:
+                self._extra = None
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def __contains__(self, key):
+        """字段取非默认值时视为"存在"，与旧代码中 'key' in task 的用法一致"""
+        if key == 'name':
+            return True
+        if key in _DEFAULTS:
+            return getattr(self, key) != _DEFAULTS[key]
+        return self._extra is not None and key in self._extra
+
+    def keys(self):
+        keys = [key for key in _DEFAULTS if key in self]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, other=(), **fields):
+        items = other.items() if hasattr(other, 'items') else other
+        for key, value in items:
+            self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+
+def to_task(data):
+    """任务对象原样返回，字典（旧代码、测试、外部修改）转换为 Task"""
+    return data if type(data) is Task else Task.from_dict(data)
@@ -0,0 +1,407 @@
+"""任务查询：把查询文本编译为谓词，能用索引的条件先用索引缩小候选范围
+
+查询示例：
+    urgent and due<=3
+    cancelled section:工作
+    is_subtask parent.custom_bg_color
+    not done or (deadline>=2024-05-01 and deadline<2024-06-01)
+
+条件之间用 and（可以省略）或 or 连接，not 取反，括号分组。可用的条件：
+    done / cancelled / urgent / is_subtask（subtask）  布尔字段，可以写成 done:false
+    deadline[<op>YYYY-MM-DD] / due<op>天数 / overdue    截止日期；和列表中的截止日期提示一样只匹配未完成的任务，
+                                                       due 从今天算起（due<=3 为三天以内到期），不包括已超期的任务
+    completed_time（completed）[<op>文本]              完成时间，按前缀比较，例如 completed_time>=2024-05
+    custom_bg_color（color）[:颜色]                    自定义背景色
+    section:标题                                       所在分组的分割线标题包含该文本
+    parent.<条件>                                      子任务的父任务满足该条件
+<op> 为 : = != < <= > >=，其中 : 与 = 相同。值中有空格时用双引号括起来。
+"""
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+try:
+    from .deadline_index import has_open_deadline, parse_deadline
+    from .task_model import KIND_TASK, KIND_TITLE
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from deadline_index import has_open_deadline, parse_deadline
+    from task_model import KIND_TASK, KIND_TITLE
+
+_TOKEN = re.compile(r'\s*(?:(?P<paren>[()])|(?P<name>[A-Za-z_][\w.]*)'
+                    r'(?:(?P<op><=|>=|!=|[<>=:])(?P<value>"[^"]*"|[^\s()]*))?)')
+_KEYWORDS = ('and', 'or', 'not')
+_FLAG_NAMES = {'done': 'done', 'cancelled': 'cancelled', 'urgent': 'urgent',
+               'is_subtask': 'is_subtask', 'subtask': 'is_subtask'}
+_INDEXED_FLAGS = frozenset({'done', 'cancelled', 'urgent'})  # TaskStore.flagged() 可以查询的标记
+_TRUE = ('true', 'yes', '1')
+_FALSE = ('false', 'no', '0')
+_FIRST_DAY = 1  # date.min.toordinal()
+_LAST_DAY = 3652059  # date.max.toordinal()
+_COMPARE = {
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+class QueryError(ValueError):
+    """查询文本无法解析"""
+
+
+class _Context:
+    """一次查询共用的数据：任务列表、今天的日期序数，以及按需计算的分组标题"""
+
+    def __init__(self, store, today):
+        self.store = store
+        self.today = today
+        self._section_starts = None  # 分割线的位置
+        self._section_titles = None  # 分组编号 -> 规范化的标题（没有标题时为 ''）
+
+    def _sections(self):
+        if self._section_starts is None:
+            separators = self.store.separators()
+            self._section_starts = [position for position, _ in separators]
+            self._section_titles = [''] + [task.name.casefold() if task.kind == KIND_TITLE else ''
+                                           for _, task in separators]
+        return self._section_starts, self._section_titles
+
+    def section_title(self, task):
+        starts, titles = self._sections()
+        return titles[bisect_right(starts, self.store.index(task))]
+
+    def section_tasks(self, text):
+        """标题包含 text 的分组中的所有行"""
+        starts, titles = self._sections()
+        store = self.store
+        result = []
+        for section, title in enumerate(titles):
+            if section and text in title:
+                end = starts[section] if section < len(starts) else len(store)
+                result.extend(store[starts[section - 1] + 1:end])
+        return result
+
+
+class _Node:
+    def match(self, task, ctx):
+        raise NotImplementedError
+
+    def candidates(self, ctx):
+        """包含所有匹配任务的候选列表；没有索引可用时返回 None（需要扫描整个列表）"""
+        return None
+
+
+class _And(_Node):
+    def __init__(self, children):
+        self.children = children
+
+    def match(self, task, ctx):
+        return all(child.match(task, ctx) for child in self.children)
+
+    def candidates(self, ctx):
+        # 用候选最少的条件缩小范围，其余条件在 match 中检查
+        best = None
+        for child in self.children:
+            found = child.candidates(ctx)
+            if found is not None and (best is None or len(found) < len(best)):
+                best = found
+        return best
+
+
+class _Or(_Node):
+    def __init__(self, children):
+        self.children = children
+
+    def match(self, task, ctx):
+        return any(child.match(task, ctx) for child in self.children)
+
+    def candidates(self, ctx):
+        union = {}
+        for child in self.children:
+            found = child.candidates(ctx)
+            if found is None:
+                return None
+            for task in found:
+                union[id(task)] = task
+        return list(union.values())
+
+
+class _Not(_Node):
+    def __init__(self, child):
+        self.child = child
+
+    def match(self, task, ctx):
+        return not self.child.match(task, ctx)
+
+
+class _Flag(_Node):
+    def __init__(self, field):
+        self.field = field
+
+    def match(self, task, ctx):
+        return bool(getattr(task, self.field))
+
+    def candidates(self, ctx):
+        if self.field in _INDEXED_FLAGS:
+            return ctx.store.flagged(self.field)
+        return None
+
+
+class _Deadline(_Node):
+    """截止日期序数在 [first, last] 之间的未完成任务；relative 时相对于今天（天数）"""
+
+    def __init__(self, first, last, relative=False):
+        self.first = first
+        self.last = last
+        self.relative = relative
+
+    def _range(self, ctx):
+        if not self.relative:
+            return self.first, self.last
+        first = _FIRST_DAY if self.first is None else ctx.today + self.first
+        last = _LAST_DAY if self.last is None else ctx.today + self.last
+        return first, last
+
+    def match(self, task, ctx):
+        if not has_open_deadline(task):
+            return False
+        first, last = self._range(ctx)
+        return first <= parse_deadline(task.deadline) <= last
+
+    def candidates(self, ctx):
+        return ctx.store.deadlines.between(*self._range(ctx))
+
+
+class _Completed(_Node):
+    def __init__(self, op=None, value=''):
+        self.compare = _COMPARE[op] if op else None
+        self.value = value
+
+    def match(self, task, ctx):
+        completed = task.completed_time
+        if not completed:
+            return False
+        if self.compare is None:
+            return True
+        return self.compare(completed[:len(self.value)], self.value)
+
+
+class _Color(_Node):
+    def __init__(self, value=None):
+        self.value = value
+
+    def match(self, task, ctx):
+        color = task.custom_bg_color
+        if self.value is None:
+            return bool(color)
+        return color.casefold() == self.value
+
+
+class _Section(_Node):
+    def __init__(self, text):
+        self.text = text
+
+    def match(self, task, ctx):
+        return self.text in ctx.section_title(task)
+
+    def candidates(self, ctx):
+        return ctx.section_tasks(self.text)
+
+
+class _Parent(_Node):
+    def __init__(self, child):
+        self.child = child
+
+    def match(self, task, ctx):
+        if not task.is_subtask:
+            return False
+        parent = ctx.store.get(task.parent_task_id)
+        return parent is not None and self.child.match(parent, ctx)
+
+    def candidates(self, ctx):
+        parents = self.child.candidates(ctx)
+        if parents is None:
+            return None
+        store = ctx.store
+        return [child for parent in parents if parent.task_id is not None
+                for child in store.children(parent.task_id)]
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise QueryError(f"无法解析：{text[position:]}")
+        position = match.end()
+        if match.group('paren'):
+            tokens.append((match.group('paren'),))
+            continue
+        name = match.group('name').lower()
+        op = match.group('op')
+        value = match.group('value') or ''
+        if value.startswith('"'):
+            value = value[1:-1]
+        tokens.append(('term', name, '=' if op == ':' else op, value))
+    return tokens
+
+
+def _date_ordinal(value):
+    ordinal = parse_deadline(value)
+    if ordinal is None:
+        raise QueryError(f"日期格式应为 YYYY-MM-DD：{value}")
+    return ordinal
+
+
+def _range_node(op, value, relative):
+    """把比较转换为日期序数（或相对今天的天数）的区间；相对的区间从今天开始，不包括已超期的任务"""
+    low, high = (0, None) if relative else (_FIRST_DAY, _LAST_DAY)
+    if op == '=':
+        return _Deadline(value, value, relative)
+    if op == '!=':
+        return _Or([_Deadline(low, value - 1, relative), _Deadline(value + 1, high, relative)])
+    if op == '<':
+        return _Deadline(low, value - 1, relative)
+    if op == '<=':
+        return _Deadline(low, value, relative)
+    if op == '>':
+        return _Deadline(value + 1, high, relative)
+    return _Deadline(value, high, relative)
+
+
+def _term(name, op, value):
+    if name.startswith('parent.'):
+        return _Parent(_term(name[len('parent.'):], op, value))
+    if op is not None and not value:
+        raise QueryError(f"{name}{op} 后面缺少值")
+
+    if name in _FLAG_NAMES:
+        node = _Flag(_FLAG_NAMES[name])
+        if op is None:
+            return node
+        if op not in ('=', '!=') or value.lower() not in _TRUE + _FALSE:
+            raise QueryError(f"{name} 只能与 true/false 比较")
+        return node if (value.lower() in _TRUE) == (op == '=') else _Not(node)
+    if name == 'deadline':
+        if op is None:
+            return _Deadline(_FIRST_DAY, _LAST_DAY)
+        return _range_node(op, _date_ordinal(value), relative=False)
+    if name == 'due':
+        if op is None:
+            raise QueryError("due 需要天数，例如 due<=3")
+        try:
+            days = int(value)
+        except ValueError:
+            raise QueryError(f"due 的值应为天数：{value}") from None
+        return _range_node(op, days, relative=True)
+    if name == 'overdue':
+        if op is not None:
+            raise QueryError("overdue 不带值")
+        return _Deadline(None, -1, relative=True)
+    if name in ('completed_time', 'completed'):
+        return _Completed(op, value)
+    if name in ('custom_bg_color', 'color'):
+        if op is None:
+            return _Color()
+        if op not in ('=', '!='):
+            raise QueryError(f"{name} 只能用 : = != 比较")
+        node = _Color(value.casefold())
+        return node if op == '=' else _Not(node)
+    if name == 'section':
+        if op not in ('=', '!='):
+            raise QueryError("section 需要标题，例如 section:工作")
+        node = _Section(value.casefold())
+        return node if op == '=' else _Not(node)
+    raise QueryError(f"未知的条件：{name}")
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def peek_keyword(self):
+        token = self.peek()
+        if token is not None and token[0] == 'term' and token[2] is None and token[1] in _KEYWORDS:
+            return token[1]
+        return None
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError("多余的右括号")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek_keyword() == 'or':
+            self.position += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else _Or(children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while True:
+            token = self.peek()
+            keyword = self.peek_keyword()
+            if token is None or token[0] == ')' or keyword == 'or':
+                break
+            if keyword == 'and':
+                self.position += 1
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else _And(children)
+
+    def parse_not(self):
+        if self.peek_keyword() == 'not':
+            self.position += 1
+            return _Not(self.parse_not())
+        token = self.peek()
+        if token is None:
+            raise QueryError("查询不完整")
+        self.position += 1
+        if token[0] == '(':
+            node = self.parse_or()
+            if self.peek() != (')',):
+                raise QueryError("缺少右括号")
+            self.position += 1
+            return node
+        if token[0] == ')' or (token[2] is None and token[1] in _KEYWORDS):
+            raise QueryError("查询不完整")
+        return _term(*token[1:])
+
+
+class Query:
+    """编译好的查询；run(store, today) 返回匹配的任务（不保证顺序）"""
+
+    def __init__(self, text, root):
+        self.text = text
+        self._root = root
+
+    def matches(self, task, store, today):
+        return task.kind == KIND_TASK and self._root.match(task, _Context(store, today))
+
+    def run(self, store, today):
+        ctx = _Context(store, today)
+        root = self._root
+        candidates = root.candidates(ctx)
+        source = store if candidates is None else candidates
+        return [task for task in source if task.kind == KIND_TASK and root.match(task, ctx)]
+
+    def __repr__(self):
+        return f"Query({self.text!r})"
+
+
+@lru_cache(maxsize=128)
+def compile_query(text):
+    """把查询文本编译为 Query（同一段文本只编译一次）；文本无效时抛出 QueryError"""
+    tokens = _tokenize(text)
+    if not tokens:
+        raise QueryError("查询为空")
+    return Query(text, _Parser(tokens).parse())
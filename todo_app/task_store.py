@@ -0,0 +1,698 @@
+"""任务列表及其索引：task_id -> 任务、父任务 -> 子任务、任务 -> 位置、截止日期、计数、任务名搜索"""
+from bisect import bisect_left
+
+try:
+    from .deadline_index import DeadlineIndex
+    from .order_keys import is_valid_key, keys_between
+    from .search_index import TrigramIndex
+    from .storage import longest_increasing_run
+    from .task_model import KIND_TASK
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from deadline_index import DeadlineIndex
+    from order_keys import is_valid_key, keys_between
+    from search_index import TrigramIndex
+    from storage import longest_increasing_run
+    from task_model import KIND_TASK
+
+_NO_PARENT = object()  # 主任务、分割线不属于任何父任务
+# flagged(name) 可查询的标记及其在 _count_state 元组中的位置
+_FLAGS = (('done', 7), ('cancelled', 3), ('urgent', 5))
+
+
+class TaskCounts:
+    """一组主任务（不含子任务和分割线）的计数"""
+
+    __slots__ = ('main', 'done', 'cancelled', 'finished', 'urgent')
+
+    def __init__(self):
+        self.main = 0
+        self.done = 0  # 已完成且未取消
+        self.cancelled = 0
+        self.finished = 0  # 已完成或已取消（显示在"已完成"折叠区域中）
+        self.urgent = 0
+
+    def add(self, state, sign):
+        self.main += sign
+        self.done += sign * state[2]
+        self.cancelled += sign * state[3]
+        self.finished += sign * state[4]
+        self.urgent += sign * state[5]
+
+    def add_counts(self, other):
+        """把另一组的计数并入这一组（删除分割线、两个分组合并时）"""
+        self.main += other.main
+        self.done += other.done
+        self.cancelled += other.cancelled
+        self.finished += other.finished
+        self.urgent += other.urgent
+
+    def as_tuple(self):
+        return (self.main, self.done, self.cancelled, self.finished, self.urgent)
+
+    def __eq__(self, other):
+        return isinstance(other, TaskCounts) and self.as_tuple() == other.as_tuple()
+
+    def __repr__(self):
+        return ("TaskCounts(main={}, done={}, cancelled={}, finished={}, urgent={})"
+                .format(*self.as_tuple()))
+
+
+def _count_state(task):
+    """任务对各项计数和索引的贡献，字段修改前后比较这个元组即可知道哪些计数需要调整
+
+    (是任务而不是分割线, 是主任务, 已完成且未取消, 已取消, 已完成或已取消, 紧急,
+     父任务 ID, 已完成, 截止日期)
+    """
+    is_task = task.kind == KIND_TASK
+    done, cancelled = task.done, task.cancelled
+    return (is_task, is_task and not task.is_subtask, done and not cancelled, cancelled,
+            done or cancelled, task.urgent, task.parent_task_id if task.is_subtask else _NO_PARENT,
+            done, task.deadline)
+
+
+def _order_key(task):
+    return task.order_key
+
+
+class _OrderKeys:
+    """列表中各任务的排序键（只读视图），用于按键二分查找位置"""
+
+    def __init__(self, tasks):
+        self._tasks = tasks
+
+    def __len__(self):
+        return list.__len__(self._tasks)
+
+    def __getitem__(self, index):
+        return list.__getitem__(self._tasks, index).order_key
+
+
+def _first_position(index, length):
+    """下标或切片影响到的第一个位置"""
+    if isinstance(index, slice):
+        start, _, step = index.indices(length)
+        return start if step > 0 else 0
+    return min(max(index + length if index < 0 else index, 0), length)
+
+
+class TaskStore(list):
+    """保存 Task 的列表，在增删和移动时增量维护索引
+
+    - get(task_id)：按 task_id 查找任务，O(1)
+    - children(parent_task_id)：父任务的子任务，按列表中的顺序排列
+    - task in store / store.index(task)：按对象身份查找位置，内容相同的两个任务互不影响
+    - deadlines：未完成任务按截止日期排序的索引（DeadlineIndex）
+    - counts / urgent_count / section_counts(section_id) / subtask_counts(parent_task_id)：
+      主任务的整体计数、所有紧急任务的数量、每个分组和每个父任务的计数
+    - search(query)：名字包含 query 的任务；三字母组索引在第一次使用时由 build_search_index()
+      分批建立，之后增量维护
+    - flagged(name)：已完成（done）、已取消（cancelled）或紧急（urgent）的任务
+    - separators()：所有分割线及其位置
+    - move(tasks, index)：把一组任务移动到新位置，不重建任何索引
+    - 排序键：每个任务的 order_key 沿列表严格递增。插入和移动只为新位置上的任务在前后两个键
+      之间生成新键，键太长时重新分配附近一段任务的键；take_rekeyed() 取出键被修改过的任务，
+      保存时只需要写入这些任务。index(task) 和子任务的顺序直接按键比较，不需要位置索引
+    - version：每次增删、移动或修改任务时加一，调用方据此判断缓存的查询结果是否仍然有效
+
+    通过字典接口修改任务字段时 Task 会调用 task_changed()，索引和计数随之更新；
+    直接给属性赋值之后需要调用 task.touch()（或 reindex(task)）。
+    计数在字段修改时 O(1) 调整。分组计数同样增量维护：增删和移动普通任务只调整所在分组的计数，
+    只有插入或删除分割线时才拆分或合并分组，需要遍历的也只是这一个分组；排序之后重新统计。
+    子任务在列表中间插入或移动后，所在的子任务列表在下一次读取时才重新排序，
+    连续多次修改只需要排序一次。位置索引同样延迟更新：修改只记录最小的受影响位置，
+    下一次查找时只重新计算这个位置之后的部分。
+    """
+
+    MAX_ORDER_KEY_LENGTH = 16  # 生成的键超过这个长度时重新分配附近一段任务的键
+
+    def __init__(self, tasks=()):
+        super().__init__(tasks)
+        self._rebuild()
+
+    def _rebuild(self):
+        self.version = getattr(self, 'version', 0) + 1
+        self._rekeyed = {}  # id(task) -> 键被修改、尚未保存的任务
+        # 列表顺序总是为准：同步脚本或手工编辑可能只调整了任务的顺序而没有修改键
+        self._repair_keys()
+        self._by_id = {}
+        self._children = {}
+        self._links = {}  # id(task) -> 建立索引时的 (task_id, 父任务 ID)
+        self._unordered = set()  # 子任务顺序可能与列表顺序不一致的父任务
+        self._positions = {}  # id(task) -> 位置，只有小于 _positions_valid 的位置是准确的
+        self._positions_valid = 0
+        self.deadlines = DeadlineIndex()
+        self.counts = TaskCounts()
+        self.urgent_count = 0  # 所有标记为紧急的任务（包括子任务）
+        self._states = {}  # id(task) -> 建立索引时的 _count_state(task)
+        self._subtask_counts = {}  # 父任务 ID -> [子任务数, 已完成的子任务数]
+        self._sections = [TaskCounts()]  # 按分组顺序排列的计数
+        self._section_of = {}  # id(task) -> 所在分组的 TaskCounts（分割线对应它开始的分组）
+        self._search = None  # TrigramIndex，第一次搜索之前不建立
+        self._flagged = {name: {} for name, _ in _FLAGS}  # 标记 -> {id(task): 任务}
+        self._separators = None  # (version, [(位置, 分割线), ...])
+        for position, task in enumerate(self):
+            self._index(task, position)
+
+    def _index(self, task, position, ordered=True, tail=None):
+        """为位置 position 上的任务建立索引；tail 之后是已经建立索引的任务（默认 position + 1）"""
+        self.version += 1
+        task_id = task.task_id
+        if task_id is not None:
+            self._by_id[task_id] = task
+        parent = task.parent_task_id if task.is_subtask else _NO_PARENT
+        if parent is not _NO_PARENT:
+            self._children.setdefault(parent, []).append(task)
+            if not ordered:
+                self._unordered.add(parent)
+        self._links[id(task)] = (task_id, parent)
+        task._store = self
+
+        state = _count_state(task)
+        self._states[id(task)] = state
+        self._enter_section(task, position, position + 1 if tail is None else tail, not state[0])
+        self._apply(task, state, 1)
+        if task.deadline:
+            self.deadlines.add(task)
+        if self._search is not None:
+            self._search.add(task)
+
+    def _unindex(self, task, position=None):
+        """删除任务的索引；删除分割线时 position 是原来跟在它后面的第一个任务现在的位置"""
+        self.version += 1
+        self._positions.pop(id(task), None)
+        self.deadlines.discard(task)
+        if self._search is not None:
+            self._search.discard(task)
+        if task._store is self:
+            task._store = None
+        state = self._states.pop(id(task))
+        self._apply(task, state, -1)
+        section = self._section_of.pop(id(task))
+        if not state[0]:
+            self._merge_section(section, position)
+        task_id, parent = self._links.pop(id(task))
+        if task_id is not None and self._by_id.get(task_id) is task:
+            del self._by_id[task_id]
+        if parent is not _NO_PARENT:
+            siblings = self._children[parent]
+            for i, sibling in enumerate(siblings):
+                if sibling is task:
+                    del siblings[i]
+                    break
+            if not siblings:
+                del self._children[parent]
+                self._unordered.discard(parent)
+
+    def _apply(self, task, state, sign):
+        """把一个任务的贡献加到（sign=1）或减出（sign=-1）各项计数和标记索引"""
+        self.urgent_count += sign * state[5]
+        for name, field in _FLAGS:
+            if state[field]:
+                if sign > 0:
+                    self._flagged[name][id(task)] = task
+                else:
+                    self._flagged[name].pop(id(task), None)
+        if state[1]:
+            self.counts.add(state, sign)
+            self._section_of[id(task)].add(state, sign)
+        parent = state[6]
+        if parent is not _NO_PARENT:
+            counts = self._subtask_counts.get(parent)
+            if counts is None:
+                counts = self._subtask_counts[parent] = [0, 0]
+            counts[0] += sign
+            counts[1] += sign * state[7]
+            if not counts[0]:
+                del self._subtask_counts[parent]
+
+    def _count_sections(self):
+        """遍历列表统计每个分组的计数：[TaskCounts, ...], {id(task): 所在分组的 TaskCounts}"""
+        sections = [TaskCounts()]
+        section_of = {}
+        for task in self:
+            state = _count_state(task)
+            if not state[0]:
+                sections.append(TaskCounts())
+            elif state[1]:
+                sections[-1].add(state, 1)
+            section_of[id(task)] = sections[-1]
+        return sections, section_of
+
+    def _section_index(self, section):
+        # TaskCounts 按内容比较，这里要按对象身份查找
+        for i in range(len(self._sections) - 1, -1, -1):
+            if self._sections[i] is section:
+                return i
+        raise ValueError(f"{section!r} is not a section")
+
+    def _enter_section(self, task, position, tail, separator):
+        """位置 position 上的任务加入前一个任务所在的分组（不调整计数）
+
+        分割线开始一个新分组：从 tail 开始原属前一个分组的任务移入新分组，直到下一条分割线。
+        """
+        section_of = self._section_of
+        section = section_of[id(self[position - 1])] if position > 0 else self._sections[0]
+        if not separator:
+            section_of[id(task)] = section
+            return
+        new = TaskCounts()
+        if self._sections[-1] is section:
+            self._sections.append(new)
+        else:
+            self._sections.insert(self._section_index(section) + 1, new)
+        section_of[id(task)] = new
+        states = self._states
+        for i in range(tail, len(self)):
+            other = self[i]
+            if section_of.get(id(other)) is not section:
+                break
+            section_of[id(other)] = new
+            state = states[id(other)]
+            if state[1]:
+                section.add(state, -1)
+                new.add(state, 1)
+
+    def _merge_section(self, section, position):
+        """分割线被删除：它开始的分组并入前一个分组，从 position 开始的剩余任务改属前一个分组"""
+        index = self._section_index(section)
+        previous = self._sections[index - 1]
+        previous.add_counts(section)
+        del self._sections[index]
+        section_of = self._section_of
+        for i in range(position, len(self)):
+            other = self[i]
+            if section_of.get(id(other)) is not section:
+                break
+            section_of[id(other)] = previous
+        return previous
+
+    def _unindex_removed(self, removed):
+        """删除已经移出列表的任务的索引：removed 是 [(任务, 后面的任务现在开始的位置), ...]
+
+        先删除普通任务，使被合并的分组只剩下仍在列表中的任务，再从后往前删除分割线。
+        """
+        separators = []
+        for task, position in removed:
+            if self._states[id(task)][0]:
+                self._unindex(task)
+            else:
+                separators.append((task, position))
+        for task, position in reversed(separators):
+            self._unindex(task, position)
+
+    def _sort_children(self):
+        # 排序键与列表顺序一致，不需要重新计算位置
+        for parent in self._unordered:
+            self._children[parent].sort(key=_order_key)
+        self._unordered.clear()
+
+    def _repair_keys(self):
+        """以列表顺序为准整理排序键（加载的数据、排序之后）
+
+        保留沿列表递增的最长一组有效键，缺少或顺序不对的每一段任务在前后两个保留的键之间
+        重新分配：外部只移动了少数任务时，只有这些任务的键改变。
+        """
+        keys = [task.order_key for task in self]
+        if all(a < b for a, b in zip(keys, keys[1:])) and all(map(is_valid_key, keys)):
+            return
+        valid = {i: key for i, key in enumerate(keys) if is_valid_key(key)}
+        kept = longest_increasing_run(list(valid), valid)
+        i = 0
+        while i < len(self):
+            if i in kept:
+                i += 1
+                continue
+            end = i + 1
+            while end < len(self) and end not in kept:
+                end += 1
+            self._place_keys(i, end)
+            i = end
+
+    def _place_keys(self, start, stop):
+        """为位置 start..stop-1 的任务分配位于前后两个任务之间的递增的键；已有的键合适时保留"""
+        if start >= stop:
+            return
+        low = self[start - 1].order_key if start > 0 else None
+        high = self[stop].order_key if stop < len(self) else None
+        previous = low
+        for i in range(start, stop):
+            key = self[i].order_key
+            if not is_valid_key(key) or (previous is not None and key <= previous):
+                break
+            previous = key
+        else:
+            if high is None or previous < high:
+                return
+        keys = keys_between(low, high, stop - start)
+        if max(map(len, keys)) > self.MAX_ORDER_KEY_LENGTH:
+            self._rebalance(start, stop)
+            return
+        self._assign_keys(start, keys)
+
+    def _rebalance(self, start, stop):
+        """同一位置反复插入使键变长时，扩大范围重新均匀分配这一段附近任务的键"""
+        width = max(stop - start, 16)
+        while True:
+            first = max(start - width, 0)
+            last = min(stop + width, len(self))
+            low = self[first - 1].order_key if first > 0 else None
+            high = self[last].order_key if last < len(self) else None
+            keys = keys_between(low, high, last - first)
+            if max(map(len, keys)) <= self.MAX_ORDER_KEY_LENGTH or (first == 0 and last == len(self)):
+                break
+            width *= 4
+        self._assign_keys(first, keys)
+
+    def _assign_keys(self, start, keys):
+        rekeyed = self._rekeyed
+        for task, key in zip(self[start:start + len(keys)], keys):
+            task.order_key = key
+            rekeyed[id(task)] = task
+
+    def _invalidate_positions(self, index):
+        """位置 index 及之后的任务发生了移动"""
+        self.version += 1
+        if index < self._positions_valid:
+            self._positions_valid = max(index, 0)
+
+    def _update_positions(self):
+        positions = self._positions
+        for i in range(self._positions_valid, len(self)):
+            positions[id(self[i])] = i
+        self._positions_valid = len(self)
+        return positions
+
+    # 查询
+
+    def get(self, task_id):
+        return self._by_id.get(task_id)
+
+    def children(self, parent_task_id):
+        """父任务的所有子任务（按列表顺序）；返回的列表属于索引，调用方不能修改"""
+        siblings = self._children.get(parent_task_id)
+        if not siblings:
+            return ()
+        if self._unordered:
+            self._sort_children()
+        return siblings
+
+    def __contains__(self, task):
+        return id(task) in self._links
+
+    def index(self, task, *args):
+        if args:
+            return super().index(task, *args)
+        if id(task) not in self._links:
+            raise ValueError(f"{task!r} is not in list")
+        # 键沿列表严格递增，二分查找即可；键在列表之外被修改过时退回位置索引
+        position = bisect_left(_OrderKeys(self), task.order_key)
+        if position < len(self) and self[position] is task:
+            return position
+        position = self._positions.get(id(task))
+        if position is None or position >= self._positions_valid:
+            position = self._update_positions()[id(task)]
+        return position
+
+    def remove_many(self, tasks):
+        """一次删除多个任务（按对象身份），只遍历一次列表；不在列表中的任务被忽略"""
+        removed = {id(task) for task in tasks if id(task) in self._links}
+        if not removed:
+            return
+        kept = []
+        dropped = []
+        first = None
+        for i, task in enumerate(self):
+            if id(task) in removed:
+                if first is None:
+                    first = i
+                dropped.append((task, len(kept)))
+            else:
+                kept.append(task)
+        super().__setitem__(slice(None), kept)
+        self._invalidate_positions(first)
+        self._unindex_removed(dropped)
+
+    def move(self, tasks, index):
+        """把 tasks（按对象身份）按给定的顺序移动到原列表位置 index 之前
+
+        任务仍在列表中，按 ID 和父任务的索引、计数和标记都不变，不需要重建；
+        每段连续的任务一次切片删除，再一次切片插入。位置索引从受影响的最小位置开始失效，
+        移动的子任务所在的子任务列表留到读取时再排序。主任务的计数从原来的分组移到新的分组，
+        移动分割线相当于在原位置合并分组、在新位置拆分分组。
+        """
+        positions = sorted(self.index(task) for task in tasks)
+        if not positions:
+            return
+        index = min(max(index, 0), len(self))
+        # 先在原来的位置离开所在的分组；从后往前处理，合并分组时后面移动的任务已经离开
+        section_of = self._section_of
+        for position in reversed(positions):
+            task = self[position]
+            state = self._states[id(task)]
+            if state[1]:
+                section_of[id(task)].add(state, -1)
+            elif not state[0]:
+                section_of[id(task)] = self._merge_section(section_of[id(task)], position + 1)
+        # 从后往前删除，前面的位置不受影响
+        end = positions[-1] + 1
+        start = positions[-1]
+        for position in reversed(positions[:-1]):
+            if position != start - 1:
+                super().__delitem__(slice(start, end))
+                end = position + 1
+            start = position
+        super().__delitem__(slice(start, end))
+        insert_at = index - bisect_left(positions, index)
+        super().__setitem__(slice(insert_at, insert_at), tasks)
+        self._invalidate_positions(min(positions[0], insert_at))
+        # 只有移动的任务需要新键
+        self._place_keys(insert_at, insert_at + len(tasks))
+        tail = insert_at + len(tasks)
+        for position, task in enumerate(tasks, insert_at):
+            state = self._states[id(task)]
+            self._enter_section(task, position, tail, not state[0])
+            if state[1]:
+                section_of[id(task)].add(state, 1)
+        for task in tasks:
+            parent = self._links[id(task)][1]
+            if parent is not _NO_PARENT:
+                self._unordered.add(parent)
+
+    def reindex(self, task):
+        """任务的 task_id、is_subtask 或 parent_task_id 被修改后更新索引"""
+        position = self.index(task)
+        self._unindex(task, position + 1)
+        self._index(task, position, ordered=False)
+
+    def task_changed(self, task):
+        """任务的字段被修改（由 Task 调用）：调整计数、截止日期和搜索索引，必要时重建任务的索引"""
+        old = self._states.get(id(task))
+        if old is None:
+            return
+        self.version += 1
+        if self._links[id(task)] != (task.task_id, task.parent_task_id if task.is_subtask else _NO_PARENT):
+            self.reindex(task)
+            return
+        if self._search is not None:
+            # 名字没有变化时只是一次字典查找
+            self._search.add(task)
+        state = _count_state(task)
+        if state == old:
+            return
+        self._apply(task, old, -1)
+        self._states[id(task)] = state
+        if state[0] != old[0]:
+            # 任务变成分割线或相反：按原来的种类离开分组，再按新的种类加入
+            position = self.index(task)
+            if not old[0]:
+                self._section_of[id(task)] = self._merge_section(self._section_of[id(task)], position + 1)
+            self._enter_section(task, position, position + 1, not state[0])
+        self._apply(task, state, 1)
+        if state[7] != old[7] or state[8] != old[8]:
+            self.deadlines.add(task)
+
+    def take_rekeyed(self):
+        """取出自上次调用以来排序键被修改过的任务（这些任务需要重新保存）"""
+        rekeyed = list(self._rekeyed.values())
+        self._rekeyed = {}
+        return rekeyed
+
+    def flagged(self, name):
+        """标记为 name（'done'、'cancelled' 或 'urgent'）的任务，不保证顺序"""
+        return list(self._flagged[name].values())
+
+    def separators(self):
+        """[(位置, 分割线), ...]，按位置排列；在下一次修改之前缓存"""
+        if self._separators is None or self._separators[0] != self.version:
+            self._separators = (self.version, [(position, task) for position, task in enumerate(self)
+                                               if task.kind != KIND_TASK])
+        return self._separators[1]
+
+    def search(self, query):
+        """名字包含 query 的任务（不区分大小写，不保证顺序），见 TrigramIndex.search"""
+        return self._search_index().search(query)
+
+    def build_search_index(self, deadline=None):
+        """分批建立搜索索引（见 TrigramIndex.build）；全部完成时返回 True"""
+        return self._search_index().build(deadline)
+
+    def _search_index(self):
+        if self._search is None:
+            self._search = TrigramIndex(self)
+        return self._search
+
+    def section_counts(self, section_id):
+        """第 section_id 个分组（按分割线划分，从 0 开始）中主任务的计数"""
+        if section_id < len(self._sections):
+            return self._sections[section_id]
+        return TaskCounts()
+
+    def subtask_counts(self, parent_task_id):
+        """(子任务数, 已完成的子任务数)"""
+        counts = self._subtask_counts.get(parent_task_id)
+        return tuple(counts) if counts else (0, 0)
+
+    def parents_with_all_subtasks_done(self):
+        """所有子任务都已完成的父任务 ID"""
+        return [parent for parent, (total, done) in self._subtask_counts.items() if total == done]
+
+    def verify_counters(self):
+        """与完整重新统计的结果比较，返回不一致之处的描述（调试模式下使用）"""
+        problems = []
+        counts = TaskCounts()
+        urgent = 0
+        subtask_counts = {}
+        for task in self:
+            state = _count_state(task)
+            if self._states.get(id(task)) != state:
+                problems.append(f"stale state for {task!r}")
+            urgent += state[5]
+            if state[1]:
+                counts.add(state, 1)
+            if state[6] is not _NO_PARENT:
+                pair = subtask_counts.setdefault(state[6], [0, 0])
+                pair[0] += 1
+                pair[1] += state[7]
+        if counts != self.counts:
+            problems.append(f"counts {self.counts!r} != {counts!r}")
+        if urgent != self.urgent_count:
+            problems.append(f"urgent_count {self.urgent_count} != {urgent}")
+        if subtask_counts != self._subtask_counts:
+            problems.append("subtask counts differ")
+        for name, field in _FLAGS:
+            if set(self._flagged[name]) != {id(task) for task in self if _count_state(task)[field]}:
+                problems.append(f"{name} index differs")
+        sections, section_of = self._count_sections()
+        if self._sections != sections:
+            problems.append("section counts differ")
+        numbers = {id(section): i for i, section in enumerate(self._sections)}
+        expected = {id(section): i for i, section in enumerate(sections)}
+        if any(numbers.get(id(self._section_of.get(id(task)))) != expected[id(section_of[id(task)])]
+               for task in self):
+            problems.append("section membership differs")
+        keys = [task.order_key for task in self]
+        if not all(a < b for a, b in zip(keys, keys[1:])) or not all(map(is_valid_key, keys)):
+            problems.append("order keys are not increasing")
+        return problems
+
+    # list 的修改操作
+
+    def append(self, task):
+        super().append(task)
+        self._place_keys(len(self) - 1, len(self))
+        self._index(task, len(self) - 1)
+
+    def extend(self, tasks):
+        tasks = list(tasks)
+        super().extend(tasks)
+        start = len(self) - len(tasks)
+        self._place_keys(start, len(self))
+        for position, task in enumerate(tasks, start):
+            self._index(task, position)
+
+    def __iadd__(self, tasks):
+        self.extend(tasks)
+        return self
+
+    def insert(self, index, task):
+        position = _first_position(index, len(self))
+        self._invalidate_positions(position)
+        super().insert(index, task)
+        self._place_keys(position, position + 1)
+        # 插入到末尾时子任务顺序不变，插入到中间时留到读取时再排序
+        self._index(task, position, ordered=self[-1] is task)
+
+    def remove(self, task):
+        del self[self.index(task)]
+
+    def pop(self, index=-1):
+        length = len(self)
+        task = super().pop(index)
+        position = _first_position(index, length)
+        self._invalidate_positions(position)
+        self._unindex(task, position)
+        return task
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                # 扩展切片逐个位置替换
+                positions = range(start, stop, step)
+                value = list(value)
+                if len(value) != len(positions):
+                    raise ValueError(f"attempt to assign sequence of size {len(value)} "
+                                     f"to extended slice of size {len(positions)}")
+                for position, task in zip(positions, value):
+                    self[position] = task
+                return
+            old = self[index]
+            value = list(value)
+            self._invalidate_positions(start)
+            super().__setitem__(index, value)
+        else:
+            old = [self[index]]
+            value = [value]
+            start = _first_position(index, len(self))
+            self._invalidate_positions(start)
+            super().__setitem__(index, value[0])
+        tail = start + len(value)
+        self._place_keys(start, tail)
+        self._unindex_removed([(task, tail) for task in old])
+        for position, task in enumerate(value, start):
+            self._index(task, position, ordered=False, tail=tail)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                # 扩展切片从后往前逐个删除，前面的位置不受影响
+                positions = range(start, stop, step)
+                for position in sorted(positions, reverse=True):
+                    del self[position]
+                return
+            old = self[index]
+        else:
+            old = [self[index]]
+            start = _first_position(index, len(self))
+        self._invalidate_positions(start)
+        super().__delitem__(index)
+        self._unindex_removed([(task, start) for task in old])
+
+    def clear(self):
+        super().clear()
+        self._rebuild()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._invalidate_positions(0)
+        self._sections, self._section_of = self._count_sections()
+        self._repair_keys()
+        self._unordered.update(self._children)
+
+    def reverse(self):
+        super().reverse()
+        self._invalidate_positions(0)
+        self._sections, self._section_of = self._count_sections()
+        self._repair_keys()
+        self._unordered.update(self._children)
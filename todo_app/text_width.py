@@ -0,0 +1,101 @@
+"""文本宽度：按字体缓存测量结果，并增量维护列表中最宽一行的宽度"""
+
+try:
+    from .display_cache import DisplayCache
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from display_cache import DisplayCache
+
+DEFAULT_MAXSIZE = 50000
+
+
+def _tk_font(family, size):
+    import tkinter.font as tkfont
+    return tkfont.Font(family=family, size=size)
+
+
+class TextWidthCache:
+    """按 (字体, 字号, 文本) 缓存的文本宽度
+
+    font.measure() 每次都是一次 Tcl 调用，同一段文本只测量一次。字体对象按 (字体, 字号)
+    只创建一次。font_factory(family, size) 返回带 measure(text) 方法的字体对象。
+    """
+
+    def __init__(self, font_factory=_tk_font, maxsize=DEFAULT_MAXSIZE):
+        self._font_factory = font_factory
+        self._fonts = {}
+        self._widths = DisplayCache(maxsize)
+
+    def measure(self, font, text):
+        key = (font[0], font[1], text)
+        width = self._widths.get(key)
+        if width is None:
+            tk_font = self._fonts.get(font[:2])
+            if tk_font is None:
+                tk_font = self._fonts[font[:2]] = self._font_factory(font[0], font[1])
+            width = tk_font.measure(text)
+            self._widths.put(key, None, width)
+        return width
+
+    def reserve(self, count):
+        """按列表的行数调整容量（整个列表重新统计时不会一边测量一边淘汰），见 DisplayCache.reserve"""
+        self._widths.reserve(count)
+
+    def clear(self):
+        """字体变化后旧的测量结果不会再用到"""
+        self._fonts.clear()
+        self._widths.clear()
+
+    def stats(self):
+        return self._widths.stats()
+
+
+class RowWidths:
+    """每一行的宽度和所有行中的最大宽度
+
+    行按 key 增删改，每次 O(1)。宽度用 宽度 -> 行数 的直方图统计，只有删除最宽的最后一行时
+    才在直方图中重新找最大值，代价取决于不同宽度的个数（像素范围），与行数无关。
+    measure(text) 返回文本的宽度。
+    """
+
+    def __init__(self, measure):
+        self._measure = measure
+        self._widths = {}  # key -> 宽度
+        self._counts = {}  # 宽度 -> 行数
+        self._max = 0
+
+    def __len__(self):
+        return len(self._widths)
+
+    @property
+    def max_width(self):
+        return self._max
+
+    def add(self, key, text):
+        if key in self._widths:
+            self.remove(key)
+        width = self._measure(text)
+        self._widths[key] = width
+        self._counts[width] = self._counts.get(width, 0) + 1
+        if width > self._max:
+            self._max = width
+
+    def remove(self, key):
+        """不存在的 key 被忽略"""
+        width = self._widths.pop(key, None)
+        if width is None:
+            return
+        count = self._counts[width] - 1
+        if count:
+            self._counts[width] = count
+            return
+        del self._counts[width]
+        if width == self._max:
+            self._max = max(self._counts, default=0)
+
+    def reset(self, items=()):
+        """items: [(key, 文本), ...]；全部重新统计（字体变化或整体替换时使用）"""
+        self._widths = {}
+        self._counts = {}
+        self._max = 0
+        for key, text in items:
+            self.add(key, text)
@@ -1,7 +1,11 @@
 import tkinter as tk
 from tkinter import ttk
 from pathlib import Path
+import queue
 import sys
+import threading
+import time
+import zlib
 from datetime import datetime, timedelta
 try:
     from tkcalendar import Calendar
@@ -15,28 +19,155 @@ try:
 except ImportError:
     PYWINSTYLES_AVAILABLE = False
 
+try:
+    from .archive import TOP_SECTION_KEY, TaskArchive
+    from .deadline_index import deadline_indicator, parse_deadline, today_ordinal
+    from .display_cache import DisplayCache
+    from .drag_drop import drag_block, drop_position
+    from .listbox_diff import apply_row_diff, diff_rows
+    from .persistence import PersistenceWorker
+    from .render_cache import data_fingerprint, load_render_cache, save_render_cache
+    from .render_scheduler import RENDER_BUTTONS, RENDER_FILTER, RENDER_LIST, RENDER_SIZE, RENDER_TITLE, RenderScheduler
+    from .search_index import SearchOutline
+    from .selection import ROW_CANCELLED, ROW_STRUCTURE, IntervalSet, RowKinds
+    from .storage import SerializationCache, apply_records, open_storage, write_text_atomic
+    from .task_query import QueryError, compile_query
+    from .task_model import KIND_SEPARATOR, KIND_TASK, KIND_TITLE, Task, to_task
+    from .task_store import TaskStore
+    from .text_width import RowWidths, TextWidthCache
+    from .virtual_listbox import VirtualListbox
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from archive import TOP_SECTION_KEY, TaskArchive
+    from deadline_index import deadline_indicator, parse_deadline, today_ordinal
+    from display_cache import DisplayCache
+    from drag_drop import drag_block, drop_position
+    from listbox_diff import apply_row_diff, diff_rows
+    from persistence import PersistenceWorker
+    from render_cache import data_fingerprint, load_render_cache, save_render_cache
+    from render_scheduler import RENDER_BUTTONS, RENDER_FILTER, RENDER_LIST, RENDER_SIZE, RENDER_TITLE, RenderScheduler
+    from search_index import SearchOutline
+    from selection import ROW_CANCELLED, ROW_STRUCTURE, IntervalSet, RowKinds
+    from storage import SerializationCache, apply_records, open_storage, write_text_atomic
+    from task_query import QueryError, compile_query
+    from task_model import KIND_SEPARATOR, KIND_TASK, KIND_TITLE, Task, to_task
+    from task_store import TaskStore
+    from text_width import RowWidths, TextWidthCache
+    from virtual_listbox import VirtualListbox
+
+# 适合当前系统的任务图标
+if sys.platform == "darwin":  # macOS
+    TASK_ICONS = {
+        'unchecked': '☐',  # 空心方框，在macOS上显示为白色边框
+        'checked': '☑',    # 带勾的方框
+        'cancelled': '☒'   # 带X的方框
+    }
+else:  # Windows和其他系统
+    TASK_ICONS = {
+        'unchecked': '⬜',  # 白色大方块
+        'checked': '✔',    # 勾号
+        'cancelled': '✖'   # X号
+    }
+
+
 class TodoApp:
+    # 数据文件超过该大小时使用流式加载：先显示第一屏，其余任务在事件循环中分块读入
+    STREAM_LOAD_THRESHOLD = 4 * 1024 * 1024
+    STREAM_CHUNK_SIZE = 200
+    STREAM_TIME_SLICE = 0.03  # 每次事件循环回调中最多用于解析任务的时间（秒）
+    SEARCH_INDEX_SLICE = 0.01  # 每次事件循环回调中最多用于建立搜索索引的时间（秒）
+    DROP_INDICATOR_INTERVAL = 16  # 拖动时更新放下位置指示线的最小间隔（毫秒）
+    RENDER_CACHE_ROWS = 100  # 首屏渲染缓存最多保存的行数
+    WATCH_INTERVAL_MS = 1000  # 检查数据文件是否被其他进程修改的间隔
+    WORKER_RESULTS_INTERVAL_MS = 50  # 检查后台写盘线程交回的结果的间隔
+    DAY_CHECK_MAX_MS = 60 * 60 * 1000  # 检查日期变化的最长间隔（休眠唤醒后最多延迟这么久）
+    # 这些字段变化会改变任务所在的位置或是否可见，需要重新组织整个列表
+    LAYOUT_FIELDS = frozenset({'done', 'cancelled', 'separator', 'is_subtask', 'parent_task_id', 'completed_time'})
+    # 没有保存过视图时提供的示例视图：名称 -> 查询（语法见 task_query）
+    DEFAULT_VIEWS = {
+        '紧急且三天内到期': 'urgent and due<=3',
+        '已超期': 'overdue',
+    }
+
     def __init__(self, root: tk.Tk):
         self.root = root
         self.is_dark_mode = False
         self.font_size = 13 if sys.platform == "darwin" else 10  # 默认字体大小
-        self.tasks = self.load_tasks()  # 真实的任务数据（不包含 completed_header）
-        
-        # 确保所有任务都有task_id，并修复父子关系
-        self.ensure_task_ids()
-        
+        # 所有磁盘写入都交给后台线程，界面线程只负责标记数据已修改
+        self.persistence = PersistenceWorker(on_error=self.on_persistence_error)
+        # 后台线程不能调用 Tk：它的结果（合并的外部修改、写盘错误）以 (函数, 参数) 放入队列，由界面线程取出处理
+        self._worker_results = queue.Queue()
+        self.closing = False  # on_close 停止后台线程之后为 True，之后的保存由 on_close 同步完成
+        self.storage = self.open_storage()  # 根据 config.json 选择 json 或 sqlite 存储
+        # 很久以前完成的任务保存在归档中，展开对应分组时才加载
+        self.archive = TaskArchive(self.get_tasks_file().parent / 'archive')
+        self.loading = False  # 流式加载尚未完成时为 True
+        self._save_after_load = False
+        # 任务数据的版本号：每次修改加一，写盘成功后记录已保存的版本
+        self.tasks_version = 0
+        self._saved_tasks_version = 0
+        self._dirty_task_ids = set()  # 自上次生成快照以来修改过的任务
+        self._structure_dirty = False  # 下一次写盘是否需要完整比较所有任务（写盘失败之后）
+        self._dirty_lock = threading.Lock()
+        # 任务快照在界面线程中生成（见 snapshot_tasks），后台线程只接触快照中的普通字典
+        self._snapshot_cache = SerializationCache()
+        self._snapshot_job = None
+
+        self.tasks = []  # 真实的任务数据（不包含 completed_header）
         self.display_tasks = []  # 用于显示的任务列表（包含 completed_header）
+        self.full_display_tasks = []  # 搜索过滤之前的显示列表
+        self.search_query = ''
+        self._search_outline = None  # full_display_tasks 的 SearchOutline，第一次过滤时建立
+        self._search_index_job = None  # 分批建立搜索索引的 after ID
+        self._view_results = {}  # 查询文本 -> (任务列表, 任务列表版本, 日期, 结果)，任务修改后失效
+        self.rendered_rows = []  # 列表框当前的内容：[(key, 文本, 背景色, 前景色), ...]
+        self.canvas_rows = []  # 虚拟列表模式下上一次渲染的 [(key, 内容标记), ...]，用于增量统计行宽
+        self.showing_render_cache = False  # 列表框中是缓存的第一屏，还没有被真实内容替换
+        self.display_cache = DisplayCache()  # 每一行格式化好的文本和颜色
+        self._theme_colors = {}  # is_dark_mode -> 颜色表
+        self.text_widths = TextWidthCache()
+        # 当前显示的每一行的宽度，随列表增量更新，调整窗口宽度时直接读取最大值
+        self.row_widths = RowWidths(lambda text: self.text_widths.measure(self.get_system_font(), text))
+        # 截止日期提示使用的"今天"（日期序数），由午夜定时器更新
+        self.today = today_ordinal()
+        # 修改只标记需要刷新的部分，事件循环空闲时合并为一次重绘
+        self.render_scheduler = RenderScheduler(root, self.render_frame)
         self.shift_pressed = False
         self.bulk_selection_mode = False
         self.key_event_processing = False
-        self.selected_indices = set()
+        self.selected_indices = IntervalSet()  # 列表框中选中的行，与列表框的选择同步
+        self._row_kinds = None  # display_tasks 的 RowKinds，第一次需要时建立
         self.collapsed_sections = set()  # 记录哪些分组的已完成任务被折叠
 
         self.root.withdraw()
 
         # 先加载配置（包括折叠状态），再设置UI
         self.load_config()
-        self.setup_ui()
+
+        # 数据自上次退出后没有变化时，先显示缓存的第一屏，再在其后加载任务数据
+        render_cache = self.read_render_cache()
+        if render_cache is not None:
+            self.loading = True  # 绘制缓存期间禁用按钮
+            self.setup_ui(render_cache)
+            self.show_window()
+            self.root.update()
+            self.loading = False
+
+        if self.storage.size_hint() >= self.STREAM_LOAD_THRESHOLD:
+            self.tasks = self.begin_streaming_load()
+        else:
+            self.tasks = self.load_tasks(self.storage)
+        
+        # 确保所有任务都有task_id，并修复父子关系
+        self.ensure_task_ids()
+        if not self.loading:
+            self.archive_completed_tasks()
+
+        if render_cache is None:
+            self.setup_ui()
+        else:
+            # 用真实数据替换缓存的第一屏
+            self.populate_listbox_without_width_change()
+            self.update_buttons_state()
         self.setup_bindings()
 
         self.listbox.bind('<Button-1>', self.start_drag)
@@ -44,25 +175,49 @@ class TodoApp:
         self.listbox.bind('<ButtonRelease-1>', self.end_drag)
 
         self.drag_start_index = None
-
-        self.root.after(10, self.show_window)
+        self.drag_rows = IntervalSet()  # 正在拖动的行
+        self.drag_keep_selection = False  # 按在多选中的一行上，没有拖动时松开才只选中这一行
+        self.drag_pointer_y = 0
+        self.drop_target = None  # 指示线所在的 (行, 是否在这一行之后)
+        self.drop_indicator = None  # 指示线，第一次拖动时创建
+        self._drop_indicator_job = None
+
+        if self.loading:
+            self.set_loading_state(True)
+            self.root.after(20, self.continue_streaming_load)
+
+        if render_cache is None:
+            self.root.after(10, self.show_window)
+        self.root.after(self.WATCH_INTERVAL_MS, self.watch_external_changes)
+        self.root.after(self.WORKER_RESULTS_INTERVAL_MS, self.poll_worker_results)
+        self.schedule_day_change()
+
+    @property
+    def tasks(self):
+        return self._tasks
+
+    @tasks.setter
+    def tasks(self, tasks):
+        # 过渡期间仍有代码（和测试）直接赋值字典列表，统一转换为 Task
+        self._tasks = TaskStore(to_task(task) for task in tasks)
 
     def ensure_task_ids(self):
         """确保所有任务都有唯一的task_id"""
         import uuid
         needs_save = False
         for task in self.tasks:
-            if 'task_id' not in task or not task['task_id']:
-                task['task_id'] = str(uuid.uuid4())
+            if not task.task_id:
+                task.task_id = str(uuid.uuid4())
+                self.tasks.reindex(task)
                 needs_save = True
         
         # 如果添加了新的task_id，保存一次
         if needs_save:
-            self.save_tasks()
+            self.schedule_save()
 
     # Setup methods
 
-    def setup_ui(self):
+    def setup_ui(self, render_cache=None):
         self.root.title("To-Do")
         # 根据平台设置不同的最小窗口尺寸
         if sys.platform == "darwin":  # macOS
@@ -76,7 +231,10 @@ class TodoApp:
         self.create_input_frame()
         self.create_buttons()
 
-        self.populate_listbox()
+        if render_cache is None:
+            self.populate_listbox()
+        else:
+            self.paint_render_cache(render_cache)
         self.apply_theme()
         self.update_buttons_state()
         self.create_context_menu()
@@ -89,8 +247,10 @@ class TodoApp:
 
     def create_listbox(self):
         # 不设置固定height，让listbox根据内容和窗口大小自适应
-        self.listbox = tk.Listbox(self.main_frame, selectmode=tk.EXTENDED, bd=0, highlightthickness=0,
-                                  activestyle='none', font=self.get_system_font())
+        # list_view 为 canvas 时使用只绘制可见行的虚拟列表，接口与 Listbox 相同
+        listbox_class = VirtualListbox if self.list_view == 'canvas' else tk.Listbox
+        self.listbox = listbox_class(self.main_frame, selectmode=tk.EXTENDED, bd=0, highlightthickness=0,
+                                     activestyle='none', font=self.get_system_font())
         self.listbox.grid(row=0, column=0, columnspan=4, sticky="nsew", padx=10, pady=(8, 5))
         self.main_frame.grid_rowconfigure(0, weight=1)
         self.main_frame.grid_columnconfigure(0, weight=1)
@@ -110,6 +270,13 @@ class TodoApp:
         self.entry = tk.Text(self.input_frame, height=1, wrap='none', bd=0, font=self.get_system_font(), insertbackground='black')
         self.entry.grid(row=0, column=0, sticky="ew")
 
+        # 搜索框：输入时只显示名字包含搜索文本的任务（放在按钮右侧）
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(self.input_frame, textvariable=self.search_var, width=12, bd=0,
+                                     font=self.get_system_font(), insertbackground='black')
+        self.search_entry.grid(row=0, column=4, padx=(5, 0), sticky="ew")
+        self.search_var.trace_add('write', self.on_search_changed)
+
         self.setup_entry_bindings()
 
     def setup_entry_bindings(self):
@@ -162,7 +329,7 @@ class TodoApp:
         self.listbox.bind('<Control-e>', self.edit_task_shortcut)
         self.listbox.bind('<Control-a>', self.select_all_or_text)
 
-        self.listbox.bind('<<ListboxSelect>>', self.update_buttons_state)
+        self.listbox.bind('<<ListboxSelect>>', self.on_listbox_select)
         self.listbox.bind('<Double-1>', self.on_double_click)
         # <Button-1> 由 start_drag 处理
         
@@ -178,8 +345,12 @@ class TodoApp:
 
         self.entry.bind('<Return>', self.add_task)
         self.entry.bind('<KeyRelease>', self.update_buttons_state)
+        self.search_entry.bind('<Escape>', self.clear_search)
+        self.search_entry.bind('<Return>', self.search_archive)
+        self.search_entry.bind('<FocusIn>', self.build_search_index)
 
     def create_context_menu(self):
+        self.view_var = tk.StringVar(value=self.active_view or '')  # 视图菜单中选中的视图
         self.context_menu = tk.Menu(self.root, tearoff=0)
         self.context_menu.add_command(label="编辑任务", command=self.edit_task_shortcut)
         self.context_menu.add_command(label="设置截止日期", command=self.set_deadline_shortcut)
@@ -194,6 +365,7 @@ class TodoApp:
         self.context_menu.add_separator()
         self.context_menu.add_command(label="添加分隔符", command=self.add_separator_below)
         self.context_menu.add_separator()
+        self.add_view_cascade(self.context_menu)
         
         # 字体大小子菜单
         font_menu = tk.Menu(self.context_menu, tearoff=0)
@@ -215,6 +387,7 @@ class TodoApp:
         self.separator_context_menu.add_separator()
         self.separator_context_menu.add_command(label="添加分隔符", command=self.add_separator_below)
         self.separator_context_menu.add_separator()
+        self.add_view_cascade(self.separator_context_menu)
         
         # 为分隔符菜单也添加字体大小选项
         separator_font_menu = tk.Menu(self.separator_context_menu, tearoff=0)
@@ -232,6 +405,12 @@ class TodoApp:
 
 
 
+    def add_view_cascade(self, parent_menu):
+        """已保存视图的子菜单，内容在每次展开时生成"""
+        view_menu = tk.Menu(parent_menu, tearoff=0)
+        view_menu.configure(postcommand=lambda: self.update_view_menu(view_menu))
+        parent_menu.add_cascade(label="视图", menu=view_menu)
+
     def set_window_icon(self, window=None):
         from tkinter import PhotoImage
         if window is None:
@@ -243,6 +422,7 @@ class TodoApp:
     # Core functionality
 
     def add_task(self, event=None):
+        import uuid
         task_name = self.entry.get("1.0", "end-1c").strip()
         if task_name:
             if task_name.startswith('---'):
@@ -254,39 +434,36 @@ class TodoApp:
                     separator_line_after = '─' * 30 
 
                     display_text = f"{separator_line_before} {title_text} {separator_line_after}"
-                    self.tasks.append({'name': display_text, 'separator': True, 'title': True})
+                    self.tasks.append(Task(display_text, KIND_TITLE, task_id=str(uuid.uuid4())))
                 else:
-                    self.tasks.append({'name': '─' * 40, 'separator': True, 'title': False})
+                    self.tasks.append(Task('─' * 40, KIND_SEPARATOR, task_id=str(uuid.uuid4())))
             else:
-                self.tasks.append({'name': task_name})
+                self.tasks.append(Task(task_name, task_id=str(uuid.uuid4())))
             # 添加任务时保持窗口尺寸不变
-            self.populate_listbox_without_width_change()
-            self.save_tasks()
+            self.schedule_save()
             self.entry.delete("1.0", tk.END)
-            self.update_buttons_state()
-            self.update_title()
+            self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
             self.entry.focus_set()
 
     def remove_selected_tasks(self, event=None):
         selected_indices = list(self.listbox.curselection())
-        for index in reversed(selected_indices):
+        tasks_to_remove = []
+        for index in selected_indices:
             # 跳过折叠标题，不允许删除
             if (index >= len(self.display_tasks) or 
                 self.display_tasks[index].get('completed_header', False)):
                 continue
             # 从 display_tasks 中获取任务信息
-            task_to_remove = self.display_tasks[index]
-            # 从真实的 tasks 列表中删除
-            if task_to_remove in self.tasks:
-                self.tasks.remove(task_to_remove)
+            tasks_to_remove.append(self.display_tasks[index])
+        # 按对象身份一次性从真实的 tasks 列表中删除（内容相同的其他任务不受影响）
+        self.tasks.remove_many(tasks_to_remove)
         # 删除任务时保持窗口尺寸不变
-        self.populate_listbox_without_width_change()
-        self.save_tasks()
-        self.update_buttons_state()
-        self.update_title()
+        self.schedule_save()
+        self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
 
     def mark_selected_tasks_done(self, event=None):
         selected_indices = self.listbox.curselection()
+        changed_tasks = []
         for index in selected_indices:
             display_task = self.display_tasks[index]
             # 跳过分割线和折叠标题
@@ -298,6 +475,7 @@ class TodoApp:
                 task = display_task  # 引用同一个对象
                 was_done = task.get('done', False)
                 task['done'] = not was_done
+                changed_tasks.append(task)
                 if task['done'] and not was_done:
                     # 标记为完成时，记录完成时间
                     task['completed_time'] = datetime.now().strftime('%Y-%m-%d %H:%M')
@@ -315,19 +493,22 @@ class TodoApp:
                     
                     # 如果是子任务被标记为未完成，则自动将其主任务也标记为未完成
                     if task.get('is_subtask', False):
-                        self.auto_uncomplete_parent_task(task)
+                        changed_tasks.extend(self.auto_uncomplete_parent_task(task))
         
+        if not changed_tasks:
+            # 只选中了分割线或折叠标题，没有任何修改
+            return
+
         # 检查是否有主任务的所有子任务都完成了，如果是则自动完成主任务
-        self.auto_complete_parent_tasks()
+        changed_tasks.extend(self.auto_complete_parent_tasks())
         
         # 任务完成状态改变时不改变窗口宽度
-        self.populate_listbox_without_width_change()
-        self.save_tasks()
-        self.update_buttons_state()
-        self.update_title()
+        self.schedule_save(changed_tasks)
+        self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
 
     def mark_selected_tasks_cancelled(self, event=None):
         selected_indices = self.listbox.curselection()
+        changed_tasks = []
         for index in selected_indices:
             display_task = self.display_tasks[index]
             # 跳过分割线和折叠标题
@@ -340,15 +521,17 @@ class TodoApp:
                 task['cancelled'] = not task.get('cancelled', False)
                 if task['cancelled']:
                     task['urgent'] = False
+                changed_tasks.append(task)
+        if not changed_tasks:
+            return
         # 任务取消状态改变时不改变窗口宽度
-        self.populate_listbox_without_width_change()
-        self.save_tasks()
-        self.update_buttons_state()
-        self.update_title()
+        self.schedule_save(changed_tasks)
+        self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
 
 
     def toggle_urgent_task(self, event=None):
         selected_indices = self.listbox.curselection()
+        changed_tasks = []
         for index in selected_indices:
             display_task = self.display_tasks[index]
             # 跳过分割线和折叠标题
@@ -359,11 +542,12 @@ class TodoApp:
             if display_task in self.tasks:
                 task = display_task
                 task['urgent'] = not task.get('urgent', False)
+                changed_tasks.append(task)
+        if not changed_tasks:
+            return
         # 切换紧急状态时不改变窗口宽度
-        self.populate_listbox_without_width_change()
-        self.save_tasks()
-        self.update_buttons_state()
-        self.update_title()
+        self.schedule_save(changed_tasks)
+        self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
 
     def edit_task(self):
         selected_indices = self.listbox.curselection()
@@ -418,9 +602,8 @@ class TodoApp:
                     current_task['title'] = False
 
                 # 编辑任务时保持窗口尺寸不变
-                self.populate_listbox_without_width_change()
-                self.save_tasks()
-                self.update_buttons_state()
+                self.schedule_save([current_task])
+                self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
                 edit_window.destroy()
 
             def on_cancel():
@@ -471,12 +654,11 @@ class TodoApp:
 
             def on_save(event=None):
                 new_name = text_entry.get("1.0", "end-1c").strip()
-                if new_name:
+                if new_name and new_name != current_task['name']:
                     current_task['name'] = new_name
                     # 编辑任务时保持窗口尺寸不变
-                    self.populate_listbox_without_width_change()
-                    self.save_tasks()
-                    self.update_buttons_state()
+                    self.schedule_save([current_task])
+                    self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
                 edit_window.destroy()
 
             def on_cancel():
@@ -541,9 +723,8 @@ class TodoApp:
                     current_task['name'] = display_text
                     current_task['title'] = True
                     # 添加分隔符标题时保持窗口尺寸不变
-                    self.populate_listbox_without_width_change()
-                    self.save_tasks()
-                    self.update_buttons_state()
+                    self.schedule_save([current_task])
+                    self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
                 edit_window.destroy()
 
             def on_cancel():
@@ -576,86 +757,219 @@ class TodoApp:
         if not selected_indices:
             return
 
+        import uuid
         index = selected_indices[0]
-        separator = {'name': '─' * 40, 'separator': True, 'title': False}
+        separator = Task('─' * 40, KIND_SEPARATOR, task_id=str(uuid.uuid4()))
         self.tasks.insert(index + 1, separator)
 
-        # 添加分隔符时保持窗口尺寸不变
-        self.populate_listbox_without_width_change()
-        self.save_tasks()
-        self.update_buttons_state()
+        # 添加分隔符时保持窗口尺寸不变；插入只给新任务分配排序键，其他任务不需要重新保存
+        self.schedule_save([separator])
+        self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
 
     # UI update methods
 
     def populate_listbox(self):
-        self.listbox.delete(0, tk.END)
-        colors = self.get_theme_colors()
-        
-        # 确保 self.tasks 不包含 completed_header（真实任务数据）
-        self.tasks = [task for task in self.tasks if not task.get('completed_header', False)]
-        
-        # 重新组织任务列表：将完成的任务移到分割线最下部，并添加折叠标题
-        # organized_tasks 包含 completed_header，用于显示
-        organized_tasks = self.organize_tasks_by_sections()
-        
-        # 用于跟踪主任务的计数，实现交替背景色
-        main_task_count = 0
-        
-        for index, task in enumerate(organized_tasks):
-            if task.get('separator', False):
-                display_text = task['name']
-                self.listbox.insert(tk.END, display_text)
-                self.listbox.itemconfig(index, {'bg': '', 'fg': colors['separator_fg']})
-            elif task.get('completed_header', False):
-                # 已完成分组的折叠/展开标题
-                section_id = task.get('section_id', 0)
-                is_collapsed = section_id in self.collapsed_sections
-                done_count = task.get('done_count', 0)
-                arrow = '▶' if is_collapsed else '▼'
-                display_text = f"  {arrow} 已完成 ({done_count})"
-                self.listbox.insert(tk.END, display_text)
-                self.listbox.itemconfig(index, {'bg': '', 'fg': colors['completed_header_fg']})
+        """立即重绘列表（连同已经排队的刷新）并按内容调整窗口尺寸"""
+        self.render_scheduler.request(RENDER_SIZE | RENDER_TITLE)
+        self.render_scheduler.flush()
+
+    def request_render(self, flags):
+        """标记界面需要刷新的部分；同一轮事件循环中的多次请求合并为一帧（见 render_frame）"""
+        self.render_scheduler.request(flags)
+
+    def render_frame(self, flags):
+        """一帧重绘：最多组织和渲染一次列表，更新一次标题和按钮"""
+        if flags & (RENDER_LIST | RENDER_SIZE):
+            # 重新组织任务列表：将完成的任务移到分割线最下部，并添加折叠标题
+            # organized_tasks 包含 completed_header，用于显示
+            organized_tasks = self.organize_tasks_by_sections()
+
+            # display_tasks 用于显示和事件处理（包含 completed_header），搜索时只是其中匹配的部分
+            # tasks 保持为真实任务数据（不包含 completed_header，用于保存）
+            # 只把与上次渲染不同的行应用到列表框
+            self.full_display_tasks = organized_tasks
+            self.render_display_tasks(self.filter_display_tasks(organized_tasks))
+            if flags & RENDER_SIZE:
+                self.adjust_window_size()
             else:
-                # 如果是主任务，增加计数
-                is_main_task = not task.get('is_subtask', False)
-                if is_main_task:
-                    main_task_count += 1
-                
-                icons = self.get_task_icons()
-                deadline_indicator = self.get_deadline_indicator(task)
-                
-                # 子任务缩进
-                indent = "    " if task.get('is_subtask', False) else ""
-                
-                # 根据主任务计数决定背景色（奇偶交替）
-                use_alt_bg = (main_task_count % 2 == 0)
-                
-                if task.get('cancelled', False):
-                    display_text = f"{indent}{icons['cancelled']} {task['name']}{deadline_indicator}" 
-                    self.listbox.insert(tk.END, display_text)
-                    bg_color = colors['alt_bg'] if use_alt_bg else colors['listbox_bg']
-                    self.listbox.itemconfig(index, {'bg': bg_color, 'fg': '#a9a9a9'})
-                elif task.get('done', False):
-                    completed_time = task.get('completed_time', '')
-                    time_str = f" [{completed_time}]" if completed_time else ""
-                    # 使用删除线样式
-                    display_text = f"{indent}{icons['checked']} {self.add_strikethrough(task['name'])}{time_str}"
-                    self.listbox.insert(tk.END, display_text)
-                    bg_color = colors['alt_bg'] if use_alt_bg else colors['listbox_bg']
-                    self.listbox.itemconfig(index, {'bg': bg_color, 'fg': colors['done_fg']})
-                else:
-                    display_text = f"{indent}{icons['unchecked']} {task['name']}{deadline_indicator}"
-                    self.listbox.insert(tk.END, display_text)
-                    bg_color = colors['alt_bg'] if use_alt_bg else colors['listbox_bg']
-                    self.listbox.itemconfig(index, {'bg': bg_color, 'fg': colors['fg']})
-        
-        # display_tasks 用于显示和事件处理（包含 completed_header）
-        # tasks 保持为真实任务数据（不包含 completed_header，用于保存）
-        self.display_tasks = organized_tasks
-        self.update_listbox_task_backgrounds()
-        self.adjust_window_size()
-        self.update_title()
+                self.adjust_window_size(allow_width_change=False, allow_height_change=False)
+        elif flags & RENDER_FILTER:
+            # 只有搜索文本变化：过滤上次组织好的列表，清空搜索时直接恢复完整列表
+            self.render_display_tasks(self.filter_display_tasks(self.full_display_tasks))
+            self.adjust_window_size(allow_width_change=False, allow_height_change=False)
+        if flags & RENDER_TITLE:
+            self.update_title(f" — {self.active_view}" if self.active_view is not None else '')
+        if flags & RENDER_BUTTONS:
+            self.update_buttons_state()
+        if self.debug_mode:
+            # 调试模式下每一帧都把增量维护的计数与完整重新统计的结果比较
+            for problem in self.tasks.verify_counters():
+                print(f"Counter mismatch: {problem}")
     
+    def filter_display_tasks(self, display_tasks):
+        """按当前视图和搜索文本过滤显示列表：保留匹配的任务、匹配子任务的父任务以及所在的分割线和折叠标题"""
+        if not self.search_query and self.active_view is None:
+            return display_tasks
+        matches = None
+        if self.active_view is not None:
+            matches = self.get_view_results(self.views[self.active_view])
+        if self.search_query:
+            found = self.tasks.search(self.search_query)
+            if matches is None:
+                matches = found
+            else:
+                in_view = {id(task) for task in matches}
+                matches = [task for task in found if id(task) in in_view]
+        outline = self._search_outline
+        if outline is None or outline.display_tasks is not display_tasks:
+            outline = self._search_outline = SearchOutline(display_tasks)
+        return outline.filter(matches, self.tasks.get)
+
+    def get_view_results(self, query):
+        """视图查询匹配的任务；结果（及其数量）在下一次修改任务或日期变化之前缓存"""
+        tasks = self.tasks
+        cached = self._view_results.get(query)
+        if cached is not None and cached[0] is tasks and cached[1] == tasks.version and cached[2] == self.today:
+            return cached[3]
+        try:
+            results = compile_query(query).run(tasks, self.today)
+        except QueryError as e:
+            print(f"Invalid view query {query!r}: {e}")
+            results = []
+        self._view_results[query] = (tasks, tasks.version, self.today, results)
+        return results
+
+    def select_view(self, name=None):
+        """切换到保存的视图（None 显示全部任务）"""
+        self.active_view = name if name in self.views else None
+        self.view_var.set(self.active_view or '')
+        self.request_render(RENDER_FILTER | RENDER_TITLE | RENDER_BUTTONS)
+        self.save_config()
+
+    def update_view_menu(self, menu):
+        """展开视图菜单时重新生成：每个视图后面显示匹配的任务数"""
+        menu.delete(0, tk.END)
+        menu.add_radiobutton(label="全部任务", variable=self.view_var, value='',
+                             command=lambda: self.select_view(None))
+        for name, query in self.views.items():
+            menu.add_radiobutton(label=f"{name} ({len(self.get_view_results(query))})",
+                                 variable=self.view_var, value=name,
+                                 command=lambda name=name: self.select_view(name))
+        menu.add_separator()
+        menu.add_command(label="新建视图...", command=self.add_view)
+        menu.add_command(label="删除当前视图", command=self.delete_active_view,
+                         state='normal' if self.active_view is not None else 'disabled')
+
+    def delete_active_view(self):
+        if self.active_view is None:
+            return
+        del self.views[self.active_view]
+        self.select_view(None)
+
+    def add_view(self):
+        """新建视图：输入名称和查询，查询无效时提示错误"""
+        edit_window = tk.Toplevel(self.root)
+        edit_window.title("New View")
+        edit_window.transient(self.root)
+        edit_window.grab_set()
+
+        self.set_window_icon(edit_window)
+        self.apply_title_bar_color(edit_window)
+
+        frame = tk.Frame(edit_window, padx=20, pady=20)
+        frame.pack(fill="both", expand=True)
+
+        tk.Label(frame, text="名称").grid(row=0, column=0, sticky="w")
+        name_entry = tk.Entry(frame, width=32)
+        name_entry.grid(row=0, column=1, sticky="ew", pady=(0, 5))
+        tk.Label(frame, text="查询").grid(row=1, column=0, sticky="w")
+        query_entry = tk.Entry(frame, width=32)
+        query_entry.grid(row=1, column=1, sticky="ew")
+        query_entry.insert(0, 'urgent and due<=3')
+        error_label = tk.Label(frame, text="", fg="red", anchor="w", justify="left")
+        error_label.grid(row=2, column=0, columnspan=2, sticky="w")
+        name_entry.focus_set()
+
+        def on_save(event=None):
+            name = name_entry.get().strip()
+            query = query_entry.get().strip()
+            if not name:
+                error_label.config(text="请输入名称")
+                return
+            try:
+                compile_query(query)
+            except QueryError as e:
+                error_label.config(text=str(e))
+                return
+            self.views[name] = query
+            edit_window.destroy()
+            self.select_view(name)
+
+        def on_cancel():
+            edit_window.destroy()
+
+        name_entry.bind("<Return>", on_save)
+        query_entry.bind("<Return>", on_save)
+
+        button_frame = tk.Frame(frame)
+        button_frame.grid(row=3, column=0, columnspan=2, sticky="w", pady=(10, 0))
+
+        # 根据平台调整按钮宽度，在macOS下使用更宽的按钮以避免文字裁切
+        button_width = 8 if sys.platform == "darwin" else 6
+        ttk.Button(button_frame, text="Save", command=on_save, width=button_width).pack(side="left")
+        ttk.Button(button_frame, text="Cancel", command=on_cancel, width=button_width).pack(side="left", padx=5)
+
+        edit_window.protocol("WM_DELETE_WINDOW", on_cancel)
+        self.center_window_over_window(edit_window)
+
+    def on_search_changed(self, *args):
+        self.search_query = self.search_var.get().strip()
+        self.request_render(RENDER_FILTER | RENDER_BUTTONS)
+        self.build_search_index()
+
+    def build_search_index(self, event=None):
+        """在事件循环中分批建立任务名的搜索索引（搜索框获得焦点时开始），建立期间搜索仍然可用"""
+        if self._search_index_job is None:
+            self._search_index_job = self.root.after_idle(self.continue_search_index)
+
+    def continue_search_index(self):
+        self._search_index_job = None
+        # 任务列表可能已被替换（外部修改），总是为当前的任务列表建立
+        if not self.tasks.build_search_index(time.perf_counter() + self.SEARCH_INDEX_SLICE):
+            self._search_index_job = self.root.after(1, self.continue_search_index)
+
+    def clear_search(self, event=None):
+        self.search_var.set('')
+        return 'break'
+
+    def search_archive(self, event=None):
+        """在搜索框中按回车时也在归档中查找：包含匹配任务的分组恢复到工作集并展开，匹配的任务随即出现在搜索结果中"""
+        if not self.search_query or self.loading:
+            return 'break'
+        try:
+            matches = self.archive.search(self.search_query)
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"Error searching archive: {e}")
+            return 'break'
+        section_keys = {section_key for section_key, _ in matches}
+        if not section_keys:
+            return 'break'
+        # 分组键 -> 分组编号，与 organize_tasks_by_sections 的编号相同
+        section_ids = {TOP_SECTION_KEY: 0}
+        section_id = 0
+        for task in self.tasks:
+            if task.kind != KIND_TASK:
+                section_id += 1
+                section_ids.setdefault(task.task_id or TOP_SECTION_KEY, section_id)
+        for section_key in section_keys:
+            section_id = section_ids.get(section_key)
+            if section_id is not None:
+                self.collapsed_sections.discard(section_id)
+            self.restore_archived_section(section_id, section_key)
+        self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
+        self.save_config()
+        return 'break'
+
     def organize_tasks_by_sections(self):
         """将任务按分割线分组，完成的任务和取消的任务移到每个分组的底部，添加折叠功能
         主任务完成时，其所有子任务跟随主任务一起移动到已完成区域"""
@@ -663,32 +977,29 @@ class TodoApp:
         current_section_active = []
         current_section_done = []
         section_id = 0
+        section_key = TOP_SECTION_KEY  # 开始该分组的分割线的 task_id，用于查找归档
         
         i = 0
         while i < len(self.tasks):
             task = self.tasks[i]
-            
-            # 跳过已经是折叠标题的任务
-            if task.get('completed_header', False):
-                i += 1
-                continue
-                
-            if task.get('separator', False):
+
+            if task.kind != KIND_TASK:
                 # 遇到分割线，先输出当前section的活跃任务
                 result.extend(current_section_active)
                 
-                # 如果有已完成任务，添加折叠标题
-                if current_section_done:
+                # 如果有已完成任务（包括已归档的任务），添加折叠标题
+                archived_count = self.archive.count(section_key)
+                if current_section_done or archived_count:
                     # 按主任务的完成时间排序，但保持子任务跟随主任务
                     sorted_done_tasks = self.sort_tasks_preserve_hierarchy(current_section_done)
                     
                     # 添加"已完成"折叠标题
-                    # 只计算主任务的数量，不包括子任务
-                    main_tasks_done_count = sum(1 for t in sorted_done_tasks if not t.get('is_subtask', False))
+                    # 只计算主任务的数量，不包括子任务（由任务列表增量维护）
                     completed_header = {
                         'completed_header': True,
                         'section_id': section_id,
-                        'done_count': main_tasks_done_count
+                        'section_key': section_key,
+                        'done_count': self.tasks.section_counts(section_id).finished + archived_count
                     }
                     result.append(completed_header)
                     
@@ -700,9 +1011,10 @@ class TodoApp:
                 current_section_active = []
                 current_section_done = []
                 section_id += 1
+                section_key = task.task_id or TOP_SECTION_KEY
                 i += 1
             else:
-                if task.get('is_subtask', False):
+                if task.is_subtask:
                     # 子任务应该已经在处理主任务时被处理了，这里跳过
                     i += 1
                     continue
@@ -711,15 +1023,11 @@ class TodoApp:
                     main_task = task
                     task_group = [main_task]  # 主任务和其子任务的组合
                     
-                    # 查找该主任务的所有子任务（在整个任务列表中查找）
-                    parent_task_id = main_task.get('task_id')
-                    for other_task in self.tasks:
-                        if (other_task.get('is_subtask', False) and 
-                            other_task.get('parent_task_id') == parent_task_id):
-                            task_group.append(other_task)
+                    # 该主任务的所有子任务（来自索引，不需要扫描整个任务列表）
+                    task_group.extend(self.tasks.children(main_task.task_id))
                     
                     # 根据主任务的状态决定整个任务组的分类
-                    if main_task.get('done', False) or main_task.get('cancelled', False):
+                    if main_task.done or main_task.cancelled:
                         # 主任务完成/取消，整个任务组移动到已完成区域
                         current_section_done.extend(task_group)
                     else:
@@ -730,15 +1038,16 @@ class TodoApp:
         
         # 处理最后一个section
         result.extend(current_section_active)
-        if current_section_done:
+        archived_count = self.archive.count(section_key)
+        if current_section_done or archived_count:
             # 按主任务的完成时间排序，但保持子任务跟随主任务
             sorted_done_tasks = self.sort_tasks_preserve_hierarchy(current_section_done)
-            # 只计算主任务的数量，不包括子任务
-            main_tasks_done_count = sum(1 for t in sorted_done_tasks if not t.get('is_subtask', False))
+            # 只计算主任务的数量，不包括子任务（由任务列表增量维护）
             completed_header = {
                 'completed_header': True,
                 'section_id': section_id,
-                'done_count': main_tasks_done_count
+                'section_key': section_key,
+                'done_count': self.tasks.section_counts(section_id).finished + archived_count
             }
             result.append(completed_header)
             if section_id not in self.collapsed_sections:
@@ -748,73 +1057,108 @@ class TodoApp:
     
     def sort_tasks_preserve_hierarchy(self, tasks):
         """对任务进行排序，但保持子任务跟随主任务的层级关系"""
-        # 分离主任务和子任务
-        main_tasks = [t for t in tasks if not t.get('is_subtask', False)]
-        subtasks = [t for t in tasks if t.get('is_subtask', False)]
+        # 分离主任务和子任务，子任务按父任务分组
+        main_tasks = []
+        subtasks = {}
+        for t in tasks:
+            if t.is_subtask:
+                subtasks.setdefault(t.parent_task_id, []).append(t)
+            else:
+                main_tasks.append(t)
         
         # 按完成时间排序主任务
-        main_tasks.sort(key=lambda t: t.get('completed_time', ''))
+        main_tasks.sort(key=lambda t: t.completed_time)
         
         # 重新组织任务，确保子任务跟随主任务
         result = []
         for main_task in main_tasks:
             result.append(main_task)
-            # 找到该主任务的所有子任务并添加到结果中
-            main_task_id = main_task.get('task_id')
-            main_task_subtasks = [st for st in subtasks if st.get('parent_task_id') == main_task_id]
-            # 子任务也按完成时间排序
-            main_task_subtasks.sort(key=lambda t: t.get('completed_time', ''))
-            result.extend(main_task_subtasks)
+            # 该主任务的所有子任务，也按完成时间排序
+            main_task_subtasks = subtasks.get(main_task.task_id)
+            if main_task_subtasks:
+                main_task_subtasks.sort(key=lambda t: t.completed_time)
+                result.extend(main_task_subtasks)
         
         return result
     
     def add_strikethrough(self, text):
-        """为文字添加删除线效果"""
-        return ''.join([char + '\u0336' for char in text])
+        """为文字添加删除线效果（每个字符后面跟一个组合删除线字符）"""
+        return '\u0336'.join(text) + '\u0336' if text else ''
     
     def get_deadline_indicator(self, task):
         """获取deadline提示标识"""
         deadline = task.get('deadline', '')
         if not deadline or task.get('done', False):
             return ''
-        
-        try:
-            deadline_date = datetime.strptime(deadline, '%Y-%m-%d')
-            now = datetime.now()
-            days_diff = (deadline_date - now).days
-            
-            if days_diff < 0:
-                return f' ⚠️超期{abs(days_diff)}天'
-            elif days_diff == 0:
-                return ' ⚠️今天到期'
-            elif days_diff <= 3:
-                return f' ⏰{days_diff}天后到期'
-            else:
-                return f' 📅{deadline}'
-        except:
+        # 每个截止日期字符串只解析一次；提示只取决于日期差，跨过午夜时由 on_day_change 刷新
+        ordinal = parse_deadline(deadline)
+        if ordinal is None:
             return ''
+        return deadline_indicator(ordinal, self.today, deadline)
+
+    def schedule_day_change(self):
+        """在下一个午夜检查日期变化（最长间隔 DAY_CHECK_MAX_MS）"""
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        delay = int((midnight - now).total_seconds() * 1000) + 1000  # 稍晚一点，确保已经跨过午夜
+        self.root.after(min(delay, self.DAY_CHECK_MAX_MS), self.on_day_change)
+
+    def on_day_change(self):
+        """日期变化后只刷新截止日期提示会变化的行（超期和即将到期的任务）"""
+        today = today_ordinal()
+        if today != self.today:
+            changed = self.tasks.deadlines.changed_between(self.today, today)
+            self.today = today
+            for task in changed:
+                task.touch()
+            if changed:
+                self.refresh_task_rows({task.task_id for task in changed})
+            elif self.active_view is not None:
+                # 按相对日期（due、overdue）查询的视图结果随日期变化
+                self.request_render(RENDER_FILTER)
+        self.schedule_day_change()
 
     def update_buttons_state(self, event=None):
-        selected_indices = self.listbox.curselection()
-        has_selection = bool(selected_indices) or self.bulk_selection_mode
-        
+        if self.loading:
+            # 加载完成之前不允许修改任务
+            for button in self.buttons.values():
+                button['state'] = 'disabled'
+            return
+
+        # 选中的行按区间保存，各类行的数量按区间统计，与选中的行数无关
+        selected = self.selected_indices
+        kinds = self.get_row_kinds()
         # 过滤掉折叠标题和分割线
-        valid_selections = [idx for idx in selected_indices 
-                           if idx < len(self.display_tasks)
-                           and not self.display_tasks[idx].get('separator', False) 
-                           and not self.display_tasks[idx].get('completed_header', False)]
-        
-        only_separators_selected = all(idx < len(self.display_tasks) and 
-                                       (self.display_tasks[idx].get('separator', False) or 
-                                        self.display_tasks[idx].get('completed_header', False))
-                                       for idx in selected_indices)
-        all_cancelled = all(idx < len(self.display_tasks) and 
-                           self.display_tasks[idx].get('cancelled', False) 
-                           for idx in valid_selections) if valid_selections else False
+        valid_count = len(selected) - kinds.count(ROW_STRUCTURE, selected)
+        all_cancelled = valid_count > 0 and kinds.count(ROW_CANCELLED, selected) == valid_count
 
         self.buttons["➕"]['state'] = 'normal' if self.entry.get("1.0", "end-1c").strip() else 'disabled'
-        self.buttons["➖"]['state'] = 'normal' if valid_selections else 'disabled'
-        self.buttons["✔"]['state'] = 'disabled' if only_separators_selected or all_cancelled or not valid_selections else 'normal'
+        self.buttons["➖"]['state'] = 'normal' if valid_count else 'disabled'
+        self.buttons["✔"]['state'] = 'disabled' if all_cancelled or not valid_count else 'normal'
+
+    def get_row_kinds(self):
+        """当前显示列表的行类型表（显示列表变化后重新建立）"""
+        kinds = self._row_kinds
+        if kinds is None or kinds.rows is not self.display_tasks:
+            kinds = self._row_kinds = RowKinds(self.display_tasks, self.classify_row)
+        return kinds
+
+    @staticmethod
+    def classify_row(task):
+        if type(task) is not Task or task.kind != KIND_TASK:
+            return ROW_STRUCTURE  # 折叠标题或分割线
+        return ROW_CANCELLED if task.cancelled else 0
+
+    def read_listbox_selection(self):
+        """列表框当前的选择：虚拟列表直接复制区间，Listbox 的 curselection() 已经有序，一次遍历即可"""
+        if self.list_view == 'canvas':
+            return self.listbox.selection_intervals()
+        return IntervalSet.from_sorted(self.listbox.curselection())
+
+    def on_listbox_select(self, event=None):
+        """列表框自身的鼠标和键盘操作改变了选择：读取一次新的选择"""
+        self.selected_indices = self.read_listbox_selection()
+        self.update_buttons_state()
 
 
     def update_buttons_style(self, bg, fg):
@@ -841,32 +1185,204 @@ class TodoApp:
                 foreground=[('active', fg), ('disabled', 'grey')])
 
     def update_listbox_task_backgrounds(self):
+        # 主题变化后重新计算每一行的颜色，只有颜色变化的行会被修改
+        if self.showing_render_cache:
+            # 缓存的行已经是保存时的颜色；此时 display_tasks 还是空的，按它重绘会清空第一屏
+            return
+        self.render_display_tasks(self.display_tasks)
+
+    def get_row_stamp(self, task):
+        """行内容的标记：标记不变时行的文本也不变（虚拟列表模式下不生成文本就能比较）"""
+        if type(task) is Task:
+            # 名字防止已释放任务的 id 被新任务复用时误认为没有变化
+            return (task.version, task.name)
+        return (task.get('done_count', 0), task.get('section_id', 0) in self.collapsed_sections)
+
+    def get_row_key(self, task):
+        """行的标识：任务按对象身份，折叠标题按所属分组"""
+        if task.get('completed_header', False):
+            return ('header', task.get('section_key'))
+        return id(task)
+
+    def get_display_context(self):
+        """除任务本身以外影响显示的因素；任何一项变化，缓存的显示字符串都不再使用
+
+        日期不在其中：跨过午夜时 on_day_change 只让提示会变化的任务失效。
+        """
+        return (self.font_size, self.is_dark_mode)
+
+    def get_display_entry(self, task, colors, context):
+        """一行的 (文本, 背景色, 前景色, 测量宽度用的文本)，按任务身份和版本号缓存"""
+        if type(task) is Task:
+            key = (id(task), task.version) + context
+            owner = task
+        elif task.get('completed_header', False):
+            section_id = task.get('section_id', 0)
+            key = ('header', section_id, task.get('done_count', 0),
+                   section_id in self.collapsed_sections) + context
+            owner = None
+        else:
+            key = None
+        if key is not None:
+            entry = self.display_cache.get(key, owner)
+            if entry is not None:
+                return entry
+
+        row_colors = self.get_row_colors(task, colors)
+        text = self.get_row_text(task)
+        # 宽度按不带删除线的文本计算
+        width_text = self.get_row_text(task, strikethrough=False) if task.get('done', False) else text
+        entry = (text, row_colors['bg'], row_colors['fg'], width_text)
+        if key is not None:
+            self.display_cache.put(key, owner, entry)
+        return entry
+
+    def make_row(self, task, colors, context):
+        entry = self.get_display_entry(task, colors, context)
+        return (self.get_row_key(task), entry[0], entry[1], entry[2])
+
+    def render_display_tasks(self, display_tasks):
+        """把新的显示列表增量应用到列表框：只删除、插入或修改变化的行，保持选中状态和滚动位置"""
+        self.showing_render_cache = False
+        colors = self.get_theme_colors()
+        context = self.get_display_context()
+        if self.list_view == 'canvas':
+            # 虚拟列表只在绘制时才按需生成可见行的文本和颜色
+            self.display_tasks = display_tasks
+            self.listbox.set_rows(len(display_tasks),
+                                  lambda index: self.make_row(display_tasks[index], colors, context)[1:],
+                                  lambda index: self.get_row_key(display_tasks[index]))
+            # 虚拟列表按 key 重新对应选中的行
+            self.selected_indices = self.listbox.selection_intervals()
+            # 只比较行的 key 和内容标记（不生成文本），只测量新增或内容变化的行
+            rows = [(self.get_row_key(task), self.get_row_stamp(task)) for task in display_tasks]
+            old_rows = self.canvas_rows
+            self.track_row_widths(diff_rows(old_rows, rows), old_rows, display_tasks, colors, context)
+            self.canvas_rows = rows
+            return
+
+        self.display_cache.reserve(len(display_tasks))
+        self.text_widths.reserve(len(display_tasks))
+        rows = [self.make_row(task, colors, context) for task in display_tasks]
+        old_rows = self.rendered_rows
+
+        # 记住最上面一行显示的是哪个任务，更新后滚动回这一行
+        top_key = None
+        if old_rows:
+            top = self.listbox.nearest(0)
+            if 0 <= top < len(old_rows):
+                top_key = old_rows[top][0]
+
+        ops = diff_rows(old_rows, rows)
+        apply_row_diff(self.listbox, ops, (colors['listbox_bg'], colors['fg']))
+        self.track_row_widths(ops, old_rows, display_tasks, colors, context)
+        self.rendered_rows = rows
+        self.display_tasks = display_tasks
+        # 列表框删除和插入行时选择随之移动，按同样的编辑脚本移动选中的区间
+        for op in ops:
+            if op[0] == 'delete':
+                self.selected_indices.delete_rows(op[1], op[2])
+            elif op[0] == 'insert':
+                self.selected_indices.insert_rows(op[1], len(op[2]))
+
+        if top_key is not None and (top >= len(rows) or rows[top][0] != top_key):
+            new_top = next((index for index, row in enumerate(rows) if row[0] == top_key), None)
+            if new_top is not None:
+                self.listbox.yview(new_top)
+
+    def get_row_text(self, task, strikethrough=True):
+        """列表中一行的显示文本（任务、分割线或已完成分组的折叠标题）"""
+        if task.get('separator', False):
+            return task['name']
+        if task.get('completed_header', False):
+            # 已完成分组的折叠/展开标题
+            is_collapsed = task.get('section_id', 0) in self.collapsed_sections
+            arrow = '▶' if is_collapsed else '▼'
+            return f"  {arrow} 已完成 ({task.get('done_count', 0)})"
+
+        icons = self.get_task_icons()
+        # 子任务缩进
+        indent = "    " if task.get('is_subtask', False) else ""
+        if task.get('cancelled', False):
+            return f"{indent}{icons['cancelled']} {task['name']}{self.get_deadline_indicator(task)}"
+        if task.get('done', False):
+            completed_time = task.get('completed_time', '')
+            time_str = f" [{completed_time}]" if completed_time else ""
+            # 使用删除线样式
+            name = self.add_strikethrough(task['name']) if strikethrough else task['name']
+            return f"{indent}{icons['checked']} {name}{time_str}"
+        return f"{indent}{icons['unchecked']} {task['name']}{self.get_deadline_indicator(task)}"
+
+    def get_row_colors(self, task, colors):
+        """列表中一行最终的背景色和前景色"""
+        if task.get('separator', False):
+            return {'bg': '', 'fg': colors['separator_fg']}
+        if task.get('completed_header', False):
+            return {'bg': '', 'fg': colors['completed_header_fg']}
+        if task.get('cancelled', False):
+            return {'bg': '', 'fg': '#a9a9a9'}
+        if task.get('done', False):
+            return {'bg': '', 'fg': colors['done_fg']}
+        if task.get('urgent', False):
+            # 紧急任务使用红色背景，覆盖自定义背景色
+            return {'bg': colors['urgent_bg'], 'fg': 'white'}
+        if not task.get('is_subtask', False):
+            # 主任务：使用自定义背景色或默认主任务背景色
+            return {'bg': task.get('custom_bg_color', '') or colors['main_task_bg'], 'fg': colors['fg']}
+        # 子任务：使用普通背景色
+        return {'bg': colors['listbox_bg'], 'fg': colors['fg']}
+
+    def refresh_task_rows(self, task_ids):
+        """只重绘指定任务所在的行（任务的位置和可见性没有变化时使用）"""
+        if self.search_query or self.active_view is not None:
+            # 修改后的任务可能不再匹配（或开始匹配）过滤条件
+            self.request_render(RENDER_FILTER)
         colors = self.get_theme_colors()
+        context = self.get_display_context()
+        if self.list_view == 'canvas':
+            indices = [index for index, task in enumerate(self.display_tasks)
+                       if task.get('task_id') in task_ids and not task.get('completed_header', False)]
+            self.listbox.refresh_rows(indices)
+            ops = []
+            for index in indices:
+                row = (self.get_row_key(self.display_tasks[index]), self.get_row_stamp(self.display_tasks[index]))
+                if index < len(self.canvas_rows) and row != self.canvas_rows[index]:
+                    ops.append(('update', index, row, True))
+                    self.canvas_rows[index] = row
+            self.track_row_widths(ops, None, self.display_tasks, colors, context)
+            return
+        ops = []
         for index, task in enumerate(self.display_tasks):
-            if task.get('separator', False):
-                self.listbox.itemconfig(index, {'bg': '', 'fg': colors['separator_fg']})
-            elif task.get('completed_header', False):
-                self.listbox.itemconfig(index, {'bg': '', 'fg': colors['completed_header_fg']})
-            elif task.get('cancelled', False):
-                self.listbox.itemconfig(index, {'bg': '', 'fg': '#a9a9a9'})
-            elif task.get('done', False):
-                self.listbox.itemconfig(index, {'bg': '', 'fg': colors['done_fg']})
-            elif task.get('urgent', False):
-                # 紧急任务使用红色背景，覆盖自定义背景色
-                self.listbox.itemconfig(index, {'bg': colors['urgent_bg'], 'fg': 'white'})
-            else:
-                # 主任务：使用自定义背景色或默认主任务背景色
-                if not task.get('is_subtask', False):
-                    custom_bg = task.get('custom_bg_color', '')
-                    if custom_bg:
-                        # 使用用户自定义的背景色
-                        self.listbox.itemconfig(index, {'bg': custom_bg, 'fg': colors['fg']})
-                    else:
-                        # 使用默认主任务背景色
-                        self.listbox.itemconfig(index, {'bg': colors['main_task_bg'], 'fg': colors['fg']})
-                else:
-                    # 子任务：使用普通背景色
-                    self.listbox.itemconfig(index, {'bg': colors['listbox_bg'], 'fg': colors['fg']})
+            if task.get('task_id') in task_ids and not task.get('completed_header', False):
+                row = self.make_row(task, colors, context)
+                old_row = self.rendered_rows[index]
+                if row != old_row:
+                    ops.append(('update', index, row, row[1] != old_row[1]))
+                    self.rendered_rows[index] = row
+        apply_row_diff(self.listbox, ops, (colors['listbox_bg'], colors['fg']))
+        self.track_row_widths(ops, None, self.display_tasks, colors, context)
+
+    def track_row_widths(self, ops, old_rows, display_tasks, colors, context):
+        """按编辑脚本更新行宽统计，只测量新增或文本变化的行"""
+        row_widths = self.row_widths
+        for op in ops:
+            kind = op[0]
+            if kind == 'delete':
+                for row in old_rows[op[1]:op[2] + 1]:
+                    row_widths.remove(row[0])
+            elif kind == 'insert':
+                index = op[1]
+                for offset, row in enumerate(op[2]):
+                    row_widths.add(row[0], self.get_display_entry(display_tasks[index + offset], colors, context)[3])
+            elif op[3]:
+                row_widths.add(op[2][0], self.get_display_entry(display_tasks[op[1]], colors, context)[3])
+
+    def reset_row_widths(self):
+        """按当前显示的所有行重新统计行宽（字体变化时使用）"""
+        colors = self.get_theme_colors()
+        context = self.get_display_context()
+        self.row_widths.reset((self.get_row_key(task), self.get_display_entry(task, colors, context)[3])
+                              for task in self.display_tasks)
 
     def adjust_window_size(self, allow_width_change=True, allow_height_change=True):
         num_tasks = len(self.display_tasks)
@@ -916,45 +1432,10 @@ class TodoApp:
                 min_width = 300  # 最小宽度
                 max_allowed_width = 1000  # 最大宽度
             
-            # 创建临时字体对象来测量文本宽度
-            import tkinter.font as tkfont
-            font = tkfont.Font(family=self.get_system_font()[0], size=self.get_system_font()[1])
-            
+            # 最宽一行的宽度在渲染时增量维护（加上padding和边距、滚动条等）
             calculated_width = min_width
-            
-            # 重新组织任务，获取当前实际显示的任务列表
-            current_display_tasks = self.organize_tasks_by_sections()
-            
-            for task in current_display_tasks:
-                # 获取显示文本，但在宽度计算时使用原始文本避免删除线影响
-                if task.get('separator', False):
-                    display_text = task['name']
-                elif task.get('completed_header', False):
-                    section_id = task.get('section_id', 0)
-                    done_count = task.get('done_count', 0)
-                    is_collapsed = section_id in self.collapsed_sections
-                    arrow = '▶' if is_collapsed else '▼'
-                    display_text = f"  {arrow} 已完成 ({done_count})"
-                else:
-                    icons = self.get_task_icons()
-                    deadline_indicator = self.get_deadline_indicator(task)
-                    
-                    # 子任务缩进
-                    indent = "    " if task.get('is_subtask', False) else ""
-                    
-                    if task.get('cancelled', False):
-                        display_text = f"{indent}{icons['cancelled']} {task['name']}{deadline_indicator}"
-                    elif task.get('done', False):
-                        completed_time = task.get('completed_time', '')
-                        time_str = f" [{completed_time}]" if completed_time else ""
-                        # 在宽度计算时使用原始文本，不使用删除线版本
-                        display_text = f"{indent}{icons['checked']} {task['name']}{time_str}"
-                    else:
-                        display_text = f"{indent}{icons['unchecked']} {task['name']}{deadline_indicator}"
-                
-                # 测量文本宽度（加上边距和滚动条等）
-                text_width = font.measure(display_text) + 80  # 加上padding和边距
-                calculated_width = max(calculated_width, text_width)
+            if self.row_widths:
+                calculated_width = max(calculated_width, self.row_widths.max_width + 80)
             
             # 在macOS上为按钮预留额外空间
             if sys.platform == "darwin":
@@ -992,20 +1473,25 @@ class TodoApp:
         
         self.root.geometry(f"{final_width}x{final_height}")
 
-    def update_title(self):
-        # 只计算主任务的数量（不包括子任务、分割线和已取消的任务）
-        total_tasks = sum(1 for task in self.tasks if not task.get('separator', False) and not task.get('cancelled', False) and not task.get('is_subtask', False))
-        done_tasks = sum(task.get('done', False) for task in self.tasks if not task.get('separator', False) and not task.get('cancelled', False) and not task.get('is_subtask', False))
+    def update_title(self, suffix=''):
+        # 只计算主任务的数量（不包括子任务、分割线和已取消的任务），计数由任务列表增量维护
+        counts = self.tasks.counts
+        total_tasks = counts.main - counts.cancelled
+        done_tasks = counts.done
         urgent_tasks = self.count_urgent_tasks()
+        # 归档中的任务都是已完成的主任务
+        archived_done = self.archive.done_count()
+        total_tasks += archived_done
+        done_tasks += archived_done
 
         urgent_text = f"[{urgent_tasks} urgent]" if urgent_tasks > 0 else ""
 
         if total_tasks == 0:
-            self.root.title("To-Do")
+            self.root.title(f"To-Do{suffix}")
         elif done_tasks == total_tasks:
-            self.root.title(f"To-Do ({done_tasks}/{total_tasks}) — All done! {urgent_text}")
+            self.root.title(f"To-Do ({done_tasks}/{total_tasks}) — All done! {urgent_text}{suffix}")
         else:
-            self.root.title(f"To-Do ({done_tasks}/{total_tasks}) {urgent_text}")
+            self.root.title(f"To-Do ({done_tasks}/{total_tasks}) {urgent_text}{suffix}")
 
     def apply_theme(self):
         colors = self.get_theme_colors()
@@ -1015,6 +1501,7 @@ class TodoApp:
         self.listbox.configure(bg=colors['listbox_bg'], fg=colors['fg'],
                                selectbackground=colors['select_bg'], selectforeground=colors['fg'])
         self.entry.configure(bg=colors['entry_bg'], fg=colors['fg'])
+        self.search_entry.configure(bg=colors['entry_bg'], fg=colors['fg'], insertbackground=colors['caret_color'])
         self.update_buttons_style(colors['button_bg'], colors['button_fg'])
         self.update_listbox_task_backgrounds()
 
@@ -1077,94 +1564,29 @@ class TodoApp:
         # 切换折叠状态
         if section_id in self.collapsed_sections:
             self.collapsed_sections.remove(section_id)
+            section_key = task.get('section_key', TOP_SECTION_KEY)
+            if self.archive.count(section_key):
+                self.restore_archived_section(section_id, section_key)
         else:
             self.collapsed_sections.add(section_id)
         
         # 清除选中状态，避免误操作
-        self.listbox.selection_clear(0, tk.END)
+        self.clear_selection()
         
         # 重新渲染列表，但不改变窗口宽度
-        self.populate_listbox_without_width_change()
+        self.request_render(RENDER_LIST | RENDER_TITLE)
         self.save_config()
     
     def populate_listbox_without_width_change(self):
-        """重新填充列表框但不改变窗口宽度和高度"""
-        self.listbox.delete(0, tk.END)
-        colors = self.get_theme_colors()
-        
-        # 确保 self.tasks 不包含 completed_header（真实任务数据）
-        self.tasks = [task for task in self.tasks if not task.get('completed_header', False)]
-        
-        # 重新组织任务列表：将完成的任务移到分割线最下部，并添加折叠标题
-        # organized_tasks 包含 completed_header，用于显示
-        organized_tasks = self.organize_tasks_by_sections()
-        
-        # 用于跟踪主任务的计数，实现交替背景色
-        main_task_count = 0
-        
-        for index, task in enumerate(organized_tasks):
-            if task.get('separator', False):
-                display_text = task['name']
-                self.listbox.insert(tk.END, display_text)
-                self.listbox.itemconfig(index, {'bg': '', 'fg': colors['separator_fg']})
-            elif task.get('completed_header', False):
-                # 已完成分组的折叠/展开标题
-                section_id = task.get('section_id', 0)
-                is_collapsed = section_id in self.collapsed_sections
-                done_count = task.get('done_count', 0)
-                arrow = '▶' if is_collapsed else '▼'
-                display_text = f"  {arrow} 已完成 ({done_count})"
-                self.listbox.insert(tk.END, display_text)
-                self.listbox.itemconfig(index, {'bg': '', 'fg': colors['completed_header_fg']})
-            else:
-                # 如果是主任务，增加计数
-                is_main_task = not task.get('is_subtask', False)
-                if is_main_task:
-                    main_task_count += 1
-                
-                icons = self.get_task_icons()
-                deadline_indicator = self.get_deadline_indicator(task)
-                
-                # 子任务缩进
-                indent = "    " if task.get('is_subtask', False) else ""
-                
-                # 根据主任务计数决定背景色（奇偶交替）
-                use_alt_bg = (main_task_count % 2 == 0)
-                
-                if task.get('cancelled', False):
-                    display_text = f"{indent}{icons['cancelled']} {task['name']}{deadline_indicator}" 
-                    self.listbox.insert(tk.END, display_text)
-                    bg_color = colors['alt_bg'] if use_alt_bg else colors['listbox_bg']
-                    self.listbox.itemconfig(index, {'bg': bg_color, 'fg': '#a9a9a9'})
-                elif task.get('done', False):
-                    completed_time = task.get('completed_time', '')
-                    time_str = f" [{completed_time}]" if completed_time else ""
-                    # 使用删除线样式
-                    display_text = f"{indent}{icons['checked']} {self.add_strikethrough(task['name'])}{time_str}"
-                    self.listbox.insert(tk.END, display_text)
-                    bg_color = colors['alt_bg'] if use_alt_bg else colors['listbox_bg']
-                    self.listbox.itemconfig(index, {'bg': bg_color, 'fg': colors['done_fg']})
-                else:
-                    display_text = f"{indent}{icons['unchecked']} {task['name']}{deadline_indicator}"
-                    self.listbox.insert(tk.END, display_text)
-                    bg_color = colors['alt_bg'] if use_alt_bg else colors['listbox_bg']
-                    self.listbox.itemconfig(index, {'bg': bg_color, 'fg': colors['fg']})
-        
-        # display_tasks 用于显示和事件处理（包含 completed_header）
-        # tasks 保持为真实任务数据（不包含 completed_header，用于保存）
-        self.display_tasks = organized_tasks
-        
-        self.update_listbox_task_backgrounds()
-        # 不改变宽度和高度
-        self.adjust_window_size(allow_width_change=False, allow_height_change=False)
-        self.update_title()
+        """立即重新填充列表框但不改变窗口宽度和高度"""
+        self.render_scheduler.request(RENDER_LIST | RENDER_TITLE)
+        self.render_scheduler.flush()
 
     def show_context_menu_or_ctrl_click(self, event):
         """在macOS上处理Ctrl+Click - 区分右键菜单和多选操作"""
         # 在macOS上，长按Ctrl+Click通常用于右键菜单
         # 短按用于多选，这里我们简化处理：如果已经有选中项，则显示菜单，否则进行多选
-        current_selection = self.listbox.curselection()
-        if len(current_selection) > 0:
+        if self.selected_indices:
             # 已有选中项，显示右键菜单
             self.show_context_menu(event)
         else:
@@ -1174,9 +1596,11 @@ class TodoApp:
     def on_ctrl_click(self, event):
         """Handle robust Ctrl-click to toggle selection of individual tasks."""
         index = self.listbox.nearest(event.y)
-        if index in self.listbox.curselection():
+        if index in self.selected_indices:
+            self.selected_indices.discard(index)
             self.listbox.selection_clear(index)
         else:
+            self.selected_indices.add(index)
             self.listbox.selection_set(index)
 
         self.update_buttons_state()
@@ -1186,13 +1610,19 @@ class TodoApp:
     def on_shift_click(self, event):
         """Handle Shift-click to select a range of tasks."""
         index = self.listbox.nearest(event.y)
-        cur_selection = self.listbox.curselection()
-        if cur_selection:
-            start_index = cur_selection[0]
+        start_index = self.selected_indices.first()
+        if start_index is not None:
+            first, last = sorted((start_index, index))
+            self.selected_indices.clear()
+            self.selected_indices.add_range(first, last)
             self.listbox.selection_clear(0, tk.END)
-            self.listbox.selection_set(start_index, index)
+            self.listbox.selection_set(first, last)
         else:
+            self.selected_indices.add(index)
             self.listbox.selection_set(index)
+        self.update_buttons_state()
+        # 选择已经完整设置好，不再交给列表框的默认处理（那样还要重新读取一次全部选择）
+        return 'break'
 
     def on_entry_focus_in(self, event=None):
         colors = self.get_theme_colors()
@@ -1205,7 +1635,7 @@ class TodoApp:
         self.entry.config(insertbackground=colors['caret_color'])
 
     def on_entry_click(self, event=None):
-        self.listbox.selection_clear(0, tk.END)
+        self.clear_selection()
         self.entry.focus_set()
         self.bulk_selection_mode = False
         self.update_buttons_state()
@@ -1232,7 +1662,29 @@ class TodoApp:
             
         self.root.unbind_all('<Control-h>')
 
+        # 排队中的刷新先完成，首屏缓存才是最新的内容
+        self.render_scheduler.flush()
         self.save_config()
+        # 确定性地写出所有尚未落盘的修改（包括还在等待生成快照的修改）
+        if self._snapshot_job is not None:
+            self.snapshot_tasks()
+        self.persistence.close()
+        self.closing = True
+        # 主循环已经停止，后台线程最后交回的结果在这里处理，不会丢失
+        self.drain_worker_results()
+        if self.tasks_version != self._saved_tasks_version:
+            # 应用合并结果时又产生了需要保存的修改（例如重新分配的排序键）
+            self.save_tasks()
+            self.drain_worker_results()
+        self.render_scheduler.flush()
+        if self.debug_mode:
+            print(f"Save stats: {self.storage.stats.as_dict()}")
+            print(f"Display cache stats: {self.display_cache.stats()}")
+            print(f"Text width cache stats: {self.text_widths.stats()}")
+            print(f"Render stats: {self.render_scheduler.stats()}")
+        self.storage.close()
+        # 所有数据写盘之后再保存首屏缓存，指纹才能与下次启动时的文件一致
+        self.write_render_cache()
         self.root.destroy()
         self.root.quit()
 
@@ -1270,14 +1722,19 @@ class TodoApp:
             self.bulk_selection_mode = False
         self.update_buttons_state()
 
+    def clear_selection(self):
+        self.selected_indices.clear()
+        self.listbox.selection_clear(0, tk.END)
+
     def update_listbox_selections(self):
+        # 每个选中的区间只需要一次 selection_set
         self.listbox.selection_clear(0, tk.END)
-        for idx in self.selected_indices:
-            self.listbox.selection_set(idx)
+        for first, last in self.selected_indices.ranges():
+            self.listbox.selection_set(first, last)
         self.update_buttons_state()
 
     def select_all_tasks(self, event=None):
-        self.selected_indices = set(range(len(self.tasks)))
+        self.selected_indices.set_all(len(self.display_tasks))
         self.update_listbox_selections()
 
     def select_all_or_text(self, event=None):
@@ -1293,6 +1750,7 @@ class TodoApp:
     def start_drag(self, event):
         """Handle the start of the drag event."""
         self.drag_start_index = self.listbox.nearest(event.y)
+        self.drop_target = None
         
         # 如果点击的是已完成标题，切换折叠状态而不是拖拽
         if (self.drag_start_index < len(self.display_tasks) and 
@@ -1301,119 +1759,475 @@ class TodoApp:
             self.drag_start_index = None
             return 'break'
         
+        if len(self.selected_indices) > 1 and self.drag_start_index in self.selected_indices:
+            # 按在多选中的一行上：保留整个选择，拖动时一起移动
+            self.drag_rows = self.selected_indices.copy()
+            self.drag_keep_selection = True
+            self.listbox.focus_set()
+            return 'break'
+
         # 如果点击的是分割线，允许拖拽但不影响其他逻辑
         # 普通任务：正常的拖拽和选择逻辑
         self.listbox.selection_clear(0, tk.END)
         self.listbox.selection_set(self.drag_start_index)
-        self.selected_indices = {self.drag_start_index}
+        self.selected_indices = IntervalSet([self.drag_start_index])
+        self.drag_rows = self.selected_indices.copy()
+        self.drag_keep_selection = False
         self.update_buttons_state()
 
     def do_drag(self, event):
-        """Handle the dragging motion and visually highlight the item being dragged over."""
-        drag_over_index = self.listbox.nearest(event.y)
-        if drag_over_index != self.drag_start_index:
-            self.listbox.selection_clear(0, tk.END)
-            self.listbox.selection_set(drag_over_index)
-    
+        """拖动时只记录指针位置，指示线按固定间隔更新，不在每个移动事件中修改选择"""
+        if self.drag_start_index is None:
+            return None
+        self.drag_pointer_y = event.y
+        if self._drop_indicator_job is None:
+            self._drop_indicator_job = self.root.after(self.DROP_INDICATOR_INTERVAL, self.update_drop_indicator)
+        # 不交给列表框的默认处理（那会把拖过的行都选中）
+        return 'break'
+
+    def get_drop_target(self, index):
+        """指针下的第 index 行对应的放下位置 (行, 是否放在这一行之后)；不能放在这里时返回 None"""
+        if (self.drag_start_index is None or not 0 <= index < len(self.display_tasks)
+                or index in self.drag_rows or type(self.display_tasks[index]) is not Task):
+            return None
+        return index, index > self.drag_rows.first()
+
+    def update_drop_indicator(self):
+        self._drop_indicator_job = None
+        if self.drag_start_index is None:
+            return
+        y = self.drag_pointer_y
+        # 指针在列表上方或下方时滚动，可以拖到看不见的位置
+        scroll = -1 if y < 0 else 1 if y > self.listbox.winfo_height() else 0
+        if scroll:
+            self.listbox.yview_scroll(scroll, 'units')
+        target = self.get_drop_target(self.listbox.nearest(y))
+        if target != self.drop_target or scroll:
+            self.drop_target = target
+            self.place_drop_indicator(target)
+        if scroll:
+            self._drop_indicator_job = self.root.after(self.DROP_INDICATOR_INTERVAL, self.update_drop_indicator)
+
+    def place_drop_indicator(self, target):
+        """在放下位置画一条横线；target 为 None 时隐藏"""
+        bbox = self.listbox.bbox(target[0]) if target is not None else None
+        if bbox is None:
+            if self.drop_indicator is not None:
+                self.drop_indicator.place_forget()
+            return
+        if self.drop_indicator is None:
+            self.drop_indicator = tk.Frame(self.root, height=2, bd=0)
+        index, after = target
+        y = bbox[1] + bbox[3] if after else bbox[1]
+        self.drop_indicator.configure(bg=self.get_theme_colors()['entry_border_focus'])
+        self.drop_indicator.place(in_=self.listbox, x=0, y=max(y - 1, 0), relwidth=1, height=2)
+        self.drop_indicator.lift()
+
     def end_drag(self, event):
-        """Handle dropping the item by moving it to the new position."""
+        """松开鼠标：拖动的行（主任务连同所有子任务）作为一个整体移动到指示线的位置"""
+        if self._drop_indicator_job is not None:
+            self.root.after_cancel(self._drop_indicator_job)
+            self._drop_indicator_job = None
+        self.place_drop_indicator(None)
         drag_end_index = self.listbox.nearest(event.y)
-        if self.drag_start_index is not None and drag_end_index != self.drag_start_index:
-            # 从 display_tasks 获取被拖拽的任务
-            dragged_task = self.display_tasks[self.drag_start_index]
-            target_task = self.display_tasks[drag_end_index]
-            
-            # 在真实的 tasks 列表中重新排序
-            if dragged_task in self.tasks and target_task in self.tasks:
-                start_idx_in_tasks = self.tasks.index(dragged_task)
-                end_idx_in_tasks = self.tasks.index(target_task)
-                task = self.tasks.pop(start_idx_in_tasks)
-                self.tasks.insert(end_idx_in_tasks, task)
-                
-                # 拖拽重排序时不改变窗口宽度
-                self.populate_listbox_without_width_change()
-                self.save_tasks()
-                self.update_buttons_state()
+        target = self.get_drop_target(drag_end_index)
+        if target is not None:
+            index, after = target
+            display_tasks = self.display_tasks
+            block = drag_block(self.tasks, [display_tasks[row] for row in self.drag_rows
+                                                if row < len(display_tasks)])
+            position = drop_position(self.tasks, block, display_tasks[index], after)
+            if position is not None:
+                self.tasks.move(block, position)
+                # 行的位置都变了，不保留选择
+                self.clear_selection()
+
+                # 拖拽重排序时不改变窗口宽度；移动只修改了被拖动任务的排序键
+                self.schedule_save(block)
+                self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
+        elif self.drag_keep_selection and drag_end_index == self.drag_start_index:
+            # 没有拖动，和普通的单击一样只选中这一行
+            self.selected_indices = IntervalSet([drag_end_index])
+            self.update_listbox_selections()
         self.drag_start_index = None
+        self.drag_keep_selection = False
+        self.drag_rows = IntervalSet()
 
     def reorder_tasks(self, start_index, end_index):
         """Move the task from start_index to end_index in the tasks list."""
         task = self.tasks.pop(start_index)
         self.tasks.insert(end_index, task)
         # 重排序时不改变窗口宽度
-        self.populate_listbox_without_width_change()
-        self.save_tasks()
-        self.update_buttons_state()
+        self.schedule_save([task])
+        self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
 
     # File I/O and configuration
 
     @classmethod
-    def load_tasks(cls):
+    def open_storage(cls):
+        """根据 config.json 中的存储相关配置创建存储后端"""
         import json
-        tasks_file = cls.get_tasks_file()
-        tasks_file.parent.mkdir(parents=True, exist_ok=True)
-        try:
-            tasks = json.loads(tasks_file.read_text(encoding='utf-8'))
+        cls.get_tasks_file().parent.mkdir(parents=True, exist_ok=True)
+        config = {}
+        config_file = cls.get_config_file()
+        if config_file.is_file():
+            try:
+                config = json.loads(config_file.read_text(encoding='utf-8'))
+            except json.JSONDecodeError:
+                pass
+        if not isinstance(config, dict):
+            config = {}
+        return open_storage(cls.get_tasks_file(),
+                            backend=config.get('storage_backend', 'json'),
+                            journal=config.get('journal_mode', False),
+                            compact=config.get('compact_storage', False),
+                            compress=config.get('compress_storage', False))
+
+    @classmethod
+    def load_tasks(cls, storage=None):
+        if storage is None:
+            storage = cls.open_storage()
+        return cls.normalize_tasks(storage.load())
+
+    @staticmethod
+    def normalize_tasks(tasks):
+        """补全旧数据缺少的字段、转换旧的父子关系格式，并把字典转换为 Task"""
+        # 为旧数据创建task_id映射
+        task_id_map = {}  # 内存地址 -> task_id 的映射
+        
+        for task in tasks:
+            if task.get('separator', False):
+                task['title'] = task.get('title', False)
             
-            # 为旧数据创建task_id映射
-            task_id_map = {}  # 内存地址 -> task_id 的映射
+            # 确保每个任务都有唯一的task_id
+            if 'task_id' not in task or not task['task_id']:
+                import uuid
+                task['task_id'] = str(uuid.uuid4())
             
-            for task in tasks:
-                if task.get('separator', False):
-                    task['title'] = task.get('title', False)
-                
-                # 确保每个任务都有唯一的task_id
-                if 'task_id' not in task or not task['task_id']:
-                    import uuid
-                    task['task_id'] = str(uuid.uuid4())
-                
-                # 处理旧的parent_id字段（基于内存地址）
-                if 'parent_id' in task and task['parent_id'] is not None:
-                    # 这是旧格式的子任务，需要转换
-                    old_parent_id = task['parent_id']
-                    if old_parent_id in task_id_map:
-                        task['parent_task_id'] = task_id_map[old_parent_id]
-                    else:
-                        # 找不到父任务，清除子任务标记
-                        task['is_subtask'] = False
-                    # 删除旧字段
-                    del task['parent_id']
-                
-                # 为主任务建立映射（用于处理旧数据）
-                if not task.get('is_subtask', False):
-                    # 这可能是一个主任务，但我们无法从保存的数据中恢复内存地址映射
-                    # 所以旧的子任务关系可能会丢失，这是数据格式升级的代价
-                    pass
+            # 处理旧的parent_id字段（基于内存地址）
+            if 'parent_id' in task and task['parent_id'] is not None:
+                # 这是旧格式的子任务，需要转换
+                old_parent_id = task['parent_id']
+                if old_parent_id in task_id_map:
+                    task['parent_task_id'] = task_id_map[old_parent_id]
+                else:
+                    # 找不到父任务，清除子任务标记
+                    task['is_subtask'] = False
+                # 删除旧字段
+                del task['parent_id']
             
-            return tasks
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+            # 为主任务建立映射（用于处理旧数据）
+            if not task.get('is_subtask', False):
+                # 这可能是一个主任务，但我们无法从保存的数据中恢复内存地址映射
+                # 所以旧的子任务关系可能会丢失，这是数据格式升级的代价
+                pass
+        
+        return [Task.from_dict(task) for task in tasks]
+
+    def archive_completed_tasks(self):
+        """把折叠分组中完成超过 archive_after_days 天的任务（连同子任务）移入归档"""
+        self.restore_orphaned_archives()
+        if self.archive_after_days <= 0:
+            return
+        cutoff = (datetime.now() - timedelta(days=self.archive_after_days)).strftime('%Y-%m-%d %H:%M')
+
+        subtasks = {}
+        for task in self.tasks:
+            if task.is_subtask:
+                subtasks.setdefault(task.parent_task_id, []).append(task)
+
+        groups = {}  # 分组键 -> 要归档的任务
+        section_id = 0
+        section_key = TOP_SECTION_KEY
+        for task in self.tasks:
+            if task.kind != KIND_TASK:
+                section_id += 1
+                section_key = task.task_id or TOP_SECTION_KEY
+                continue
+            if (section_id in self.collapsed_sections and not task.is_subtask
+                    and (task.done or task.cancelled)
+                    and task.completed_time and task.completed_time < cutoff):
+                groups.setdefault(section_key, []).extend([task] + subtasks.get(task.task_id, []))
+
+        archived = set()
+        for section_key, tasks in groups.items():
+            try:
+                # 先写归档再保存任务数据：中途崩溃时下次启动再次归档，归档按 task_id 跳过已有的任务
+                self.archive.append(section_key, tasks)
+            except (OSError, ValueError, zlib.error) as e:
+                print(f"Error archiving tasks: {e}")
+                continue
+            archived.update(id(task) for task in tasks)
+        if archived:
+            self.tasks = [task for task in self.tasks if id(task) not in archived]
+            self.schedule_save()
+
+    def restore_orphaned_archives(self):
+        """分割线被删除后，其分组的归档无法再展开，恢复到任务列表末尾"""
+        section_keys = {TOP_SECTION_KEY}
+        section_keys.update(task.get('task_id') for task in self.tasks if task.get('separator', False))
+        for section_key in self.archive.keys():
+            if section_key not in section_keys:
+                self.restore_archived_section(None, section_key)
+
+    def restore_archived_section(self, section_id, section_key):
+        """把分组的归档任务恢复到工作集，插入到该分组结尾的分割线之前"""
+        try:
+            archived = self.normalize_tasks(self.archive.load(section_key))
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"Error loading archive: {e}")
+            return
+        live_ids = {task.get('task_id') for task in self.tasks}
+        archived = [task for task in archived if task.get('task_id') not in live_ids]
+
+        insert_index = len(self.tasks)
+        if section_id is not None:
+            separators_seen = 0
+            for index, task in enumerate(self.tasks):
+                if task.get('separator', False):
+                    if separators_seen == section_id:
+                        insert_index = index
+                        break
+                    separators_seen += 1
+        self.tasks[insert_index:insert_index] = archived
+        self.archive.forget(section_key)
+        self.schedule_save(archived)
+
+    def begin_streaming_load(self):
+        """流式加载大文件：先同步读入足够显示第一屏的任务，其余任务稍后分块读入"""
+        self.loading = True
+        self._load_chunks = self.storage.iter_load(self.STREAM_CHUNK_SIZE)
+        tasks = []
+        try:
+            for chunk in self._load_chunks:
+                tasks.extend(self.normalize_tasks(chunk))
+                if len(tasks) >= self.STREAM_CHUNK_SIZE:
+                    break
+        except ValueError as e:
+            print(f"Error loading tasks: {e}")
+            self._load_chunks = iter(())
+        return tasks
+
+    def continue_streaming_load(self):
+        """在事件循环中分块读入剩余任务，每次只占用很短的时间以保持界面响应"""
+        deadline = time.perf_counter() + self.STREAM_TIME_SLICE
+        try:
+            while time.perf_counter() < deadline:
+                chunk = next(self._load_chunks, None)
+                if chunk is None:
+                    self.finish_streaming_load()
+                    return
+                self.tasks.extend(self.normalize_tasks(chunk))
+        except ValueError as e:
+            # 文件损坏：保留已经读入的任务
+            print(f"Error loading tasks: {e}")
+            self.finish_streaming_load()
+            return
+        self.update_title(suffix=f" — 加载中 {len(self.tasks)} 项…")
+        self.root.after(1, self.continue_streaming_load)
+
+    def finish_streaming_load(self):
+        self._load_chunks = None
+        self.tasks = self.storage.finish_load(self.tasks)
+        self.set_loading_state(False)
+        self.archive_completed_tasks()
+        self.request_render(RENDER_LIST | RENDER_TITLE)
+        if self._save_after_load:
+            self._save_after_load = False
+            self.schedule_save()
+
+    def set_loading_state(self, loading):
+        """流式加载期间暂停列表和输入框上的编辑操作，只保留滚动和全局快捷键"""
+        self.loading = loading
+        if loading:
+            self._listbox_bindtags = self.listbox.bindtags()
+            self.listbox.bindtags(tuple(tag for tag in self._listbox_bindtags if tag != str(self.listbox)))
+            self.entry.configure(state='disabled')
+        else:
+            self.listbox.bindtags(self._listbox_bindtags)
+            self.entry.configure(state='normal')
+        self.update_buttons_state()
 
 
+    def schedule_save(self, changed_tasks=None):
+        """标记任务数据已修改，由后台线程在安静期结束后合并写盘
+
+        changed_tasks 为修改过的任务（包括新插入的和移动后排序键改变的任务），保存时只需
+        重新序列化这些任务；为 None 表示增删了任务或修改的任务不确定。通过字典接口修改的
+        任务总会重新序列化（Task.version 改变）。TaskStore 重新分配过排序键的任务
+        （例如重新平衡时的相邻任务）总是一起保存。
+        """
+        rekeyed = self.tasks.take_rekeyed()
+        with self._dirty_lock:
+            self.tasks_version += 1
+            if changed_tasks is not None:
+                self._dirty_task_ids.update(task.get('task_id') for task in changed_tasks)
+            self._dirty_task_ids.update(task.get('task_id') for task in rekeyed)
+        self.storage.stats.requested += 1
+        if self.loading:
+            # 数据还没有完全加载，此时写盘会丢掉尚未读入的任务
+            self._save_after_load = True
+            return
+        if self.closing:
+            # 后台线程已经停止，on_close 最后会同步写盘
+            return
+        if self._snapshot_job is None:
+            # 等当前的事件处理完再生成快照：此时任务列表不会处于修改到一半的状态（例如移动中途）
+            self._snapshot_job = self.root.after_idle(self.snapshot_tasks)
+
+    def snapshot_tasks(self):
+        """在界面线程中生成任务快照，交给后台线程写盘"""
+        if self._snapshot_job is not None:
+            self.root.after_cancel(self._snapshot_job)
+            self._snapshot_job = None
+        snapshot = self.take_tasks_snapshot()
+        self.persistence.mark_dirty('tasks', lambda: self.write_tasks(snapshot))
+
+    def take_tasks_snapshot(self, force=False):
+        """(版本号, 序列化后的任务字典列表, 需要重新比较的 task_id 集合或 None)；只能在界面线程中调用
+
+        未修改的任务复用上一次快照中的字典；force 为 True 时重新序列化并完整比较所有任务。
+        """
+        with self._dirty_lock:
+            version = self.tasks_version
+            dirty_ids, self._dirty_task_ids = self._dirty_task_ids, set()
+            full = force or self._structure_dirty
+            self._structure_dirty = False
+        # 过滤掉 completed_header，只保存真实的任务
+        tasks = [task for task in self.tasks if not task.get('completed_header', False)]
+        serialized = self._snapshot_cache.serialize(tasks, None if force else dirty_ids)
+        return version, serialized, None if full else self._snapshot_cache.serialized_ids
+
     def save_tasks(self):
-        import json
+        """立即同步保存任务数据"""
         try:
-            # 过滤掉 completed_header，只保存真实的任务
-            tasks_to_save = [{'name': task['name'], 
-                            'done': task.get('done', False), 
-                            'cancelled': task.get('cancelled', False), 
-                            'urgent': task.get('urgent', False), 
-                            'separator': task.get('separator', False), 
-                            'title': task.get('title', False),
-                            'completed_time': task.get('completed_time', ''),
-                            'deadline': task.get('deadline', ''),
-                            'was_urgent': task.get('was_urgent', False),
-                            'subtasks': task.get('subtasks', []),  # 添加子任务支持
-                            'is_subtask': task.get('is_subtask', False),  # 标记是否为子任务
-                            'parent_task_id': task.get('parent_task_id', None),  # 父任务的task_id
-                            'task_id': task.get('task_id', None),  # 任务的唯一ID
-                            'custom_bg_color': task.get('custom_bg_color', '')}  # 自定义背景色
-                            for task in self.tasks if not task.get('completed_header', False)]
-
-            self.get_tasks_file().write_text(json.dumps(tasks_to_save, indent=4), encoding='utf-8')
+            self.write_tasks(self.take_tasks_snapshot(force=True), force=True)
         except Exception as e:
             print(f"Error saving tasks: {e}")
 
+    def write_tasks(self, snapshot, force=False):
+        """把 take_tasks_snapshot() 生成的快照写入存储后端，失败时抛出异常；可能在后台线程中调用
+
+        快照不比已经写盘的版本新时直接跳过；force 为 True 时总是写入。
+        """
+        version, tasks, dirty_ids = snapshot
+        with self._dirty_lock:
+            if version <= self._saved_tasks_version and not force:
+                self.storage.stats.skipped += 1
+                return
+        try:
+            external = self.storage.save(tasks, dirty_ids)
+        except Exception:
+            with self._dirty_lock:
+                # 本次的修改没有写入，下次保存时完整比较
+                self._structure_dirty = True
+            raise
+        with self._dirty_lock:
+            self._saved_tasks_version = max(self._saved_tasks_version, version)
+        if external:
+            # 写入时合并了其他进程的修改，转回界面线程应用到内存中的任务上
+            self._worker_results.put((self.apply_external_changes, (external, version)))
+        # 已恢复到工作集的归档分组，在任务数据写盘之后才能删除
+        self.archive.purge()
+
+    def watch_external_changes(self):
+        """定期检查任务数据是否被其他实例或同步脚本修改，有修改时增量重新加载"""
+        try:
+            # 有尚未写盘的修改时不重新加载，保存时会与外部修改按任务合并
+            if (not self.loading and self._snapshot_job is None and not self.persistence.has_pending()
+                    and self.storage.has_external_changes()):
+                self.apply_external_changes(self.storage.read_external_changes())
+        except Exception as e:
+            print(f"Error reloading tasks: {e}")
+        self.root.after(self.WATCH_INTERVAL_MS, self.watch_external_changes)
+
+    def apply_external_changes(self, records, saved_version=None):
+        """把其他进程对任务的修改应用到内存中，只重绘受影响的行"""
+        if not records:
+            return
+        self.tasks = apply_records(self.tasks, records, factory=Task.from_dict)
+        rekeyed = self.tasks.take_rekeyed()
+        if saved_version is not None and self.tasks_version != saved_version:
+            # 合并写盘之后界面上又有新的修改，磁盘上的数据缺少这些修改，需要再保存一次
+            self.schedule_save()
+        elif rekeyed:
+            # 外部数据中缺少、重复或与列表顺序不一致的排序键已经重新分配，立即写回磁盘
+            self.schedule_save(rekeyed)
+
+        layout_changed = any(record['op'] != 'update' or self.LAYOUT_FIELDS.intersection(record['set'])
+                             for record in records)
+        if layout_changed:
+            self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
+        else:
+            self.refresh_task_rows({record['id'] for record in records})
+            self.request_render(RENDER_TITLE | RENDER_BUTTONS)
+
+    def on_persistence_error(self, key, error):
+        """后台写盘失败时由工作线程调用，转回界面线程提示"""
+        self._worker_results.put((self.show_persistence_error, (key, error)))
+
+    def poll_worker_results(self):
+        self.drain_worker_results()
+        self.root.after(self.WORKER_RESULTS_INTERVAL_MS, self.poll_worker_results)
+
+    def drain_worker_results(self):
+        """在界面线程中处理后台线程交回的所有结果"""
+        while True:
+            try:
+                callback, args = self._worker_results.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error handling persistence result: {e}")
+
+    def get_data_fingerprint(self):
+        """任务数据文件、归档和配置的指纹，任何一个发生变化首屏缓存即失效"""
+        try:
+            config_text = self.get_config_file().read_text(encoding='utf-8')
+        except OSError:
+            config_text = ''
+        return data_fingerprint(self.storage.data_paths() + self.archive.paths(), config_text)
+
+    def read_render_cache(self):
+        return load_render_cache(self.get_render_cache_file(), self.get_data_fingerprint())
+
+    def write_render_cache(self):
+        """保存第一屏的显示文本和颜色，供下次启动时立即绘制"""
+        if self.loading or self.search_query:
+            # 还没有加载完（或者列表经过了搜索过滤），列表和标题都不是最终状态
+            return
+        try:
+            visible_rows = self.listbox.nearest(self.listbox.winfo_height()) + 1
+            row_count = min(self.listbox.size(), visible_rows, self.RENDER_CACHE_ROWS)
+            if self.list_view == 'canvas':
+                rows = [self.listbox.row(index) for index in range(row_count)]
+            else:
+                rows = [row[1:] for row in self.rendered_rows[:row_count]]
+            save_render_cache(self.get_render_cache_file(), self.get_data_fingerprint(),
+                              self.root.title(), self.root.geometry(), rows)
+        except Exception as e:
+            print(f"Error saving render cache: {e}")
+
+    def paint_render_cache(self, render_cache):
+        """绘制上次退出时保存的第一屏，任务数据加载完成后会被真实内容替换"""
+        rows = render_cache['rows']
+        if rows:
+            self.listbox.insert(tk.END, *[row[0] for row in rows])
+        for index, (_, bg, fg) in enumerate(rows):
+            self.listbox.itemconfig(index, {'bg': bg, 'fg': fg})
+        # 缓存的行不对应任何任务，加载完成后全部被替换
+        self.rendered_rows = [(object(), text, bg, fg) for text, bg, fg in rows]
+        self.showing_render_cache = True
+        self.root.title(render_cache.get('title') or "To-Do")
+        if not self.initial_geometry:
+            self.initial_geometry = render_cache.get('geometry', '')
+
+    def show_persistence_error(self, key, error):
+        print(f"Error saving {key}: {error}")
+        self.root.title(f"{self.root.title()} ⚠️ 保存失败")
+
 
 
     def load_config(self):
@@ -1430,10 +2244,41 @@ class TodoApp:
             self.collapsed_sections = set(collapsed_list)
             
             self.initial_geometry = config.get('geometry', '')
+            # 日志模式：每次修改只追加变更记录，而不是重写整个 tasks.json
+            self.journal_mode = config.get('journal_mode', False)
+            # 存储后端：json（默认）或 sqlite，下次启动时生效
+            self.storage_backend = config.get('storage_backend', 'json')
+            # json 后端使用紧凑格式（短字段名、省略默认值）及 zlib 压缩
+            self.compact_storage = config.get('compact_storage', False)
+            self.compress_storage = config.get('compress_storage', False)
+            # 连续修改时，最后一次修改之后等待多久再写盘（毫秒）
+            self.save_delay_ms = config.get('save_delay_ms', 300)
+            # 折叠分组中完成超过该天数的任务移入归档，0 表示不归档
+            self.archive_after_days = config.get('archive_after_days', 30)
+            # 调试模式：退出时输出保存统计等诊断信息
+            self.debug_mode = config.get('debug_mode', False)
+            # 任务列表控件：listbox（默认）或 canvas（只绘制可见行），下次启动时生效
+            self.list_view = config.get('list_view', 'listbox')
+            # 保存的视图（名称 -> 查询）和当前使用的视图
+            self.views = dict(config.get('views', self.DEFAULT_VIEWS))
+            self.active_view = config.get('active_view')
         else:
             self.initial_geometry = ''
+            self.journal_mode = False
+            self.storage_backend = 'json'
+            self.compact_storage = False
+            self.compress_storage = False
+            self.save_delay_ms = 300
+            self.archive_after_days = 30
+            self.debug_mode = False
+            self.list_view = 'listbox'
+            self.views = dict(self.DEFAULT_VIEWS)
+            self.active_view = None
             # 默认全部展开（空集合）
             self.collapsed_sections = set()
+        if self.active_view not in self.views:
+            self.active_view = None
+        self.persistence.quiet_period = self.save_delay_ms / 1000
     
     def get_all_section_ids(self):
         """获取所有分组的ID"""
@@ -1467,9 +2312,21 @@ class TodoApp:
                 'geometry': self.root.geometry(),
                 'dark_mode': self.is_dark_mode,
                 'font_size': self.font_size,
-                'collapsed_sections': list(self.collapsed_sections)
+                'collapsed_sections': list(self.collapsed_sections),
+                'journal_mode': self.journal_mode,
+                'storage_backend': self.storage_backend,
+                'compact_storage': self.compact_storage,
+                'compress_storage': self.compress_storage,
+                'save_delay_ms': self.save_delay_ms,
+                'archive_after_days': self.archive_after_days,
+                'debug_mode': self.debug_mode,
+                'list_view': self.list_view,
+                'views': self.views,
+                'active_view': self.active_view
             }
-            config_file.write_text(json.dumps(config, indent=4), encoding='utf-8')
+            config_text = json.dumps(config, indent=4)
+            # 配置内容在界面线程中确定，写盘交给后台线程
+            self.persistence.mark_dirty('config', lambda: write_text_atomic(config_file, config_text))
         except Exception as e:
             print(f"Error saving config: {e}")
 
@@ -1487,7 +2344,18 @@ class TodoApp:
     def get_config_file(cls):
         return cls.get_base_dir() / 'todo_app' / 'config.json'
 
+    @classmethod
+    def get_render_cache_file(cls):
+        return cls.get_base_dir() / 'todo_app' / 'render_cache.json'
+
     def get_theme_colors(self):
+        """当前主题的颜色表；每个主题只构建一次，返回共享的字典，调用方不能修改"""
+        colors = self._theme_colors.get(self.is_dark_mode)
+        if colors is None:
+            colors = self._theme_colors[self.is_dark_mode] = self.build_theme_colors()
+        return colors
+
+    def build_theme_colors(self):
         if sys.platform == "darwin":  # macOS特定颜色
             if self.is_dark_mode:
                 return {
@@ -1552,19 +2420,8 @@ class TodoApp:
 
     @staticmethod
     def get_task_icons():
-        """获取适合当前系统的任务图标"""
-        if sys.platform == "darwin":  # macOS
-            return {
-                'unchecked': '☐',  # 空心方框，在macOS上显示为白色边框
-                'checked': '☑',    # 带勾的方框
-                'cancelled': '☒'   # 带X的方框
-            }
-        else:  # Windows和其他系统
-            return {
-                'unchecked': '⬜',  # 白色大方块
-                'checked': '✔',    # 勾号
-                'cancelled': '✖'   # X号
-            }
+        """获取适合当前系统的任务图标（返回共享的字典，调用方不能修改）"""
+        return TASK_ICONS
 
     def get_system_font(self):
         """获取适合当前系统的字体，使用用户设置的字体大小"""
@@ -1576,7 +2433,7 @@ class TodoApp:
             return ('DejaVu Sans', self.font_size)
 
     def count_urgent_tasks(self):
-        return sum(1 for task in self.tasks if task.get('urgent', False))
+        return self.tasks.urgent_count
 
     # Window management
 
@@ -1665,6 +2522,10 @@ class TodoApp:
         
         # 更新按钮字体
         self.update_buttons_style(self.get_theme_colors()['button_bg'], self.get_theme_colors()['button_fg'])
+
+        # 旧字号的测量结果全部失效，按新字号重新统计行宽
+        self.text_widths.clear()
+        self.reset_row_widths()
         
         # 重新计算窗口大小，但允许宽度变化以适应新的字体大小
         self.populate_listbox()  # 这会调用 adjust_window_size()
@@ -1725,13 +2586,15 @@ class TodoApp:
     def show_context_menu(self, event):
         try:
             index = self.listbox.nearest(event.y)
-            current_selection = self.listbox.curselection()
 
-            if not current_selection or len(current_selection) == 1:
+            if len(self.selected_indices) <= 1:
                 self.listbox.selection_clear(0, tk.END)
                 self.listbox.selection_set(index)
-            
-            selected_indices = self.listbox.curselection()
+                self.selected_indices = IntervalSet([index])
+
+            selected_indices = self.selected_indices
+            if len(selected_indices) == 1:
+                selected_indices = [selected_indices.first()]
             
             # 不对折叠标题显示右键菜单
             if (len(selected_indices) == 1 and index < len(self.display_tasks) and 
@@ -1748,15 +2611,9 @@ class TodoApp:
 
                 self.separator_context_menu.tk_popup(event.x_root, event.y_root)
             else:
-                only_separators_selected = all(idx < len(self.display_tasks) and 
-                                               self.display_tasks[idx].get('separator', False) 
-                                               for idx in selected_indices)
-                
-                # 检查是否选中了子任务
-                has_subtask_selected = any(idx < len(self.display_tasks) and 
-                                         self.display_tasks[idx].get('is_subtask', False) 
-                                         for idx in selected_indices)
-                
+                selected = self.selected_indices
+                only_separators_selected = self.get_row_kinds().count(ROW_STRUCTURE, selected) == len(selected)
+
                 # 只有选中单个主任务时才显示"添加子任务"选项
                 single_main_task_selected = (len(selected_indices) == 1 and 
                                            index < len(self.display_tasks) and 
@@ -1773,23 +2630,23 @@ class TodoApp:
     # Shortcut methods
 
     def remove_task_shortcut(self, event=None):
-        if self.listbox.curselection():
+        if self.selected_indices:
             self.remove_selected_tasks()
 
     def mark_as_done_shortcut(self, event=None):
-        if self.listbox.curselection():
+        if self.selected_indices:
             self.mark_selected_tasks_done()
 
     def edit_task_shortcut(self, event=None):
-        if self.listbox.curselection():
+        if self.selected_indices:
             self.edit_task()
     
     def set_deadline_shortcut(self, event=None):
-        if self.listbox.curselection():
+        if self.selected_indices:
             self.set_deadline()
     
     def set_task_background_color_shortcut(self, event=None):
-        if self.listbox.curselection():
+        if self.selected_indices:
             self.set_task_background_color()
     
     def set_task_background_color(self):
@@ -1948,8 +2805,8 @@ class TodoApp:
             else:
                 current_task.pop('custom_bg_color', None)
             
-            self.populate_listbox_without_width_change()
-            self.save_tasks()
+            self.schedule_save([current_task])
+            self.request_render(RENDER_LIST | RENDER_TITLE)
             color_window.destroy()
         
         def on_cancel():
@@ -1975,59 +2832,42 @@ class TodoApp:
         self.center_window_over_window(color_window)
     
     def auto_complete_parent_tasks(self):
-        """检查并自动完成所有子任务都已完成的主任务"""
-        for task in self.tasks:
+        """检查并自动完成所有子任务都已完成的主任务，返回被修改的主任务"""
+        completed = []
+        # 子任务的完成数由任务列表增量维护，只需要检查所有子任务都已完成的父任务
+        for parent_task_id in self.tasks.parents_with_all_subtasks_done():
+            task = self.tasks.get(parent_task_id)
             # 只检查主任务
-            if task.get('is_subtask', False) or task.get('separator', False):
+            if task is None or task.is_subtask or task.kind != KIND_TASK:
                 continue
             
             # 如果主任务已经完成，跳过
-            if task.get('done', False):
-                continue
-            
-            # 查找该主任务的所有子任务
-            parent_task_id = task.get('task_id')
-            if not parent_task_id:
+            if task.done:
                 continue
-            
-            subtasks = [t for t in self.tasks 
-                       if t.get('is_subtask', False) and 
-                       t.get('parent_task_id') == parent_task_id]
-            
-            # 如果没有子任务，跳过
-            if not subtasks:
-                continue
-            
-            # 检查是否所有子任务都完成了
-            all_subtasks_done = all(st.get('done', False) for st in subtasks)
-            
-            if all_subtasks_done:
-                # 自动完成主任务
-                task['done'] = True
-                task['completed_time'] = datetime.now().strftime('%Y-%m-%d %H:%M')
-                # 如果有紧急状态，保存它
-                if task.get('urgent', False):
-                    task['was_urgent'] = True
-                    task['urgent'] = False
+
+            # 自动完成主任务
+            task['done'] = True
+            task['completed_time'] = datetime.now().strftime('%Y-%m-%d %H:%M')
+            # 如果有紧急状态，保存它
+            if task.get('urgent', False):
+                task['was_urgent'] = True
+                task['urgent'] = False
+            completed.append(task)
+        return completed
     
     def auto_uncomplete_parent_task(self, subtask):
-        """当子任务被标记为未完成时，自动将其主任务也标记为未完成"""
+        """当子任务被标记为未完成时，自动将其主任务也标记为未完成，返回被修改的主任务"""
         if not subtask.get('is_subtask', False):
-            return
+            return []
         
         parent_task_id = subtask.get('parent_task_id')
         if not parent_task_id:
-            return
+            return []
         
         # 查找父任务
-        parent_task = None
-        for task in self.tasks:
-            if task.get('task_id') == parent_task_id and not task.get('is_subtask', False):
-                parent_task = task
-                break
-        
-        if not parent_task:
-            return
+        parent_task = self.tasks.get(parent_task_id)
+        if parent_task is None or parent_task.is_subtask:
+            return []
         
         # 如果父任务已完成，将其标记为未完成
         if parent_task.get('done', False):
@@ -2037,6 +2877,8 @@ class TodoApp:
             if parent_task.get('was_urgent', False):
                 parent_task['urgent'] = True
                 parent_task.pop('was_urgent', None)
+            return [parent_task]
+        return []
     
     def set_deadline(self):
         """设置任务的截止日期"""
@@ -2114,16 +2956,16 @@ class TodoApp:
                 selected_date = cal.get_date()
                 current_task['deadline'] = selected_date
                 # 设置截止日期时不改变窗口宽度
-                self.populate_listbox_without_width_change()
-                self.save_tasks()
+                self.schedule_save([current_task])
+                self.request_render(RENDER_LIST | RENDER_TITLE)
                 deadline_window.destroy()
             
             def on_clear():
                 # 清除deadline
                 current_task.pop('deadline', None)
                 # 清除截止日期时不改变窗口宽度
-                self.populate_listbox_without_width_change()
-                self.save_tasks()
+                self.schedule_save([current_task])
+                self.request_render(RENDER_LIST | RENDER_TITLE)
                 deadline_window.destroy()
             
             def on_cancel():
@@ -2191,8 +3033,8 @@ class TodoApp:
                     current_task.pop('deadline', None)
                 
                 # 设置截止日期时不改变窗口宽度
-                self.populate_listbox_without_width_change()
-                self.save_tasks()
+                self.schedule_save([current_task])
+                self.request_render(RENDER_LIST | RENDER_TITLE)
                 deadline_window.destroy()
             
             def on_cancel():
@@ -2224,7 +3066,7 @@ class TodoApp:
     
     def add_subtask_shortcut(self, event=None):
         """添加子任务的快捷方法"""
-        if self.listbox.curselection():
+        if self.selected_indices:
             self.add_subtask()
     
     def add_subtask(self):
@@ -2276,14 +3118,12 @@ class TodoApp:
                 # 确保父任务有task_id
                 if 'task_id' not in current_task or not current_task['task_id']:
                     current_task['task_id'] = str(uuid.uuid4())
+                    self.tasks.reindex(current_task)
                 
                 # 创建子任务
-                subtask = {
-                    'name': subtask_name,
-                    'is_subtask': True,
-                    'parent_task_id': current_task['task_id'],  # 使用父任务的task_id
-                    'task_id': task_id
-                }
+                subtask = Task(subtask_name, is_subtask=True,
+                               parent_task_id=current_task['task_id'],  # 使用父任务的task_id
+                               task_id=task_id)
                 
                 # 找到父任务在真实列表中的位置
                 parent_index = self.tasks.index(current_task)
@@ -2306,10 +3146,8 @@ class TodoApp:
                 self.tasks.insert(insert_index, subtask)
                 
                 # 添加子任务时不改变窗口宽度
-                self.populate_listbox_without_width_change()
-                self.save_tasks()
-                self.update_buttons_state()
-                self.update_title()
+                self.schedule_save([subtask])
+                self.request_render(RENDER_LIST | RENDER_TITLE | RENDER_BUTTONS)
             
             subtask_window.destroy()
         
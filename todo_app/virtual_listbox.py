@@ -0,0 +1,449 @@
+"""基于 Canvas 的虚拟化列表：只绘制可见的行，接口与 tk.Listbox 中应用用到的部分一致"""
+import tkinter as tk
+import tkinter.font as tkfont
+
+try:
+    from .selection import IntervalSet
+except ImportError:  # 作为脚本直接运行（PyInstaller 入口）时没有包上下文
+    from selection import IntervalSet
+
+
+def _is_end(index):
+    return isinstance(index, str) and index == tk.END
+
+
+class VirtualListbox(tk.Canvas):
+    """只为可见区域（加上少量预留行）创建画布元素的列表
+
+    tk.Listbox 为每一行保存一个 Tcl 字符串，十万行时内存和重绘开销都随行数线性增长。
+    这里的行数据保存在 Python 列表中，也可以通过 set_rows() 按需从任务列表中取得；
+    画布上只有可见行对应的矩形和文本元素，滚动时被移出可见区域的元素会被复用。
+
+    支持应用用到的 Listbox 接口：insert/delete/itemconfig/itemcget/get/size、
+    选择（curselection/selection_set/selection_clear/selection_includes）、
+    nearest、bbox、yview 和 see。鼠标点击、Ctrl/Shift 多选、拖选、滚轮和上下方向键的
+    默认行为由 VirtualListbox 绑定标签实现，和 Listbox 的类绑定一样排在实例绑定之后。
+    """
+
+    OVERSCAN = 10  # 可见区域上下额外绘制的行数，快速滚动时不会出现空白
+    TEXT_PADDING = 2
+    CLASS_TAG = 'VirtualListbox'
+
+    # 这些是 Listbox 的选项，Canvas 不认识，由本类自己处理
+    _LIST_OPTIONS = ('fg', 'foreground', 'font', 'selectbackground', 'selectforeground',
+                     'selectmode', 'activestyle')
+
+    def __init__(self, master=None, **options):
+        list_options, canvas_options = self._split_options(options)
+        canvas_options.setdefault('highlightthickness', 0)
+        super().__init__(master, **canvas_options)
+        self._fg = 'black'
+        self._select_bg = '#c3c3c3'
+        self._select_fg = 'black'
+        self._font = tkfont.nametofont('TkDefaultFont')
+        self._row_height = 1
+        self._rows = []  # 每一行是 (文本, 背景色, 前景色)，或者尚未取得的行在数据源中的下标
+        self._get_row = None  # set_rows() 提供的数据源
+        self._get_key = None
+        self._selected = IntervalSet()  # 选中的行按区间保存，全选和范围选择不逐行处理
+        self._anchor = 0
+        self._slots = {}  # 行下标 -> (矩形元素, 文本元素)
+        self._free_slots = []
+        self._visible = (0, 0)  # 上一次绘制时的行范围（包含预留行）
+        self._width = 0
+        list_options.setdefault('font', self._font)
+        self._apply_list_options(list_options)
+
+        self._bind_class_defaults()
+        tags = list(self.bindtags())
+        tags.insert(tags.index(str(self)) + 1, self.CLASS_TAG)
+        self.bindtags(tuple(tags))
+
+    # 选项
+
+    def _split_options(self, options):
+        list_options = {key: value for key, value in options.items() if key in self._LIST_OPTIONS}
+        canvas_options = {key: value for key, value in options.items() if key not in self._LIST_OPTIONS}
+        return list_options, canvas_options
+
+    def _apply_list_options(self, options):
+        redraw = False
+        if 'fg' in options or 'foreground' in options:
+            self._fg = options.get('fg', options.get('foreground'))
+            redraw = True
+        if 'selectbackground' in options:
+            self._select_bg = options['selectbackground']
+            redraw = True
+        if 'selectforeground' in options:
+            self._select_fg = options['selectforeground']
+            redraw = True
+        if 'font' in options:
+            font = options['font']
+            self._font = font if isinstance(font, tkfont.Font) else tkfont.Font(root=self, font=font)
+            self._row_height = self._font.metrics('linespace') + 2
+            self.configure(yscrollincrement=self._row_height)
+            for rect, text in self._free_slots + list(self._slots.values()):
+                self.itemconfigure(text, font=self._font)
+            self._update_scrollregion()
+            redraw = True
+        if redraw:
+            self._reset_slots()
+
+    def configure(self, cnf=None, **options):
+        if cnf:
+            options = dict(cnf, **options)
+        list_options, canvas_options = self._split_options(options)
+        result = super().configure(**canvas_options) if canvas_options or not list_options else None
+        if list_options:
+            self._apply_list_options(list_options)
+        return result
+
+    config = configure
+
+    # 行数据
+
+    def size(self):
+        return len(self._rows)
+
+    def _index(self, index):
+        if _is_end(index):
+            return len(self._rows)
+        return int(index)
+
+    def row(self, index):
+        """第 index 行的 (文本, 背景色, 前景色)，需要时从数据源取得"""
+        row = self._rows[index]
+        if type(row) is int:
+            row = self._rows[index] = tuple(self._get_row(row))
+        return row
+
+    def get(self, first, last=None):
+        if last is None:
+            return self.row(self._index(first))[0]
+        last = len(self._rows) - 1 if _is_end(last) else int(last)
+        return tuple(self.row(index)[0] for index in range(self._index(first), last + 1))
+
+    def insert(self, index, *texts):
+        index = min(self._index(index), len(self._rows))
+        self._rows[index:index] = [(text, '', '') for text in texts]
+        self._selected.insert_rows(index, len(texts))
+        self._structure_changed()
+
+    def delete(self, first, last=None):
+        first = self._index(first)
+        last = first if last is None else (len(self._rows) - 1 if _is_end(last) else int(last))
+        if first > last or first >= len(self._rows):
+            return
+        del self._rows[first:last + 1]
+        self._selected.delete_rows(first, last)
+        self._structure_changed()
+
+    def itemconfig(self, index, cnf=None, **options):
+        if cnf:
+            options = dict(cnf, **options)
+        index = self._index(index)
+        text, bg, fg = self.row(index)
+        bg = options.get('bg', options.get('background', bg))
+        fg = options.get('fg', options.get('foreground', fg))
+        self._rows[index] = (text, bg, fg)
+        self._draw_row(index)
+
+    def itemcget(self, index, option):
+        text, bg, fg = self.row(self._index(index))
+        return bg if option in ('bg', 'background') else fg
+
+    def set_rows(self, count, get_row, get_key=None):
+        """用数据源替换所有行：get_row(index) 返回 (文本, 背景色, 前景色)，只有在需要绘制时才调用
+
+        提供 get_key(index) 时，选中的行和最上面可见的行按 key 保持不变。
+        """
+        selected_keys = top_key = None
+        if get_key is not None and self._get_key is not None:
+            selected_keys = {self._get_key(index) for index in self._selected}
+            top = self.nearest(0)
+            if 0 <= top < len(self._rows):
+                top_key = self._get_key(top)
+
+        self._rows = list(range(count))
+        self._get_row = get_row
+        self._get_key = get_key
+        self._selected = IntervalSet()
+
+        new_top = None
+        if selected_keys or top_key is not None:
+            selected = []
+            for index in range(count):
+                key = get_key(index)
+                if key in selected_keys:
+                    selected.append(index)
+                if key == top_key:
+                    new_top = index
+            self._selected = IntervalSet(selected)
+        self._structure_changed()
+        if new_top is not None:
+            self.yview(new_top)
+
+    def refresh_rows(self, indices):
+        """数据源中这些行的内容变化了，重新取得并重绘"""
+        for index in indices:
+            if 0 <= index < len(self._rows) and self._get_row is not None:
+                self._rows[index] = tuple(self._get_row(index))
+                self._draw_row(index)
+
+    # 选择
+
+    def curselection(self):
+        return tuple(self._selected)
+
+    def selection_intervals(self):
+        """选中的行（IntervalSet 的副本），不逐行展开"""
+        return self._selected.copy()
+
+    def _range(self, first, last):
+        first = self._index(first)
+        if last is None:
+            return range(first, first + 1)
+        last = len(self._rows) - 1 if _is_end(last) else int(last)
+        return range(first, last + 1)
+
+    def selection_set(self, first, last=None):
+        indices = self._range(first, last)
+        first, last = max(indices.start, 0), min(indices.stop, len(self._rows)) - 1
+        self._selected.add_range(first, last)
+        self._redraw_range(first, last)
+
+    select_set = selection_set
+
+    def selection_clear(self, first, last=None):
+        indices = self._range(first, last)
+        first, last = max(indices.start, 0), min(indices.stop, len(self._rows)) - 1
+        self._selected.discard_range(first, last)
+        self._redraw_range(first, last)
+
+    select_clear = selection_clear
+
+    def selection_includes(self, index):
+        return self._index(index) in self._selected
+
+    def _redraw_range(self, first, last):
+        """选择变化后只重绘范围内可见的行"""
+        visible_first, visible_last = self._visible
+        for index in range(max(first, visible_first), min(last + 1, visible_last)):
+            self._draw_row(index)
+
+    # 坐标与滚动
+
+    def nearest(self, y):
+        if not self._rows:
+            return 0
+        index = int(self.canvasy(y) // self._row_height)
+        return max(0, min(index, len(self._rows) - 1))
+
+    def bbox(self, index):
+        """第 index 行在控件中的 (x, y, 宽, 高)；不在可见区域内时返回 None（与 Listbox.bbox 相同）"""
+        index = self._index(index)
+        if not 0 <= index < len(self._rows):
+            return None
+        y = index * self._row_height - int(self.canvasy(0))
+        if y + self._row_height <= 0 or y >= self.winfo_height():
+            return None
+        return (0, y, max(self._width, 1), self._row_height)
+
+    def yview(self, *args):
+        if len(args) == 1 and not isinstance(args[0], str):
+            # Listbox.yview(index)：让第 index 行显示在最上面
+            total = len(self._rows) * self._row_height
+            fraction = int(args[0]) * self._row_height / total if total else 0
+            super().yview_moveto(fraction)
+            self._redraw()
+            return None
+        result = super().yview(*args)
+        if args:
+            self._redraw()
+        return result
+
+    def yview_moveto(self, fraction):
+        super().yview_moveto(fraction)
+        self._redraw()
+
+    def yview_scroll(self, number, what):
+        super().yview_scroll(number, what)
+        self._redraw()
+
+    def see(self, index):
+        index = self._index(index)
+        top = int(self.canvasy(0))
+        height = self.winfo_height()
+        y = index * self._row_height
+        if y < top:
+            self.yview(index)
+        elif y + self._row_height > top + height:
+            self.yview(max(0, index - max(1, height // self._row_height) + 1))
+
+    # 绘制
+
+    def _update_scrollregion(self):
+        height = max(len(self._rows) * self._row_height, 1)
+        super().configure(scrollregion=(0, 0, max(self._width, 1), height))
+
+    def _on_configure(self, event):
+        if event.width != self._width:
+            self._width = event.width
+            self._update_scrollregion()
+            self._reset_slots()
+        else:
+            self._redraw()
+
+    def _structure_changed(self):
+        # 行的位置都可能变了：收回所有元素，按新的位置重新分配
+        self._update_scrollregion()
+        self._reset_slots()
+
+    def _reset_slots(self):
+        for slot in self._slots.values():
+            self._hide(slot)
+            self._free_slots.append(slot)
+        self._slots = {}
+        self._redraw()
+
+    def _hide(self, slot):
+        rect, text = slot
+        self.itemconfigure(rect, state='hidden')
+        self.itemconfigure(text, state='hidden')
+
+    def _redraw(self):
+        top = self.canvasy(0)
+        height = max(self.winfo_height(), self._row_height)
+        first = max(0, int(top // self._row_height) - self.OVERSCAN)
+        last = min(len(self._rows), int((top + height) // self._row_height) + 1 + self.OVERSCAN)
+        self._visible = (first, last)
+        # 移出可见区域的行，元素放回复用池
+        for index in [index for index in self._slots if index < first or index >= last]:
+            slot = self._slots.pop(index)
+            self._hide(slot)
+            self._free_slots.append(slot)
+        for index in range(first, last):
+            if index not in self._slots:
+                self._draw_row(index)
+
+    def _draw_row(self, index):
+        """绘制一行；不在可见区域内的行不创建任何元素"""
+        slot = self._slots.get(index)
+        if slot is None:
+            first, last = self._visible
+            if not first <= index < last:
+                return
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = (self.create_rectangle(0, 0, 0, 0, width=0, state='hidden'),
+                        self.create_text(0, 0, anchor='w', font=self._font, state='hidden'))
+            self._slots[index] = slot
+        rect, text_item = slot
+        text, bg, fg = self.row(index)
+        if index in self._selected:
+            bg, fg = self._select_bg, self._select_fg
+        y = index * self._row_height
+        self.coords(rect, 0, y, max(self._width, 1), y + self._row_height)
+        self.itemconfigure(rect, fill=bg, state='normal' if bg else 'hidden')
+        self.coords(text_item, self.TEXT_PADDING, y + self._row_height / 2)
+        self.itemconfigure(text_item, text=text, fill=fg or self._fg, state='normal')
+
+    # 默认的鼠标和键盘行为（相当于 Listbox 的类绑定）
+
+    def _bind_class_defaults(self):
+        # 类绑定属于 Tcl 解释器，每个 Tk 实例都要绑定一次；重复绑定只是覆盖
+        cls = type(self)
+        bindings = {
+            '<Configure>': lambda event: cls._widget(event) and event.widget._on_configure(event),
+            '<Button-1>': cls._on_click,
+            '<Control-Button-1>': cls._on_control_click,
+            '<Shift-Button-1>': cls._on_shift_click,
+            '<B1-Motion>': cls._on_motion,
+            '<MouseWheel>': cls._on_mouse_wheel,
+            '<Button-4>': lambda event: cls._scroll(event, -3),
+            '<Button-5>': lambda event: cls._scroll(event, 3),
+            '<Up>': lambda event: cls._on_arrow(event, -1),
+            '<Down>': lambda event: cls._on_arrow(event, 1),
+        }
+        for sequence, handler in bindings.items():
+            self.bind_class(self.CLASS_TAG, sequence, handler)
+
+    @staticmethod
+    def _widget(event):
+        widget = event.widget
+        return widget if isinstance(widget, VirtualListbox) else None
+
+    @classmethod
+    def _on_click(cls, event):
+        widget = cls._widget(event)
+        if widget is None or not widget._rows:
+            return
+        widget.focus_set()
+        index = widget.nearest(event.y)
+        widget.selection_clear(0, tk.END)
+        widget.selection_set(index)
+        widget._anchor = index
+        widget.event_generate('<<ListboxSelect>>')
+
+    @classmethod
+    def _on_control_click(cls, event):
+        widget = cls._widget(event)
+        if widget is None or not widget._rows:
+            return
+        index = widget.nearest(event.y)
+        if widget.selection_includes(index):
+            widget.selection_clear(index)
+        else:
+            widget.selection_set(index)
+        widget._anchor = index
+        widget.event_generate('<<ListboxSelect>>')
+
+    @classmethod
+    def _on_shift_click(cls, event):
+        widget = cls._widget(event)
+        if widget is None or not widget._rows:
+            return
+        cls._select_from_anchor(widget, widget.nearest(event.y))
+
+    @classmethod
+    def _on_motion(cls, event):
+        widget = cls._widget(event)
+        if widget is None or not widget._rows:
+            return
+        cls._select_from_anchor(widget, widget.nearest(event.y))
+
+    @staticmethod
+    def _select_from_anchor(widget, index):
+        first, last = sorted((min(widget._anchor, len(widget._rows) - 1), index))
+        widget.selection_clear(0, tk.END)
+        widget.selection_set(first, last)
+        widget.event_generate('<<ListboxSelect>>')
+
+    @classmethod
+    def _on_mouse_wheel(cls, event):
+        # Windows 上滚轮每一格是 120（滚动 3 行），macOS 上是 1
+        if abs(event.delta) >= 120:
+            cls._scroll(event, -(event.delta // 120) * 3)
+        else:
+            cls._scroll(event, -event.delta)
+
+    @classmethod
+    def _scroll(cls, event, rows):
+        widget = cls._widget(event)
+        if widget is not None and rows:
+            widget.yview_scroll(rows, 'units')
+
+    @classmethod
+    def _on_arrow(cls, event, step):
+        widget = cls._widget(event)
+        if widget is None or not widget._rows:
+            return
+        current = widget.curselection()
+        index = (current[-1] if step > 0 else current[0]) + step if current else 0
+        index = max(0, min(index, len(widget._rows) - 1))
+        widget.selection_clear(0, tk.END)
+        widget.selection_set(index)
+        widget._anchor = index
+        widget.see(index)
+        widget.event_generate('<<ListboxSelect>>')